@@ -0,0 +1,76 @@
+"""Микробенчмарк кодеков кэша (services/cache_codecs.py) на пути попадания.
+
+Для каждого кодека — прежнего pydantic (json.dumps(model_dump()) /
+model_validate_json) и msgspec json/msgpack со Struct — печатает размер
+записи в Redis и время на операцию:
+
+- запись: ORM-объект Product -> значение кэша -> запись "<soft>|<delta>|<payload>";
+- попадание в L2: запись из Redis (str для json-кодеков — клиент с
+  decode_responses, bytes для msgpack) -> значение -> JSON ответа;
+- попадание в L1: значение -> JSON ответа.
+
+JSON ответа собирается так же, как в приложении: encode_json Litestar
+с кодировщиками pydantic. Redis и БД не нужны.
+
+Запуск:
+
+    python -m benchmarks.bench_cache_codecs
+"""
+
+import os
+import statistics
+import time
+from typing import Callable
+
+from litestar.plugins.pydantic import PydanticInitPlugin
+from litestar.serialization import encode_json, get_serializer
+
+from models import Product
+from schemas.product import ProductCached, ProductResponse
+from services.cache import LocalCache, TwoTierCache, _split_entry
+from services.cache_codecs import CACHE_CODECS, cache_codec
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "100000"))
+REPEATS = int(os.getenv("BENCH_REPEATS", "5"))
+
+SERIALIZER = get_serializer(PydanticInitPlugin.encoders())
+
+
+def measure(operation: Callable[[], object]) -> float:
+    """Медианное время одной операции в микросекундах (первый прогон — прогрев)."""
+    timings = []
+    for _ in range(REPEATS + 1):
+        started = time.perf_counter()
+        for _ in range(ITERATIONS):
+            operation()
+        timings.append((time.perf_counter() - started) / ITERATIONS * 1_000_000)
+    return statistics.median(timings[1:])
+
+
+def main() -> None:
+    row = Product(
+        id="4b0c8f5e-2a51-4bd7-9d2e-0f6b8c7a1e93",
+        name="Кофемашина автоматическая",
+        description="Капучинатор, два бойлера, 15 бар, объём резервуара 1,8 л. " * 3,
+        price=45990.0,
+        stock_quantity=17,
+    )
+    print(f"Операций: {ITERATIONS}, повторов: {REPEATS}")
+    print(f"{'кодек':<10}{'байт':>8}{'запись, мкс':>14}{'L2, мкс':>10}{'L1, мкс':>10}")
+
+    for name in CACHE_CODECS:
+        codec = cache_codec(ProductCached, ProductResponse, name=name)
+        cache = TwoTierCache(None, "bench", codec, ttl=600, local=LocalCache("bench"))
+        entry = cache._encode(codec.convert(row))
+        # Клиент кэша с decode_responses отдаёт текстовые записи строкой
+        raw = entry if codec.binary else entry.decode()
+        value = codec.decode(_split_entry(raw)[2])
+
+        write = measure(lambda: cache._encode(codec.convert(row)))
+        l2_hit = measure(lambda: encode_json(codec.decode(_split_entry(raw)[2]), serializer=SERIALIZER))
+        l1_hit = measure(lambda: encode_json(value, serializer=SERIALIZER))
+        print(f"{name:<10}{len(entry):>8}{write:>14.2f}{l2_hit:>10.2f}{l1_hit:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
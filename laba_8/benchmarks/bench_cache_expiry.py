@@ -0,0 +1,90 @@
+"""Задержка чтений на границе истечения ключей: жёсткий TTL против
+stale-while-revalidate с досрочным обновлением (XFetch).
+
+BENCH_WORKERS корутин BENCH_SECONDS секунд читают BENCH_KEYS ключей с мягким
+сроком BENCH_TTL секунд; загрузка «из БД» — asyncio.sleep(BENCH_LOAD_MS).
+L1 отключён (TTL 0), чтобы каждое чтение доходило до Redis. С жёстким TTL
+каждое истечение ключа стоит ожидающим запросам полной загрузки (хвост p99),
+с SWR значение обновляется в фоне, а запросы получают его сразу.
+
+Запуск (используется отдельная база Redis, ключи cache:bench:* удаляются):
+
+    BENCH_REDIS_URL=redis://localhost:6379/15 python -m benchmarks.bench_cache_expiry
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import List
+
+import msgspec
+from redis.asyncio import BlockingConnectionPool, Redis
+
+from services.cache import LocalCache, TwoTierCache
+from services.cache_codecs import MsgspecJsonCodec
+
+REDIS_URL = os.getenv("BENCH_REDIS_URL", "redis://localhost:6379/15")
+SECONDS = float(os.getenv("BENCH_SECONDS", "5"))
+WORKERS = int(os.getenv("BENCH_WORKERS", "50"))
+KEYS = int(os.getenv("BENCH_KEYS", "20"))
+TTL = int(os.getenv("BENCH_TTL", "1"))
+LOAD_MS = float(os.getenv("BENCH_LOAD_MS", "50"))
+
+
+class Item(msgspec.Struct):
+    id: str
+    name: str
+
+
+async def load(key: str) -> Item:
+    await asyncio.sleep(LOAD_MS / 1000)
+    return Item(id=key, name=f"Item {key}")
+
+
+async def run(name: str, redis: Redis, stale_ttl: int, xfetch_beta: float) -> None:
+    await redis.delete(*[f"cache:bench:{i}" for i in range(KEYS)])
+    local = LocalCache("bench", ttl=0)
+    cache = TwoTierCache(
+        redis, "bench", MsgspecJsonCodec(Item), ttl=TTL, local=local, stale_ttl=stale_ttl, xfetch_beta=xfetch_beta,
+    )
+    # Прогрев: все ключи в кэше, дальше замеряются только истечения
+    for i in range(KEYS):
+        await cache.get_or_load(str(i), lambda i=i: load(str(i)))
+
+    latencies: List[float] = []
+    deadline = time.monotonic() + SECONDS
+
+    async def worker() -> None:
+        while time.monotonic() < deadline:
+            key = str(random.randrange(KEYS))
+            started = time.perf_counter()
+            await cache.get_or_load(key, lambda: load(key))
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(WORKERS)))
+    await asyncio.gather(*local.refreshing.values())
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+
+    stats = local.stats()
+    print(
+        f"{name:22} чтений: {len(latencies):7}  p50 {percentile(0.5):6.2f} мс  p99 {percentile(0.99):6.2f} мс  "
+        f"max {latencies[-1] * 1000:6.2f} мс  загрузок: {stats['loads']:4}  "
+        f"устаревших: {stats['stale_hits']:4}  досрочных: {stats['early_refreshes']:4}"
+    )
+
+
+async def main() -> None:
+    redis = Redis(connection_pool=BlockingConnectionPool.from_url(REDIS_URL, max_connections=50, decode_responses=True))
+    print(f"{WORKERS} читателей, {KEYS} ключей, TTL {TTL} с, загрузка {LOAD_MS:.0f} мс, {SECONDS:.0f} с")
+    await run("жёсткий TTL", redis, stale_ttl=0, xfetch_beta=0.0)
+    await run("SWR + XFetch", redis, stale_ttl=TTL * 5, xfetch_beta=1.0)
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
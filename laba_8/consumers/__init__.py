@@ -0,0 +1,8 @@
+# consumers/__init__.py
+"""Потребители очередей RabbitMQ ("order", "product").
+
+Отдельный процесс: python -m consumers (CONSUMER_PROCESSES — число процессов).
+"""
+from consumers.app import ConsumerApp
+
+__all__ = ["ConsumerApp"]
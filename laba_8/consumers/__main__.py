@@ -0,0 +1,74 @@
+# consumers/__main__.py
+"""Запуск потребителей RabbitMQ отдельно от веб-приложения.
+
+    python -m consumers
+
+CONSUMER_PROCESSES — число процессов (по умолчанию 1): каждый со своим
+соединением с RabbitMQ, пулом соединений с БД и клиентом Redis. Брокер
+раздаёт сообщения между ними сам, поэтому потребители масштабируются
+независимо от веб-приложения (там брокер отключается RUN_CONSUMERS=false).
+"""
+import asyncio
+import multiprocessing
+import os
+import signal
+
+from redis.asyncio import Redis
+
+from consumers.app import ConsumerApp
+
+CONSUMER_PROCESSES = int(os.getenv("CONSUMER_PROCESSES", "1"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+
+async def run_consumer() -> None:
+    # Импорт здесь: движок БД должен создаваться в каждом процессе заново
+    from database import async_session_factory, engine
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    redis_client = Redis.from_url(REDIS_URL, decode_responses=True)
+    consumers = ConsumerApp(async_session_factory, redis_client=redis_client)
+    await consumers.start()
+    print(f"[consumers:{os.getpid()}] Потребители запущены")
+
+    await stop.wait()
+
+    print(f"[consumers:{os.getpid()}] Остановка...")
+    await consumers.close()
+    await redis_client.close()
+    await engine.dispose()
+    print(f"[consumers:{os.getpid()}] Остановлено. {consumers.stats()}")
+
+
+def run_process() -> None:
+    asyncio.run(run_consumer())
+
+
+def main() -> None:
+    if CONSUMER_PROCESSES <= 1:
+        run_process()
+        return
+
+    # spawn, а не fork: дочерние процессы не наследуют сокеты и циклы событий
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_process, name=f"consumer-{i}") for i in range(CONSUMER_PROCESSES)]
+    for process in processes:
+        process.start()
+
+    def stop_children(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()  # SIGTERM — корректная остановка с дописыванием пачек
+
+    signal.signal(signal.SIGTERM, stop_children)
+    signal.signal(signal.SIGINT, stop_children)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
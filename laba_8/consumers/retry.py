@@ -0,0 +1,121 @@
+# consumers/retry.py
+"""Повторы с экспоненциальной задержкой и очередь недоставленных (DLQ).
+
+Для очереди <queue> объявляются:
+- <queue>.retry.1 … <queue>.retry.N — очереди ожидания с x-message-ttl
+  base_delay, 2·base_delay, 4·base_delay…; по истечении TTL брокер сам
+  возвращает сообщение в <queue> (x-dead-letter-routing-key);
+- <queue>.dlq — сообщения, исчерпавшие попытки, и «ядовитые» (не проходят
+  валидацию, отклонены при обработке). Вернуть их: python -m consumers.replay <queue>.
+
+Номер попытки едет в заголовке x-retry-attempt. Ожидание происходит в брокере,
+потребитель в это время обрабатывает остальной поток, а не крутит одно и то же
+сообщение в горячем цикле nack/redeliver.
+"""
+from typing import Any, Dict, List, Optional
+
+from faststream.rabbit import RabbitBroker, RabbitMessage, RabbitQueue
+
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY_MS = 1000
+RETRY_ATTEMPT_HEADER = "x-retry-attempt"
+DEAD_LETTER_REASON_HEADER = "x-dead-letter-reason"
+
+
+class RetryTopology:
+    """Имена и аргументы очередей повторов и DLQ для одной очереди."""
+
+    def __init__(
+        self,
+        queue_name: str,
+        max_attempts: int = RETRY_MAX_ATTEMPTS,
+        base_delay_ms: int = RETRY_BASE_DELAY_MS,
+    ):
+        self.queue_name = queue_name
+        self.max_attempts = max_attempts
+        self.base_delay_ms = base_delay_ms
+
+    @property
+    def dead_letter_queue(self) -> str:
+        return f"{self.queue_name}.dlq"
+
+    def retry_queue(self, attempt: int) -> str:
+        return f"{self.queue_name}.retry.{attempt}"
+
+    def delay_ms(self, attempt: int) -> int:
+        return self.base_delay_ms * 2 ** (attempt - 1)
+
+    def queues(self) -> List[RabbitQueue]:
+        retry_queues = [
+            RabbitQueue(
+                self.retry_queue(attempt),
+                durable=True,
+                arguments={
+                    "x-message-ttl": self.delay_ms(attempt),
+                    # Истёкшее сообщение уходит через default exchange обратно в основную очередь
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": self.queue_name,
+                },
+            )
+            for attempt in range(1, self.max_attempts + 1)
+        ]
+        return retry_queues + [RabbitQueue(self.dead_letter_queue, durable=True)]
+
+    async def declare(self, broker: RabbitBroker) -> None:
+        for queue in self.queues():
+            await broker.declare_queue(queue)
+
+
+class RetryingMessage:
+    """Входящее сообщение, у которого nack/reject ведут в очереди повторов/DLQ.
+
+    Реализует тот же интерфейс ack/nack/reject, что ждёт MessageBatcher:
+    - ack — обычное подтверждение;
+    - nack(requeue=True) — сбой обработки: копия уходит в очередь ожидания
+      следующей попытки (или в DLQ, если попытки кончились), оригинал
+      подтверждается;
+    - reject / nack(requeue=False) — сообщение сразу уходит в DLQ.
+    Копия публикуется до подтверждения оригинала: при падении между ними
+    сообщение придёт дважды (повтор отсеет дедупликация), но не потеряется.
+    """
+
+    def __init__(self, message: RabbitMessage, broker: RabbitBroker, topology: RetryTopology):
+        self.message = message
+        self.broker = broker
+        self.topology = topology
+
+    @property
+    def attempt(self) -> int:
+        return int((self.message.headers or {}).get(RETRY_ATTEMPT_HEADER, 0))
+
+    async def ack(self) -> None:
+        await self.message.ack()
+
+    async def nack(self, requeue: bool = True) -> None:
+        if not requeue:
+            await self.reject()
+            return
+        attempt = self.attempt + 1
+        if attempt > self.topology.max_attempts:
+            await self.reject(reason=f"max attempts ({self.topology.max_attempts}) exceeded")
+            return
+        await self._republish(self.topology.retry_queue(attempt), {RETRY_ATTEMPT_HEADER: attempt})
+
+    async def reject(self, reason: Optional[str] = None) -> None:
+        await self._republish(
+            self.topology.dead_letter_queue,
+            {DEAD_LETTER_REASON_HEADER: reason or "rejected"},
+        )
+
+    async def _republish(self, queue_name: str, extra_headers: Dict[str, Any]) -> None:
+        raw = self.message.raw_message
+        await self.broker.publish(
+            self.message.body,
+            queue=queue_name,
+            headers={**(self.message.headers or {}), **extra_headers},
+            content_type=raw.content_type,
+            content_encoding=raw.content_encoding,
+            message_id=raw.message_id,
+            persist=True,
+        )
+        await self.message.ack()
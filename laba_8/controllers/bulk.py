@@ -0,0 +1,100 @@
+# controllers/bulk.py
+from functools import lru_cache
+from typing import AsyncIterator, List, Sequence, Tuple, Type, TypeVar, Union
+from litestar import Request
+from litestar.exceptions import ClientException
+from litestar.status_codes import HTTP_413_REQUEST_ENTITY_TOO_LARGE
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+T = TypeVar("T")
+M = TypeVar("M", bound=BaseModel)
+
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+
+def is_ndjson(request: Request) -> bool:
+    return request.content_type[0] in NDJSON_MEDIA_TYPES
+
+
+async def iter_lines(request: Request) -> AsyncIterator[str]:
+    """Читать тело запроса построчно по мере поступления, не буферизуя его целиком."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line.decode("utf-8")
+    if buffer.strip():
+        yield buffer.decode("utf-8")
+
+
+async def read_body(request: Request, max_bytes: int) -> bytes:
+    """Прочитать тело целиком, но не больше max_bytes (иначе 413)."""
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise ClientException(
+                status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Request body exceeds {max_bytes} bytes; send larger uploads as NDJSON",
+            )
+    return bytes(body)
+
+
+async def iter_chunks(items: AsyncIterator[T], size: int) -> AsyncIterator[List[T]]:
+    """Группировать элементы асинхронного потока в списки по size штук."""
+    chunk: List[T] = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def format_validation_error(error: ValidationError) -> str:
+    """Короткое описание ошибки pydantic для построчных результатов."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'body'}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[M]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def validate_chunk(
+    model: Type[M], items: Sequence[Union[str, dict]], start: int = 0
+) -> Tuple[List[M], List[Tuple[int, str]]]:
+    """Провалидировать пачку строк (JSON-строки или dict) в модели.
+
+    Сначала вся пачка проверяется одним вызовом TypeAdapter — это быстрый путь.
+    Если в пачке есть ошибка, строки проверяются по одной, чтобы отбросить
+    только плохие. Возвращает (валидные модели, [(номер строки, ошибка)]).
+    """
+    adapter = _list_adapter(model)
+    try:
+        if items and isinstance(items[0], str):
+            valid = adapter.validate_json("[" + ",".join(items) + "]")
+        else:
+            valid = adapter.validate_python(items)
+        # Строка вида "{...},{...}" дала бы лишние элементы — тогда проверяем по одной
+        if len(valid) == len(items):
+            return valid, []
+    except ValidationError:
+        pass
+
+    valid, errors = [], []
+    for offset, item in enumerate(items):
+        try:
+            if isinstance(item, str):
+                valid.append(model.model_validate_json(item))
+            else:
+                valid.append(model.model_validate(item))
+        except ValidationError as e:
+            errors.append((start + offset, format_validation_error(e)))
+    return valid, errors
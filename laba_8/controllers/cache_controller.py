@@ -0,0 +1,13 @@
+# controllers/cache_controller.py
+from litestar import Controller, get
+
+from services.cache import cache_stats
+
+
+class CacheController(Controller):
+    path = "/cache"
+
+    @get("/stats")
+    async def get_cache_stats(self) -> dict:
+        """Статистика L1-кэша этого процесса: записи, байты, доли попаданий в L1 и в Redis"""
+        return cache_stats()
@@ -1,11 +1,53 @@
 # controllers/order_controller.py
-from litestar import Controller, get, post, put, delete
+import json
+from typing import AsyncIterator, Optional, Tuple
+from litestar import Controller, Request, get, post, put, delete
 from litestar.di import Provide
 from litestar.params import Parameter, Body
 from litestar.exceptions import NotFoundException, ValidationException
-from schemas.order import OrderCreate, OrderUpdate, OrderResponse
+from litestar.status_codes import HTTP_200_OK
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from controllers.bulk import format_validation_error, is_ndjson, iter_chunks, iter_lines, read_body
+from schemas.order import OrderCreate, OrderUpdate, OrderResponse, OrderBulkResult
+from schemas.pagination import decode_cursor, next_cursor
 from services.order_service import OrderService
 
+ORDER_BULK_CHUNK_SIZE = 500  # заказов на одну транзакцию
+# JSON-массив разбирается целиком в памяти, поэтому его размер ограничен;
+# NDJSON читается потоком и ограничения не имеет
+ORDER_BULK_JSON_MAX_BYTES = 10 * 1024 * 1024
+
+# (позиция во входных данных, заказ или None, ошибка разбора или None)
+BulkItem = Tuple[int, Optional[OrderCreate], Optional[str]]
+
+
+async def parse_bulk_orders(request: Request) -> AsyncIterator[BulkItem]:
+    """Разобрать тело POST /orders/bulk: JSON-массив или NDJSON-поток."""
+    if is_ndjson(request):
+        index = 0
+        async for line in iter_lines(request):
+            try:
+                yield index, OrderCreate.model_validate_json(line), None
+            except ValidationError as e:
+                yield index, None, format_validation_error(e)
+            index += 1
+        return
+
+    try:
+        items = json.loads(await read_body(request, ORDER_BULK_JSON_MAX_BYTES))
+    except ValueError as e:
+        raise ValidationException(detail=f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise ValidationException(detail="Expected a JSON array of orders")
+
+    for index, item in enumerate(items):
+        try:
+            yield index, OrderCreate.model_validate(item), None
+        except ValidationError as e:
+            yield index, None, format_validation_error(e)
+
+
 class OrderController(Controller):
     path = "/orders"
 
@@ -26,14 +68,22 @@ class OrderController(Controller):
         order_service: OrderService,
         count: int = Parameter(gt=0, le=100, default=10),
         page: int = Parameter(gt=0, default=1),
+        approximate: bool = Parameter(default=False),
+        after: Optional[str] = Parameter(default=None, description="Курсор next_cursor"),
     ) -> dict:
-        orders = await order_service.get_all(count=count, page=page)
-        total = await order_service.get_total_count()
+        try:
+            cursor = decode_cursor(after) if after else None
+        except ValueError as e:
+            raise ValidationException(detail=str(e))
+
+        orders = await order_service.get_all(count=count, page=page, after=cursor)
+        total = await order_service.get_total_count(approximate=approximate)
         return {
             "orders": [OrderResponse.model_validate(o) for o in orders],
             "total_count": total,
             "page": page,
             "count": count,
+            "next_cursor": next_cursor(orders, count),
         }
 
     @post()
@@ -48,6 +98,47 @@ class OrderController(Controller):
         except ValueError as e:
             raise ValidationException(detail=str(e))
 
+    @post("/bulk", status_code=HTTP_200_OK, request_max_body_size=None)
+    async def create_orders_bulk(
+        self,
+        order_service: OrderService,
+        request: Request,
+    ) -> dict:
+        """Массовое создание заказов.
+
+        Тело — JSON-массив OrderCreate (не больше ORDER_BULK_JSON_MAX_BYTES) или
+        NDJSON (Content-Type: application/x-ndjson), по одному заказу в строке.
+        Заказы обрабатываются пачками по ORDER_BULK_CHUNK_SIZE, каждая пачка —
+        одна транзакция: пачки до неё уже закоммичены, поэтому сбой пачки — это
+        ошибка по каждому её заказу, а не 500 на весь запрос. В ответе результат
+        по каждому заказу: order_id при успехе или error.
+        """
+        results = []
+        async for chunk in iter_chunks(parse_bulk_orders(request), ORDER_BULK_CHUNK_SIZE):
+            valid = [(index, order_data) for index, order_data, _ in chunk if order_data]
+            results.extend(
+                OrderBulkResult(index=index, error=error)
+                for index, order_data, error in chunk if not order_data
+            )
+            try:
+                created = await order_service.create_bulk([order_data for _, order_data in valid])
+            except (ValueError, SQLAlchemyError) as e:
+                print(f"[orders/bulk] Пачка из {len(valid)} заказов не создана: {e!r}")
+                await order_service.rollback()
+                created = [(None, "Order not created: transaction failed, retry this item")] * len(valid)
+            results.extend(
+                OrderBulkResult(index=index, order_id=order_id, error=error)
+                for (index, _), (order_id, error) in zip(valid, created)
+            )
+
+        results.sort(key=lambda result: result.index)
+        created_count = sum(1 for result in results if result.order_id)
+        return {
+            "created": created_count,
+            "failed": len(results) - created_count,
+            "results": results,
+        }
+
     @put("/{order_id:str}/status")
     async def update_order_status(
         self,
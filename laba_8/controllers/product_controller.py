@@ -1,11 +1,53 @@
 # controllers/product_controller.py
-from litestar import Controller, get, post, put, delete
+import csv
+from typing import AsyncIterator, List, Optional, Tuple
+from litestar import Controller, Request, get, post, put, delete
 from litestar.di import Provide
 from litestar.params import Parameter, Body
 from litestar.exceptions import NotFoundException, ValidationException
-from schemas.product import ProductCreate, ProductUpdate, ProductResponse
+from litestar.status_codes import HTTP_200_OK
+from controllers.bulk import is_ndjson, iter_chunks, iter_lines, validate_chunk
+from schemas.product import ProductCreate, ProductUpdate, ProductCached, ProductResponse, ProductImport
+from schemas.pagination import decode_cursor, next_cursor
 from services.product_service import ProductService
 
+PRODUCT_IMPORT_CHUNK_SIZE = 5000  # строк на одну транзакцию (один COPY)
+PRODUCT_IMPORT_MAX_ERRORS = 100  # сколько ошибок по строкам вернуть в ответе
+
+
+async def parse_import_rows(
+    request: Request,
+) -> AsyncIterator[Tuple[List[ProductImport], List[Tuple[int, str]]]]:
+    """Читать тело POST /products/import пачками: (продукты, [(номер строки, ошибка)]).
+
+    CSV (text/csv) — первая строка заголовок с именами полей ProductImport;
+    переносы строк внутри значений не поддерживаются. NDJSON — по объекту в строке.
+    """
+    if is_ndjson(request):
+        start = 0
+        async for lines in iter_chunks(iter_lines(request), PRODUCT_IMPORT_CHUNK_SIZE):
+            valid, errors = validate_chunk(ProductImport, lines, start)
+            yield valid, errors
+            start += len(lines)
+        return
+
+    if request.content_type[0] != "text/csv":
+        raise ValidationException(detail="Expected text/csv or application/x-ndjson body")
+
+    lines = iter_lines(request)
+    header = next(csv.reader([await anext(lines, "")]))
+    start = 0
+    async for chunk in iter_chunks(lines, PRODUCT_IMPORT_CHUNK_SIZE):
+        rows = [
+            # Пустая ячейка CSV = значение не задано
+            {key: value or None for key, value in row.items()}
+            for row in csv.DictReader(chunk, fieldnames=header)
+        ]
+        valid, errors = validate_chunk(ProductImport, rows, start)
+        yield valid, errors
+        start += len(chunk)
+
+
 class ProductController(Controller):
     path = "/products"
 
@@ -18,7 +60,8 @@ class ProductController(Controller):
         product = await product_service.get_by_id(product_id)
         if not product:
             raise NotFoundException(detail=f"Product with ID {product_id} not found")
-        if isinstance(product, ProductResponse):
+        # Из кэша — готовое значение: Struct msgspec кодируется в ответ без pydantic
+        if isinstance(product, (ProductCached, ProductResponse)):
             return product
         return ProductResponse.model_validate(product)
 
@@ -28,14 +71,22 @@ class ProductController(Controller):
         product_service: ProductService,
         count: int = Parameter(gt=0, le=100, default=10),
         page: int = Parameter(gt=0, default=1),
+        approximate: bool = Parameter(default=False),
+        after: Optional[str] = Parameter(default=None, description="Курсор next_cursor"),
     ) -> dict:
-        products = await product_service.get_all(count=count, page=page)
-        total = await product_service.get_total_count()
+        try:
+            cursor = decode_cursor(after) if after else None
+        except ValueError as e:
+            raise ValidationException(detail=str(e))
+
+        products = await product_service.get_all(count=count, page=page, after=cursor)
+        total = await product_service.get_total_count(approximate=approximate)
         return {
             "products": [ProductResponse.model_validate(p) for p in products],
             "total_count": total,
             "page": page,
             "count": count,
+            "next_cursor": next_cursor(products, count),
         }
 
     @post()
@@ -50,6 +101,32 @@ class ProductController(Controller):
         except ValueError as e:
             raise ValidationException(detail=str(e))
 
+    @post("/import", status_code=HTTP_200_OK, request_max_body_size=None)
+    async def import_products(
+        self,
+        product_service: ProductService,
+        request: Request,
+    ) -> dict:
+        """Потоковый импорт каталога из CSV или NDJSON с upsert по id.
+
+        Тело читается по мере поступления и обрабатывается пачками по
+        PRODUCT_IMPORT_CHUNK_SIZE строк, поэтому память не растёт с размером файла.
+        """
+        imported = 0
+        failed = 0
+        errors = []
+        async for valid, chunk_errors in parse_import_rows(request):
+            if valid:
+                imported += await product_service.import_products(valid)
+            failed += len(chunk_errors)
+            errors.extend(chunk_errors[:PRODUCT_IMPORT_MAX_ERRORS - len(errors)])
+
+        return {
+            "imported": imported,
+            "failed": failed,
+            "errors": [{"row": row, "error": error} for row, error in errors],
+        }
+
     @put("/{product_id:str}")
     async def update_product(
         self,
@@ -1,12 +1,34 @@
 # controllers/report_controller.py
-from datetime import date, datetime
+from datetime import datetime
+from typing import Optional
 from litestar import Controller, get
 from litestar.di import Provide
 from litestar.params import Parameter
 from litestar.exceptions import ValidationException
 from schemas.report import ReportResponse
+from schemas.pagination import decode_cursor, next_cursor
 from services.report_service import ReportService
 
+# Диапазон может покрывать всю таблицу (from без to): без count отдаём первую
+# страницу такого размера, дальше — по next_cursor
+REPORT_RANGE_DEFAULT_COUNT = 1000
+
+
+def parse_bound(value: Optional[str], name: str) -> Optional[datetime]:
+    """Разобрать границу диапазона from/to: YYYY-MM-DD или ISO 8601 дата-время."""
+    if value is None:
+        return None
+    try:
+        bound = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValidationException(
+            detail=f"Неверный формат '{name}': {value}. Ожидается YYYY-MM-DD или YYYY-MM-DDTHH:MM:SS"
+        )
+    # report_at хранится без часового пояса в локальном времени (datetime.now())
+    if bound.tzinfo is not None:
+        bound = bound.astimezone().replace(tzinfo=None)
+    return bound
+
 
 class ReportController(Controller):
     path = "/report"
@@ -15,22 +37,63 @@ class ReportController(Controller):
     async def get_reports_by_date(
         self,
         report_service: ReportService,
-        date: str = Parameter(
-            description="Дата в формате YYYY-MM-DD (например, 2025-12-16)"
+        date: Optional[str] = Parameter(
+            default=None,
+            description="Дата в формате YYYY-MM-DD (например, 2025-12-16)",
+        ),
+        from_: Optional[str] = Parameter(
+            query="from", default=None,
+            description="Начало диапазона report_at включительно (YYYY-MM-DD или ISO 8601)",
+        ),
+        to: Optional[str] = Parameter(
+            default=None,
+            description="Конец диапазона report_at не включительно (YYYY-MM-DD или ISO 8601)",
+        ),
+        count: Optional[int] = Parameter(
+            gt=0, le=1000, default=None,
+            description=(
+                "Размер страницы (по умолчанию — все отчёты за дату, "
+                f"для диапазона — {REPORT_RANGE_DEFAULT_COUNT})"
+            ),
+        ),
+        after: Optional[str] = Parameter(
+            default=None,
+            description="Курсор next_cursor из предыдущего ответа",
         ),
     ) -> dict:
-        """Получить отчёты по заказам за указанную дату."""
+        """Получить отчёты по заказам за указанную дату или за диапазон [from, to)."""
+        if date is not None and (from_ is not None or to is not None):
+            raise ValidationException(detail="Укажите либо date, либо from/to")
+        if date is None and from_ is None:
+            raise ValidationException(detail="Укажите date или from")
+
         try:
-            # Парсим строку даты в объект date
-            report_date = datetime.strptime(date, "%Y-%m-%d").date()
-        except ValueError:
-            raise ValidationException(
-                detail=f"Неверный формат даты: {date}. Ожидается формат YYYY-MM-DD"
-            )
-
-        reports = await report_service.get_by_date(report_date)
-        return {
-            "date": date,
-            "reports": [ReportResponse.model_validate(r) for r in reports],
-            "total_count": len(reports),
-        }
+            cursor = decode_cursor(after) if after else None
+        except ValueError as e:
+            raise ValidationException(detail=str(e))
+
+        if date is not None:
+            try:
+                # Парсим строку даты в объект date
+                report_date = datetime.strptime(date, "%Y-%m-%d").date()
+            except ValueError:
+                raise ValidationException(
+                    detail=f"Неверный формат даты: {date}. Ожидается формат YYYY-MM-DD"
+                )
+            reports = await report_service.get_by_date(report_date, count=count, after=cursor)
+            result = {"date": date}
+        else:
+            start, end = parse_bound(from_, "from"), parse_bound(to, "to")
+            count = count or REPORT_RANGE_DEFAULT_COUNT
+            try:
+                reports = await report_service.get_by_range(start, end, count=count, after=cursor)
+            except ValueError as e:
+                raise ValidationException(detail=str(e))
+            result = {"from": from_, "to": to}
+
+        result.update(
+            reports=[ReportResponse.model_validate(r) for r in reports],
+            total_count=len(reports),
+            next_cursor=next_cursor(reports, count, field="report_at") if count else None,
+        )
+        return result
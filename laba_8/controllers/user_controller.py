@@ -3,9 +3,10 @@ from litestar.di import Provide
 from litestar.params import Parameter, Body
 from litestar.exceptions import NotFoundException, ValidationException
 from litestar.status_codes import HTTP_204_NO_CONTENT
-from typing import List
+from typing import List, Optional
 from services.user_service import UserService
-from schemas.user import UserCreate, UserUpdate, UserResponse
+from schemas.user import UserCreate, UserUpdate, UserCached, UserResponse
+from schemas.pagination import decode_cursor, next_cursor
 
 
 class UserController(Controller):
@@ -22,7 +23,8 @@ class UserController(Controller):
         if not user:
             raise NotFoundException(detail=f"User with ID {user_id} not found")
         # Если в кэше уже была готовая схема, возвращаем её напрямую
-        if isinstance(user, UserResponse):
+        # (Struct msgspec Litestar кодирует в ответ без pydantic)
+        if isinstance(user, (UserCached, UserResponse)):
             return user
         return UserResponse.model_validate(user)
 
@@ -32,16 +34,30 @@ class UserController(Controller):
             user_service: UserService,
             count: int = Parameter(gt=0, le=100, default=10, description="Количество записей"),
             page: int = Parameter(gt=0, default=1, description="Номер страницы"),
+            approximate: bool = Parameter(
+                default=False,
+                description="Приблизительный total_count по статистике PostgreSQL",
+            ),
+            after: Optional[str] = Parameter(
+                default=None,
+                description="Курсор next_cursor из предыдущего ответа (вместо page)",
+            ),
     ) -> dict:
-        """Получить всех пользователей с пагинацией"""
-        users = await user_service.get_by_filter(count=count, page=page)
-        total_count = await user_service.get_total_count()
+        """Получить всех пользователей с пагинацией (по page или по курсору after)"""
+        try:
+            cursor = decode_cursor(after) if after else None
+        except ValueError as e:
+            raise ValidationException(detail=str(e))
+
+        users = await user_service.get_by_filter(count=count, page=page, after=cursor)
+        total_count = await user_service.get_total_count(approximate=approximate)
 
         return {
             "users": [UserResponse.model_validate(user) for user in users],
             "total_count": total_count,
             "page": page,
-            "count": count
+            "count": count,
+            "next_cursor": next_cursor(users, count),
         }
 
     @post("/create_user")
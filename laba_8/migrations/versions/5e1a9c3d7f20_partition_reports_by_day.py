@@ -0,0 +1,93 @@
+"""partition reports by day
+
+Revision ID: 5e1a9c3d7f20
+Revises: 7b2e4f9a1c38
+Create Date: 2026-10-18 16:21:09.184772
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1a9c3d7f20'
+down_revision: Union[str, Sequence[str], None] = '7b2e4f9a1c38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Секции создаются от первого дня с отчётами до сегодня + PARTITIONS_AHEAD_DAYS,
+# дальше их поддерживает задача maintain_report_partitions
+PARTITIONS_AHEAD_DAYS = 7
+
+CREATE_DAILY_PARTITIONS = f"""
+DO $$
+DECLARE
+    day date;
+BEGIN
+    FOR day IN
+        SELECT generate_series(
+            COALESCE((SELECT min(report_at)::date FROM reports_legacy), current_date),
+            current_date + {PARTITIONS_AHEAD_DAYS},
+            interval '1 day'
+        )::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF reports FOR VALUES FROM (%L) TO (%L)',
+            'reports_p' || to_char(day, 'YYYYMMDD'), day, day + 1
+        );
+    END LOOP;
+END $$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Старая таблица остаётся рядом, пока данные не перенесены в секции
+    op.drop_index('ix_reports_order_id', table_name='reports')
+    op.drop_index('ix_reports_report_at_id', table_name='reports')
+    op.rename_table('reports', 'reports_legacy')
+    op.execute('ALTER TABLE reports_legacy RENAME CONSTRAINT reports_pkey TO reports_legacy_pkey')
+
+    op.create_table('reports',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('report_at', sa.DateTime(), nullable=False),
+    sa.Column('order_id', sa.String(length=36), nullable=False),
+    sa.Column('count_product', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.PrimaryKeyConstraint('id', 'report_at'),
+    postgresql_partition_by='RANGE (report_at)'
+    )
+    op.create_index('ix_reports_report_at_id', 'reports', ['report_at', 'id'], unique=False)
+    op.create_index('ix_reports_order_id', 'reports', ['order_id'], unique=False)
+    op.execute('CREATE TABLE reports_default PARTITION OF reports DEFAULT')
+    op.execute(CREATE_DAILY_PARTITIONS)
+
+    op.execute(
+        'INSERT INTO reports (id, report_at, order_id, count_product) '
+        'SELECT id, report_at, order_id, count_product FROM reports_legacy'
+    )
+    op.drop_table('reports_legacy')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table('reports_plain',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('report_at', sa.DateTime(), nullable=False),
+    sa.Column('order_id', sa.String(length=36), nullable=False),
+    sa.Column('count_product', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.PrimaryKeyConstraint('id', name='reports_plain_pkey')
+    )
+    op.execute(
+        'INSERT INTO reports_plain (id, report_at, order_id, count_product) '
+        'SELECT id, report_at, order_id, count_product FROM reports'
+    )
+    # Вместе с секционированной таблицей удаляются все её секции
+    op.drop_table('reports')
+    op.rename_table('reports_plain', 'reports')
+    op.execute('ALTER TABLE reports RENAME CONSTRAINT reports_plain_pkey TO reports_pkey')
+    op.create_index('ix_reports_report_at_id', 'reports', ['report_at', 'id'], unique=False)
+    op.create_index('ix_reports_order_id', 'reports', ['order_id'], unique=False)
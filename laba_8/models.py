@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import String, ForeignKey, DateTime, Integer, Table, Column
+from sqlalchemy import String, ForeignKey, DateTime, Integer, Table, Column, Index, DDL, event
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from datetime import datetime
 import uuid
@@ -14,10 +14,14 @@ order_product = Table(
     Column("order_id", String(36), ForeignKey("orders.id"), primary_key=True),
     Column("product_id", String(36), ForeignKey("products.id"), primary_key=True),
     Column("quantity", Integer, nullable=False, default=1),
+    # PK (order_id, product_id) не помогает искать по product_id (удаление продукта)
+    Index("ix_order_product_product_id", "product_id"),
 )
 
 class User(Base):
     __tablename__ = 'users'
+    # Индекс под keyset-пагинацию: ORDER BY created_at, id
+    __table_args__ = (Index('ix_users_created_at_id', 'created_at', 'id'),)
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     username: Mapped[str] = mapped_column(String(50), nullable=False, unique=True)
     email: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
@@ -27,6 +31,8 @@ class User(Base):
 
 class Address(Base):
     __tablename__ = 'addresses'
+    # Индекс под внешний ключ: адреса пользователя и проверка FK при удалении users
+    __table_args__ = (Index('ix_addresses_user_id', 'user_id'),)
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id: Mapped[str] = mapped_column(ForeignKey('users.id'), nullable=False)
     street: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -41,6 +47,8 @@ class Address(Base):
 
 class Product(Base):
     __tablename__ = 'products'
+    # Индекс под keyset-пагинацию: ORDER BY created_at, id
+    __table_args__ = (Index('ix_products_created_at_id', 'created_at', 'id'),)
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     description: Mapped[str] = mapped_column(String(500), nullable=True)
@@ -51,6 +59,13 @@ class Product(Base):
 
 class Order(Base):
     __tablename__ = 'orders'
+    # Индекс под keyset-пагинацию: ORDER BY created_at, id; user_id — под внешний ключ;
+    # updated_at — под поиск изменённых заказов для инкрементальных отчётов
+    __table_args__ = (
+        Index('ix_orders_created_at_id', 'created_at', 'id'),
+        Index('ix_orders_user_id', 'user_id'),
+        Index('ix_orders_updated_at', 'updated_at'),
+    )
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id: Mapped[str] = mapped_column(ForeignKey('users.id'), nullable=False)
     status: Mapped[str] = mapped_column(String(20), default="pending")
@@ -61,16 +76,32 @@ class Order(Base):
     reports = relationship("Report", back_populates="order")
 
 
+# Секция по умолчанию для reports: сюда попадают строки за дни, для которых
+# дневная секция ещё не создана (её потом забирает ReportRepository.ensure_partitions)
+REPORT_DEFAULT_PARTITION = "reports_default"
+
+
 class Report(Base):
     __tablename__ = "reports"
+    # В PostgreSQL таблица секционирована по дням: RANGE (report_at).
+    # (report_at, id) — под keyset-пагинацию ORDER BY report_at DESC, id DESC
+    # и под поиск по диапазону report_at (ведущая колонка), отдельный индекс
+    # по report_at не нужен; order_id — под внешний ключ на orders.
+    __table_args__ = (
+        Index("ix_reports_report_at_id", "report_at", "id"),
+        Index("ix_reports_order_id", "order_id"),
+        {"postgresql_partition_by": "RANGE (report_at)"},
+    )
 
     id: Mapped[str] = mapped_column(
         String(36),
         primary_key=True,
         default=lambda: str(uuid.uuid4()),
     )
+    # Ключ секционирования обязан входить в первичный ключ
     report_at: Mapped[datetime] = mapped_column(
         DateTime,
+        primary_key=True,
         default=datetime.now,
         nullable=False,
     )
@@ -87,4 +118,21 @@ class Report(Base):
 
     order = relationship("Order", back_populates="reports")
 
-Product.orders = relationship("Order", secondary=order_product, back_populates="products")
\ No newline at end of file
+class ReportWatermark(Base):
+    """Отметка времени, до которой изменения заказов уже учтены в отчётах.
+
+    Хранится в БД и обновляется в одной транзакции с записью отчётов,
+    поэтому переживает перезапуск воркера.
+    """
+    __tablename__ = "report_watermarks"
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    value: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+Product.orders = relationship("Order", secondary=order_product, back_populates="products")
+
+event.listen(
+    Report.__table__,
+    "after_create",
+    DDL(f"CREATE TABLE {REPORT_DEFAULT_PARTITION} PARTITION OF reports DEFAULT").execute_if(dialect="postgresql"),
+)
@@ -1,10 +1,29 @@
 # repositories/order_repository.py
-from sqlalchemy import select, insert
+import asyncio
+import random
+import uuid
+from collections import Counter
+from sqlalchemy import select, insert, update, delete, case, func, tuple_
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, TypeVar
 from models import Order, Product, order_product
+from repositories.statistics import estimate_row_count
 from schemas.order import OrderCreate
+from schemas.pagination import Cursor
+
+ORDER_CREATE_MAX_ATTEMPTS = 5
+ORDER_CREATE_RETRY_BASE_DELAY = 0.02  # секунды, удваивается на каждой попытке
+# serialization_failure и deadlock_detected — транзакцию можно просто повторить
+RETRYABLE_SQLSTATES = {"40001", "40P01"}
+
+
+T = TypeVar("T")
+
+
+def is_retryable_error(error: DBAPIError) -> bool:
+    return getattr(error.orig, "sqlstate", None) in RETRYABLE_SQLSTATES
 
 
 class OrderRepository:
@@ -20,66 +39,222 @@ class OrderRepository:
         return result.scalar_one_or_none()
 
     async def create(self, order_data: OrderCreate) -> Order:
-        # Шаг 1: проверяем, что все продукты существуют
-        product_ids = order_data.product_ids
-        products = await self.session.execute(select(Product).where(Product.id.in_(product_ids)))
-        products = products.scalars().all()
+        """Создать заказ и списать остатки одной транзакцией."""
+        return await self._run_with_retry(self._create, order_data)
+
+    async def create_bulk(
+        self, orders: Sequence[OrderCreate]
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        """Создать пачку заказов одной транзакцией.
 
-        if len(products) != len(product_ids):
-            missing = set(product_ids) - {p.id for p in products}
+        Продукты всей пачки читаются и блокируются одним запросом, остатки
+        списываются одним UPDATE, заказы и order_product вставляются через
+        executemany. Заказ, для которого не нашлось продукта или не хватило
+        остатка, пропускается, остальные создаются.
+        Возвращает (order_id, error) для каждого заказа в порядке orders.
+        """
+        return await self._run_with_retry(self._create_bulk, orders)
+
+    async def _run_with_retry(self, operation: Callable[..., Awaitable[T]], *args) -> T:
+        """Выполнить транзакцию, повторяя её целиком при дедлоке или ошибке
+        сериализации с экспоненциальной задержкой."""
+        for attempt in range(1, ORDER_CREATE_MAX_ATTEMPTS + 1):
+            try:
+                return await operation(*args)
+            except ValueError:
+                # Снимаем блокировки строк продуктов
+                await self.session.rollback()
+                raise
+            except DBAPIError as e:
+                await self.session.rollback()
+                if attempt == ORDER_CREATE_MAX_ATTEMPTS or not is_retryable_error(e):
+                    raise
+                delay = ORDER_CREATE_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+    async def _create(self, order_data: OrderCreate) -> Order:
+        # Одинаковые product_ids в заказе = количество этого товара
+        quantities = order_data.quantities()
+        product_ids = sorted(quantities)
+
+        # Шаг 1: проверяем, что все продукты существуют, и блокируем их строки.
+        # Порядок блокировок по id одинаков во всех транзакциях — дедлоков нет.
+        result = await self.session.execute(
+            select(Product.id, Product.name)
+            .where(Product.id.in_(product_ids))
+            .order_by(Product.id)
+            .with_for_update()
+        )
+        names = dict(result.all())
+
+        if len(names) != len(product_ids):
+            missing = set(product_ids) - set(names)
             raise ValueError(f"Products not found: {missing}")
 
-        # Проверяем остатки *до* создания заказа
-        for product in products:
-            if product.stock_quantity < 1:
-                raise ValueError(f"Product {product.name} is out of stock")
+        # Шаг 2: резервируем остатки одним условным UPDATE
+        out_of_stock = await self._reserve_stock(quantities)
+        if out_of_stock:
+            product_id = min(out_of_stock)
+            raise ValueError(f"Product {names[product_id]} is out of stock")
 
-        # Шаг 2: создаём заказ
-        order = Order(user_id=order_data.user_id, status="pending")
-        self.session.add(order)
-        await self.session.flush()  # чтобы получить order.id
+        # Шаг 3: создаём заказ; INSERT ... RETURNING сразу отдаёт id и created_at
+        result = await self.session.execute(
+            insert(Order)
+            .values(user_id=order_data.user_id, status="pending")
+            .returning(Order)
+        )
+        order = result.scalar_one()
 
-        # Шаг 3: связываем продукты с заказом (вставляем в промежуточную таблицу)
-        for product_id in product_ids:
+        # Шаг 4: связываем продукты с заказом одним executemany в промежуточную таблицу
+        if quantities:
             await self.session.execute(
-                insert(order_product).values(order_id=order.id, product_id=product_id, quantity=1)
+                insert(order_product),
+                [
+                    {"order_id": order.id, "product_id": product_id, "quantity": quantity}
+                    for product_id, quantity in quantities.items()
+                ],
             )
 
-        # Шаг 4: уменьшаем stock_quantity
-        for product in products:
-            product.stock_quantity -= 1
-
         await self.session.commit()
-        await self.session.refresh(order)
         return order
 
+    async def _create_bulk(
+        self, orders: Sequence[OrderCreate]
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        demands = [order_data.quantities() for order_data in orders]
+        product_ids = sorted(set().union(*demands))
+
+        # Шаг 1: один запрос за всеми продуктами пачки, блокировки в порядке id
+        stock: Dict[str, int] = {}
+        names: Dict[str, str] = {}
+        if product_ids:
+            result = await self.session.execute(
+                select(Product.id, Product.name, Product.stock_quantity)
+                .where(Product.id.in_(product_ids))
+                .order_by(Product.id)
+                .with_for_update()
+            )
+            for product_id, name, stock_quantity in result.all():
+                stock[product_id] = stock_quantity
+                names[product_id] = name
+
+        # Шаг 2: распределяем остатки по заказам в порядке поступления
+        results: List[Tuple[Optional[str], Optional[str]]] = []
+        reserved: Counter = Counter()
+        order_rows = []
+        link_rows = []
+        for order_data, quantities in zip(orders, demands):
+            missing = set(quantities) - set(stock)
+            if missing:
+                results.append((None, f"Products not found: {missing}"))
+                continue
+            short = sorted(
+                product_id for product_id, quantity in quantities.items()
+                if stock[product_id] - reserved[product_id] < quantity
+            )
+            if short:
+                results.append((None, f"Product {names[short[0]]} is out of stock"))
+                continue
+
+            reserved.update(quantities)
+            order_id = str(uuid.uuid4())
+            order_rows.append({"id": order_id, "user_id": order_data.user_id, "status": "pending"})
+            link_rows.extend(
+                {"order_id": order_id, "product_id": product_id, "quantity": quantity}
+                for product_id, quantity in quantities.items()
+            )
+            results.append((order_id, None))
+
+        if not order_rows:
+            await self.session.rollback()
+            return results
+
+        # Шаг 3: списываем остатки всей пачки одним условным UPDATE.
+        # Строки заблокированы на шаге 1, поэтому нехватки здесь быть не должно.
+        out_of_stock = await self._reserve_stock(dict(reserved))
+        if out_of_stock:
+            raise ValueError(f"Stock changed concurrently for products: {out_of_stock}")
+
+        # Шаг 4: вставляем заказы и связи пачкой
+        await self.session.execute(insert(Order), order_rows)
+        if link_rows:
+            await self.session.execute(insert(order_product), link_rows)
+
+        await self.session.commit()
+        return results
+
+    async def _reserve_stock(self, quantities: Dict[str, int]) -> Set[str]:
+        """Списать остатки: UPDATE ... SET stock_quantity = stock_quantity - qty
+        WHERE id IN (...) AND stock_quantity >= qty RETURNING id.
+
+        Проверка и списание происходят в одном операторе, поэтому параллельные
+        заказы не могут уйти в минус. Возвращает id продуктов, которых не хватило.
+        """
+        if not quantities:
+            return set()
+
+        distinct_quantities = set(quantities.values())
+        if len(distinct_quantities) == 1:
+            qty = distinct_quantities.pop()
+        else:
+            qty = case(quantities, value=Product.id)
+
+        result = await self.session.execute(
+            update(Product)
+            .where(Product.id.in_(list(quantities)), Product.stock_quantity >= qty)
+            .values(stock_quantity=Product.stock_quantity - qty)
+            .returning(Product.id)
+            .execution_options(synchronize_session=False)
+        )
+        return set(quantities) - set(result.scalars().all())
+
+    async def rollback(self) -> None:
+        await self.session.rollback()
+
     async def update(self, order_id: str, status: str) -> Optional[Order]:
-        order = await self.get_by_id(order_id)
-        if not order:
-            return None
-        order.status = status
+        # UPDATE ... RETURNING вместо SELECT + UPDATE + refresh
+        result = await self.session.execute(
+            update(Order)
+            .where(Order.id == order_id)
+            .values(status=status)
+            .returning(Order)
+            .execution_options(populate_existing=True)
+        )
+        order = result.scalar_one_or_none()
         await self.session.commit()
-        await self.session.refresh(order)
         return order
 
     async def delete(self, order_id: str) -> bool:
-        order = await self.get_by_id(order_id)
-        if not order:
-            return False
-        await self.session.delete(order)
+        # Как и при session.delete: строки order_product удаляются вместе с заказом
+        await self.session.execute(
+            delete(order_product).where(order_product.c.order_id == order_id)
+        )
+        result = await self.session.execute(
+            delete(Order).where(Order.id == order_id).returning(Order.id)
+        )
+        deleted = result.scalar_one_or_none() is not None
         await self.session.commit()
-        return True
+        return deleted
 
     async def get_total_count(self) -> int:
-        result = await self.session.execute(select(Order))
-        return len(result.scalars().all())
+        result = await self.session.execute(select(func.count()).select_from(Order))
+        return result.scalar_one()
 
-    async def get_all(self, count: int = 10, page: int = 1) -> List[Order]:
-        offset = (page - 1) * count
-        result = await self.session.execute(
+    async def get_estimated_count(self) -> Optional[int]:
+        return await estimate_row_count(self.session, Order.__tablename__)
+
+    async def get_all(
+        self, count: int = 10, page: int = 1, after: Optional[Cursor] = None
+    ) -> List[Order]:
+        query = (
             select(Order)
-            .offset(offset)
-            .limit(count)
+            .order_by(Order.created_at, Order.id)
             .options(selectinload(Order.products))  # Загружаем связанные продукты
         )
+        if after:
+            # keyset-пагинация: продолжаем сразу после (created_at, id)
+            query = query.where(tuple_(Order.created_at, Order.id) > tuple_(*after))
+        else:
+            query = query.offset((page - 1) * count)
+        result = await self.session.execute(query.limit(count))
         return result.scalars().all()
\ No newline at end of file
@@ -1,9 +1,18 @@
 # repositories/product_repository.py
-from sqlalchemy import select
+import uuid
+from datetime import datetime
+from sqlalchemy import select, insert, update, delete, func, tuple_, text, table, column
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-from models import Product
-from schemas.product import ProductCreate, ProductUpdate
+from typing import AsyncIterator, List, Optional, Sequence
+from models import Order, Product, order_product
+from repositories.statistics import estimate_row_count
+from schemas.product import ProductCreate, ProductUpdate, ProductImport
+from schemas.pagination import Cursor
+
+# Временная таблица для COPY: живёт в рамках соединения, очищается на COMMIT
+PRODUCT_STAGING_TABLE = "products_import"
+PRODUCT_UPSERT_COLUMNS = ("id", "name", "description", "price", "stock_quantity", "created_at")
 
 class ProductRepository:
     def __init__(self, session: AsyncSession):
@@ -13,45 +22,145 @@ class ProductRepository:
         result = await self.session.execute(select(Product).where(Product.id == product_id))
         return result.scalar_one_or_none()
 
-    async def get_all(self, count: int = 10, page: int = 1) -> List[Product]:
-        offset = (page - 1) * count
-        result = await self.session.execute(select(Product).offset(offset).limit(count))
+    async def stream_ids(self, chunk_size: int = 10000) -> AsyncIterator[List[str]]:
+        """Все id продуктов пачками по chunk_size (серверный курсор) — для пересборки фильтра id"""
+        result = await self.session.stream(select(Product.id).execution_options(yield_per=chunk_size))
+        async for partition in result.partitions():
+            yield [product_id for (product_id,) in partition]
+
+    async def get_all(
+        self, count: int = 10, page: int = 1, after: Optional[Cursor] = None
+    ) -> List[Product]:
+        query = select(Product).order_by(Product.created_at, Product.id)
+        if after:
+            # keyset-пагинация: продолжаем сразу после (created_at, id)
+            query = query.where(tuple_(Product.created_at, Product.id) > tuple_(*after))
+        else:
+            query = query.offset((page - 1) * count)
+        result = await self.session.execute(query.limit(count))
         return result.scalars().all()
 
     async def create(self, product_data: ProductCreate) -> Product:
-        product = Product(
-            name=product_data.name,
-            description=product_data.description,
-            price=product_data.price,
-            stock_quantity=product_data.stock_quantity
+        # INSERT ... RETURNING вместо add + commit + refresh: один запрос вместо двух
+        result = await self.session.execute(
+            insert(Product)
+            .values(
+                name=product_data.name,
+                description=product_data.description,
+                price=product_data.price,
+                stock_quantity=product_data.stock_quantity,
+            )
+            .returning(Product)
         )
-        self.session.add(product)
+        product = result.scalar_one()
         await self.session.commit()
-        await self.session.refresh(product)
         return product
 
-    async def update(self, product_id: str, product_data: ProductUpdate) -> Optional[Product]:
-        product = await self.get_by_id(product_id)
-        if not product:
-            return None
+    async def upsert_many(self, rows: Sequence[ProductImport]) -> List[str]:
+        """Вставить или обновить пачку продуктов одной транзакцией (upsert по id).
 
-        update_data = product_data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            if hasattr(product, field):
-                setattr(product, field, value)
+        На PostgreSQL строки грузятся через COPY (asyncpg copy_records_to_table)
+        во временную таблицу и сливаются в products одним
+        INSERT ... SELECT ... ON CONFLICT (id) DO UPDATE. На других БД
+        (SQLite в тестах) — тот же upsert через INSERT ... VALUES.
+        Возвращает id всех записанных продуктов.
+        """
+        now = datetime.now()
+        # Повтор id внутри пачки: побеждает последняя строка
+        records = {}
+        for row in rows:
+            product_id = row.id or str(uuid.uuid4())
+            records[product_id] = (
+                product_id, row.name, row.description, row.price, row.stock_quantity, now,
+            )
+        if not records:
+            return []
+
+        if self.session.get_bind().dialect.name == "postgresql":
+            await self._copy_upsert(list(records.values()), now)
+        else:
+            stmt = sqlite.insert(Product).values(
+                [dict(zip(PRODUCT_UPSERT_COLUMNS, record)) for record in records.values()]
+            )
+            await self.session.execute(self._on_conflict_update(stmt, now))
 
         await self.session.commit()
-        await self.session.refresh(product)
+        return list(records)
+
+    async def _copy_upsert(self, records: List[tuple], now: datetime) -> None:
+        await self.session.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {PRODUCT_STAGING_TABLE} "
+            "(LIKE products INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        ))
+        # COPY идёт через то же соединение asyncpg, что и текущая транзакция сессии
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            PRODUCT_STAGING_TABLE, records=records, columns=PRODUCT_UPSERT_COLUMNS,
+        )
+
+        staging = table(PRODUCT_STAGING_TABLE, *(column(name) for name in PRODUCT_UPSERT_COLUMNS))
+        stmt = postgresql.insert(Product).from_select(PRODUCT_UPSERT_COLUMNS, select(staging))
+        await self.session.execute(self._on_conflict_update(stmt, now))
+
+    @staticmethod
+    def _on_conflict_update(stmt, now: datetime):
+        """ON CONFLICT (id) DO UPDATE: перезаписываем поля товара и updated_at = now, created_at не трогаем."""
+        return stmt.on_conflict_do_update(
+            index_elements=[Product.id],
+            set_={
+                "name": stmt.excluded.name,
+                "description": stmt.excluded.description,
+                "price": stmt.excluded.price,
+                "stock_quantity": stmt.excluded.stock_quantity,
+                "updated_at": now,
+            },
+        )
+
+    async def update(self, product_id: str, product_data: ProductUpdate) -> Optional[Product]:
+        update_data = {
+            field: value for field, value in product_data.model_dump(exclude_unset=True).items()
+            if hasattr(Product, field)
+        }
+        if not update_data:
+            return await self.get_by_id(product_id)
+
+        # UPDATE ... RETURNING: запись и чтение результата за один запрос
+        result = await self.session.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(**update_data)
+            .returning(Product)
+            .execution_options(populate_existing=True)
+        )
+        product = result.scalar_one_or_none()
+        await self.session.commit()
         return product
 
     async def delete(self, product_id: str) -> bool:
-        product = await self.get_by_id(product_id)
-        if not product:
-            return False
-        await self.session.delete(product)
+        # Как и при session.delete: сначала убираем продукт из заказов (order_product)
+        result = await self.session.execute(
+            delete(order_product)
+            .where(order_product.c.product_id == product_id)
+            .returning(order_product.c.order_id)
+        )
+        order_ids = result.scalars().all()
+        if order_ids:
+            # Состав этих заказов изменился: сдвигаем updated_at, чтобы
+            # инкрементальные отчёты пересчитали их
+            await self.session.execute(
+                update(Order).where(Order.id.in_(order_ids)).values(updated_at=datetime.now())
+            )
+        result = await self.session.execute(
+            delete(Product).where(Product.id == product_id).returning(Product.id)
+        )
+        deleted = result.scalar_one_or_none() is not None
         await self.session.commit()
-        return True
+        return deleted
 
     async def get_total_count(self) -> int:
-        result = await self.session.execute(select(Product))
-        return len(result.scalars().all())
\ No newline at end of file
+        result = await self.session.execute(select(func.count()).select_from(Product))
+        return result.scalar_one()
+
+    async def get_estimated_count(self) -> Optional[int]:
+        return await estimate_row_count(self.session, Product.__tablename__)
@@ -1,23 +1,274 @@
 # repositories/report_repository.py
-from datetime import date, datetime
-from sqlalchemy import select, func, cast, Date
+import uuid
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import select, insert, update, func, and_, or_, text, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from models import Report
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+from models import Order, Report, ReportWatermark, order_product, REPORT_DEFAULT_PARTITION
+from schemas.pagination import Cursor
+
+# Размер пачки при потоковом расчёте и записи отчётов
+REPORT_CHUNK_SIZE = 5000
+REPORT_COPY_COLUMNS = ("id", "report_at", "order_id", "count_product")
+
+# Дневные секции reports называются reports_pYYYYMMDD
+REPORT_PARTITION_PREFIX = "reports_p"
+REPORT_PARTITION_DATE_FORMAT = "%Y%m%d"
+# Ключ advisory-блокировки: обслуживание секций не должно идти параллельно
+REPORT_PARTITIONS_LOCK_KEY = 0x7265706f  # "repo"
+
+
+def partition_name(day: date) -> str:
+    return f"{REPORT_PARTITION_PREFIX}{day.strftime(REPORT_PARTITION_DATE_FORMAT)}"
 
 
 class ReportRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_by_date(self, report_date: date) -> List[Report]:
-        """Получить все отчёты за указанную дату.
+    async def get_by_date(
+        self,
+        report_date: date,
+        count: Optional[int] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[Report]:
+        """Получить отчёты за указанную дату (от новых к старым).
+
+        Дата превращается в полуинтервал [00:00 дня, 00:00 следующего дня),
+        см. get_by_range.
+        """
+        start = datetime.combine(report_date, time.min)
+        return await self.get_by_range(start, start + timedelta(days=1), count=count, after=after)
+
+    async def get_by_range(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        count: Optional[int] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[Report]:
+        """Получить отчёты с start <= report_at < end (от новых к старым).
+
+        Условие на сам столбец, а не на CAST(report_at AS DATE), поэтому
+        работает диапазонный скан по индексу (report_at, id). None — граница
+        не задана. В PostgreSQL границы заодно отсекают лишние дневные секции
+        (partition pruning). Если задан count, возвращается не больше count отчётов;
+        after=(report_at, id) — keyset-курсор на продолжение после последнего
+        выданного отчёта.
+        """
+        query = select(Report).order_by(Report.report_at.desc(), Report.id.desc())
+        if start is not None:
+            query = query.where(Report.report_at >= start)
+        if end is not None:
+            query = query.where(Report.report_at < end)
+        if after:
+            # Условие на report_at дублируем отдельно: по сравнению кортежей
+            # PostgreSQL не умеет отсекать секции
+            query = query.where(
+                Report.report_at <= after[0],
+                tuple_(Report.report_at, Report.id) < tuple_(*after),
+            )
+        if count:
+            query = query.limit(count)
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def count_products_by_order(
+        self,
+        changed_since: Optional[datetime] = None,
+        changed_until: Optional[datetime] = None,
+    ) -> List[Tuple[str, int]]:
+        """Количество товаров в каждом заказе: [(order_id, count_product)].
 
-        Сравниваем DATE(report_at) с переданной датой.
+        Без changed_since считаются все заказы. С changed_since — только
+        заказы, созданные или изменённые в (changed_since, changed_until]:
+        по индексам на orders.created_at и orders.updated_at, то есть за
+        O(изменений), а не O(всех заказов).
         """
         result = await self.session.execute(
-            select(Report).where(
-                cast(Report.report_at, Date) == report_date
-            ).order_by(Report.report_at.desc())
+            self._products_by_order_query(changed_since, changed_until)
+        )
+        return [(order_id, int(count_product or 0)) for order_id, count_product in result.all()]
+
+    async def stream_products_by_order(
+        self,
+        changed_since: Optional[datetime] = None,
+        changed_until: Optional[datetime] = None,
+        chunk_size: int = REPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[List[Tuple[str, int]]]:
+        """То же, что count_products_by_order, но пачками по chunk_size строк.
+
+        Строки читаются серверным курсором (session.stream), поэтому в памяти
+        одновременно не больше одной пачки, сколько бы ни было заказов.
+        Курсор живёт в транзакции сессии — писать отчёты нужно другой сессией.
+        """
+        query = self._products_by_order_query(changed_since, changed_until)
+        result = await self.session.stream(query.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions():
+            yield [(order_id, int(count_product or 0)) for order_id, count_product in partition]
+
+    async def create_many(self, counts: Sequence[Tuple[str, int]], report_at: datetime) -> List[str]:
+        """Записать пачку отчётов [(order_id, count_product)] одной операцией и закоммитить.
+
+        На PostgreSQL — через COPY (asyncpg copy_records_to_table), строки сами
+        раскладываются по дневным секциям. На других БД (SQLite в тестах) —
+        одним INSERT ... VALUES. id генерируются на стороне приложения, поэтому
+        RETURNING не нужен. Возвращает id отчётов в порядке counts.
+        """
+        records = [
+            (str(uuid.uuid4()), report_at, order_id, count_product)
+            for order_id, count_product in counts
+        ]
+        if not records:
+            return []
+
+        if self.session.get_bind().dialect.name == "postgresql":
+            # COPY идёт через то же соединение asyncpg, что и текущая транзакция сессии
+            connection = await self.session.connection()
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                Report.__tablename__, records=records, columns=REPORT_COPY_COLUMNS,
+            )
+        else:
+            await self.session.execute(
+                insert(Report).values([dict(zip(REPORT_COPY_COLUMNS, record)) for record in records])
+            )
+
+        await self.session.commit()
+        return [record[0] for record in records]
+
+    @staticmethod
+    def _products_by_order_query(
+        changed_since: Optional[datetime], changed_until: Optional[datetime]
+    ):
+        # SELECT orders.id, COALESCE(SUM(quantity), 0) FROM orders
+        # LEFT JOIN order_product ... [WHERE изменён в окне] GROUP BY orders.id
+        query = (
+            select(
+                Order.id,
+                func.coalesce(func.sum(order_product.c.quantity), 0).label("count_product"),
+            )
+            .join(order_product, order_product.c.order_id == Order.id, isouter=True)
+            .group_by(Order.id)
+        )
+        if changed_since is not None:
+            created = [Order.created_at > changed_since]
+            updated = [Order.updated_at > changed_since]
+            if changed_until is not None:
+                created.append(Order.created_at <= changed_until)
+                updated.append(Order.updated_at <= changed_until)
+            query = query.where(or_(and_(*created), and_(*updated)))
+        return query
+
+    async def get_watermark(self, name: str) -> Optional[datetime]:
+        """Прочитать отметку и заблокировать её строку до конца транзакции,
+        чтобы два параллельных запуска не посчитали одни и те же изменения."""
+        result = await self.session.execute(
+            select(ReportWatermark.value)
+            .where(ReportWatermark.name == name)
+            .with_for_update()
+        )
+        return result.scalar_one_or_none()
+
+    async def set_watermark(self, name: str, value: datetime) -> None:
+        """Сохранить отметку (без commit: фиксируется вместе с отчётами)."""
+        result = await self.session.execute(
+            update(ReportWatermark)
+            .where(ReportWatermark.name == name)
+            .values(value=value)
+            .returning(ReportWatermark.name)
+        )
+        if result.scalar_one_or_none() is None:
+            await self.session.execute(insert(ReportWatermark).values(name=name, value=value))
+
+    # ===== Секции reports (только PostgreSQL) =====
+
+    async def get_partition_days(self) -> List[date]:
+        """Дни, для которых созданы дневные секции (по возрастанию).
+
+        Возвращает пустой список, если БД не PostgreSQL.
+        """
+        if self.session.get_bind().dialect.name != "postgresql":
+            return []
+        result = await self.session.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table_name)"
+        ), {"table_name": Report.__tablename__})
+        days = []
+        for name in result.scalars():
+            if name.startswith(REPORT_PARTITION_PREFIX):
+                suffix = name[len(REPORT_PARTITION_PREFIX):]
+                days.append(datetime.strptime(suffix, REPORT_PARTITION_DATE_FORMAT).date())
+        return sorted(days)
+
+    async def ensure_partitions(self, first_day: date, days: int) -> List[str]:
+        """Создать недостающие дневные секции на days дней начиная с first_day.
+
+        Строки, которые уже успели попасть в секцию по умолчанию за эти дни,
+        переносятся в новую секцию (иначе ATTACH PARTITION не пройдёт).
+        Возвращает имена созданных секций.
+        """
+        if self.session.get_bind().dialect.name != "postgresql":
+            return []
+
+        await self._lock_partitions()
+        existing = set(await self.get_partition_days())
+        created = []
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            if day in existing:
+                continue
+            name = partition_name(day)
+            start = datetime.combine(day, time.min)
+            bounds = {"start": start, "end": start + timedelta(days=1)}
+            await self.session.execute(text(
+                f"CREATE TABLE {name} (LIKE {Report.__tablename__} INCLUDING DEFAULTS)"
+            ))
+            await self.session.execute(text(
+                f"WITH moved AS ("
+                f"  DELETE FROM {REPORT_DEFAULT_PARTITION}"
+                f"  WHERE report_at >= :start AND report_at < :end RETURNING *"
+                f") INSERT INTO {name} SELECT * FROM moved"
+            ), bounds)
+            await self.session.execute(text(
+                f"ALTER TABLE {Report.__tablename__} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+            ))
+            created.append(name)
+        await self.session.commit()
+        return created
+
+    async def drop_partitions_before(self, cutoff: date, detach: bool = False) -> List[str]:
+        """Удалить секции за дни раньше cutoff (retention).
+
+        detach=True — только отсоединить секции (таблицы остаются для архива).
+        Старые строки из секции по умолчанию удаляются в любом случае.
+        Возвращает имена обработанных секций.
+        """
+        if self.session.get_bind().dialect.name != "postgresql":
+            return []
+
+        await self._lock_partitions()
+        removed = []
+        for day in await self.get_partition_days():
+            if day >= cutoff:
+                break
+            name = partition_name(day)
+            if detach:
+                await self.session.execute(text(f"ALTER TABLE {Report.__tablename__} DETACH PARTITION {name}"))
+            else:
+                await self.session.execute(text(f"DROP TABLE {name}"))
+            removed.append(name)
+        await self.session.execute(
+            text(f"DELETE FROM {REPORT_DEFAULT_PARTITION} WHERE report_at < :cutoff"),
+            {"cutoff": datetime.combine(cutoff, time.min)},
+        )
+        await self.session.commit()
+        return removed
+
+    async def _lock_partitions(self) -> None:
+        """Блокировка до конца транзакции: два воркера не создают одну секцию дважды."""
+        await self.session.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": REPORT_PARTITIONS_LOCK_KEY}
         )
-        return result.scalars().all()
@@ -0,0 +1,24 @@
+# repositories/statistics.py
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def estimate_row_count(session: AsyncSession, table_name: str) -> Optional[int]:
+    """Примерное количество строк таблицы по статистике планировщика PostgreSQL.
+
+    Читает pg_class.reltuples (обновляется VACUUM/ANALYZE), поэтому работает
+    за O(1) независимо от размера таблицы. Возвращает None, если БД не PostgreSQL
+    или статистика по таблице ещё не собрана — тогда нужно считать через COUNT(*).
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return None
+
+    result = await session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {"table_name": table_name},
+    )
+    estimate = result.scalar_one_or_none()
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
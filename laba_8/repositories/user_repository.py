@@ -1,9 +1,11 @@
 # repositories/user_repository.py
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, Iterable, List, Optional, Dict, Any, Set
 from models import User
+from repositories.statistics import estimate_row_count
 from schemas.user import UserCreate, UserUpdate
+from schemas.pagination import Cursor
 
 
 class UserRepository:
@@ -17,69 +19,102 @@ class UserRepository:
         )
         return result.scalar_one_or_none()
 
-    async def get_by_filter(self, count: int = 10, page: int = 1, **kwargs) -> List[User]:  
-        """Получить пользователей по фильтру с пагинацией"""
-        query = select(User)
+    async def get_by_filter(
+        self, count: int = 10, page: int = 1, after: Optional[Cursor] = None, **kwargs
+    ) -> List[User]:  
+        """Получить пользователей по фильтру с пагинацией
 
-        # Применяем фильтры
-        if kwargs:
-            for key, value in kwargs.items():
-                if hasattr(User, key) and value is not None:
-                    query = query.where(getattr(User, key) == value)
+        Если передан after=(created_at, id), используется keyset-пагинация
+        (индекс ix_users_created_at_id), иначе — OFFSET по номеру страницы.
+        """
+        query = self._apply_filters(select(User), **kwargs)
+        query = query.order_by(User.created_at, User.id)
 
         # Применяем пагинацию
-        offset = (page - 1) * count
-        query = query.offset(offset).limit(count)
+        if after:
+            query = query.where(tuple_(User.created_at, User.id) > tuple_(*after))
+        else:
+            query = query.offset((page - 1) * count)
+        query = query.limit(count)
 
         result = await self.session.execute(query)
         return result.scalars().all()
 
+    async def get_existing_ids(self, user_ids: Iterable[str]) -> Set[str]:
+        """Какие из переданных ID пользователей существуют (один запрос на весь набор)"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return set()
+        result = await self.session.execute(select(User.id).where(User.id.in_(user_ids)))
+        return set(result.scalars().all())
+
+    async def stream_ids(self, chunk_size: int = 10000) -> AsyncIterator[List[str]]:
+        """Все ID пользователей пачками по chunk_size (серверный курсор) — для пересборки фильтра id"""
+        result = await self.session.stream(select(User.id).execution_options(yield_per=chunk_size))
+        async for partition in result.partitions():
+            yield [user_id for (user_id,) in partition]
+
     async def create(self, user_data: UserCreate) -> User:  
-        """Создать нового пользователя"""
-        user = User(
-            username=user_data.username,
-            email=user_data.email
+        """Создать нового пользователя одним INSERT ... RETURNING"""
+        # id и created_at заполняются default'ами модели и сразу возвращаются,
+        # поэтому повторный SELECT (refresh) после коммита не нужен
+        result = await self.session.execute(
+            insert(User)
+            .values(username=user_data.username, email=user_data.email)
+            .returning(User)
         )
-        self.session.add(user)
+        user = result.scalar_one()
         await self.session.commit()
-        await self.session.refresh(user)
         return user
 
     async def update(self, user_id: str, user_data: UserUpdate) -> Optional[User]:  
-        """Обновить пользователя"""
-        user = await self.get_by_id(user_id)
-        if not user:
-            return None
-
+        """Обновить пользователя одним UPDATE ... RETURNING (None, если его нет)"""
         # Обновляем только переданные поля
-        update_data = user_data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            if hasattr(user, field):
-                setattr(user, field, value)
+        update_data = {
+            field: value for field, value in user_data.model_dump(exclude_unset=True).items()
+            if hasattr(User, field)
+        }
+        if not update_data:
+            return await self.get_by_id(user_id)
 
+        result = await self.session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(**update_data)
+            .returning(User)
+            .execution_options(populate_existing=True)
+        )
+        user = result.scalar_one_or_none()
         await self.session.commit()
-        await self.session.refresh(user)
         return user
 
     async def delete(self, user_id: str) -> bool:  
-        """Удалить пользователя"""
-        user = await self.get_by_id(user_id)
-        if not user:
-            return False
-
-        await self.session.delete(user)
+        """Удалить пользователя одним DELETE ... RETURNING"""
+        result = await self.session.execute(
+            delete(User).where(User.id == user_id).returning(User.id)
+        )
+        deleted = result.scalar_one_or_none() is not None
         await self.session.commit()
-        return True
+        return deleted
 
     async def get_total_count(self, **kwargs) -> int:  
-        """Получить общее количество пользователей (для задания со звездочкой)"""
-        query = select(User)
-
-        # Применяем фильтры
-        if kwargs:
-            for key, value in kwargs.items():
-                if hasattr(User, key) and value is not None:
-                    query = query.where(getattr(User, key) == value)
+        """Получить общее количество пользователей (для задания со звездочкой)
 
+        Считаем через COUNT(*) с теми же фильтрами, что и get_by_filter,
+        не загружая сами строки.
+        """
+        query = self._apply_filters(select(func.count()).select_from(User), **kwargs)
         result = await self.session.execute(query)
-        return len(result.scalars().all())
\ No newline at end of file
+        return result.scalar_one()
+
+    async def get_estimated_count(self) -> Optional[int]:
+        """Примерное количество пользователей по статистике PostgreSQL (без фильтров)"""
+        return await estimate_row_count(self.session, User.__tablename__)
+
+    @staticmethod
+    def _apply_filters(query, **kwargs):
+        """Применить фильтры вида поле=значение (None пропускаем)"""
+        for key, value in kwargs.items():
+            if hasattr(User, key) and value is not None:
+                query = query.where(getattr(User, key) == value)
+        return query
@@ -1,11 +1,26 @@
 # schemas/order.py
-from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from collections import Counter
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Optional
+
+# Штук одного товара в позиции заказа из очереди
+ORDER_ITEM_MAX_QUANTITY = 10_000
 
 class OrderCreate(BaseModel):
     user_id: str
     product_ids: List[str]  # ID продуктов, которые добавляются в заказ
 
+    def quantities(self) -> Dict[str, int]:
+        """Количество каждого товара: одинаковые product_ids = несколько штук"""
+        return dict(Counter(self.product_ids))
+
+class OrderItemsCreate(OrderCreate):
+    """Заказ с количествами числами (из очереди): product_ids без повторов"""
+    product_quantities: Dict[str, int]
+
+    def quantities(self) -> Dict[str, int]:
+        return dict(self.product_quantities)
+
 class OrderUpdate(BaseModel):
     status: Optional[str] = None
 
@@ -13,4 +28,35 @@ class OrderResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: str
     user_id: str
-    status: str
\ No newline at end of file
+    status: str
+
+class OrderBulkResult(BaseModel):
+    index: int  # позиция заказа во входном массиве / строка NDJSON (с нуля)
+    order_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class OrderMessageItem(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+    product_id: str
+    quantity: int = Field(default=1, ge=1, le=ORDER_ITEM_MAX_QUANTITY)
+
+class OrderMessage(BaseModel):
+    """Заказ из очереди RabbitMQ "order" (формат producer.py)."""
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+    id: Optional[str] = None  # id у отправителя, в БД заказ получает свой uuid
+    user_id: str
+    items: List[OrderMessageItem]
+    status: Optional[str] = None
+
+    def to_order_create(self) -> OrderItemsCreate:
+        # Количества передаются числами, а не повторами product_id: размер
+        # заказа в памяти не зависит от quantity
+        quantities: Counter = Counter()
+        for item in self.items:
+            quantities[item.product_id] += item.quantity
+        return OrderItemsCreate(
+            user_id=self.user_id,
+            product_ids=list(quantities),
+            product_quantities=dict(quantities),
+        )
@@ -0,0 +1,35 @@
+# schemas/pagination.py
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+# Позиция в keyset-пагинации: (created_at, id) последней выданной строки
+Cursor = Tuple[datetime, str]
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Упаковать позицию (created_at, id) в непрозрачный токен для ?after="""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """Распаковать токен ?after= обратно в (created_at, id).
+
+    Бросает ValueError, если токен повреждён.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+
+
+def next_cursor(rows: Sequence, count: int, field: str = "created_at") -> Optional[str]:
+    """Курсор на следующую страницу или None, если страница неполная (дальше пусто)."""
+    if not rows or len(rows) < count:
+        return None
+    last = rows[-1]
+    return encode_cursor(getattr(last, field), last.id)
@@ -1,7 +1,11 @@
 # schemas/product.py
-from pydantic import BaseModel, ConfigDict
+import msgspec
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 from typing import Optional
 
+# products.stock_quantity — INTEGER: больше — ошибка строки, а не сбой всей пачки в БД
+STOCK_QUANTITY_MAX = 2**31 - 1
+
 class ProductCreate(BaseModel):
     name: str
     description: Optional[str] = None
@@ -20,4 +24,28 @@ class ProductResponse(BaseModel):
     name: str
     description: Optional[str] = None
     price: float
-    stock_quantity: int
\ No newline at end of file
+    stock_quantity: int
+
+class ProductCached(msgspec.Struct, kw_only=True):
+    """ProductResponse в кэше (кодеки msgspec): те же поля, отдаётся клиенту как есть"""
+    id: str
+    name: str
+    description: Optional[str] = None
+    price: float
+    stock_quantity: int
+
+class ProductImport(BaseModel):
+    """Строка импорта: с id — обновить существующий продукт (upsert), без id — создать новый"""
+    id: Optional[str] = Field(default=None, max_length=36)
+    name: str = Field(max_length=100)
+    description: Optional[str] = Field(default=None, max_length=500)
+    price: float = Field(gt=0)
+    stock_quantity: int = Field(ge=0, le=STOCK_QUANTITY_MAX)
+
+
+class ProductMessage(ProductImport):
+    """Продукт из очереди RabbitMQ "product" (формат producer.py: остаток в поле quantity)"""
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+    stock_quantity: int = Field(
+        ge=0, le=STOCK_QUANTITY_MAX, validation_alias=AliasChoices("stock_quantity", "quantity"),
+    )
@@ -1,4 +1,5 @@
 # schemas/user.py
+import msgspec
 from pydantic import BaseModel, EmailStr, ConfigDict
 from typing import Optional
 
@@ -14,4 +15,10 @@ class UserResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: str
     username: str
-    email: str
\ No newline at end of file
+    email: str
+
+class UserCached(msgspec.Struct):
+    """UserResponse в кэше (кодеки msgspec): те же поля, отдаётся клиенту как есть"""
+    id: str
+    username: str
+    email: str
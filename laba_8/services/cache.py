@@ -0,0 +1,586 @@
+# services/cache.py
+"""Двухуровневый кэш чтений по id: L1 в памяти процесса + L2 в Redis.
+
+L1 (LocalCache) — LRU с TTL и ограничением по числу записей и по байтам,
+один на пространство имён ("user", "product") на процесс: сервисы создаются
+на каждый запрос, а L1 переживает их. Горячий объект отдаётся из L1 без
+похода в Redis и без разбора записи.
+
+Согласованность между экземплярами: update/delete пишут в Redis и публикуют
+ключи в канал cache:invalidate (тем же pipeline), а CacheInvalidationListener
+каждого процесса удаляет их из своего L1. Сообщение может потеряться при
+обрыве соединения — тогда L1 очищается целиком при переподписке, а короткий
+LOCAL_CACHE_TTL_SECONDS ограничивает устаревание в худшем случае.
+
+Запись в Redis живёт ttl + stale_ttl секунд и несёт мягкий срок ttl:
+"<soft_expires_at>|<delta>|<payload>", где delta — сколько длилась загрузка
+из БД, а payload — значение в формате кодека (services/cache_codecs.py). После мягкого срока (или раньше, с вероятностью по XFetch:
+now - delta·beta·ln(rand) ≥ soft_expires_at) чтение сразу отдаёт текущее
+значение, а обновление уходит в фон — ключ обновляется до того, как
+истечёт, и задержка не скачет на границе TTL.
+
+Отсутствующий id тоже кэшируется: надгробие "<soft>|0|null" на
+CACHE_NEGATIVE_TTL_SECONDS, в L1 — MISSING. create снимает надгробие сразу
+(и в L1 других экземпляров через тот же канал). С IdFilter (фильтр Блума
+существующих id) заведомо несуществующие id отсекаются тем же round-trip,
+что и чтение значения, — без запроса в БД.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from services.cache_codecs import MsgspecJsonCodec, MsgspecMsgpackCodec, PydanticCodec
+from services.id_filter import IdFilter
+
+CACHE_KEY_PREFIX = "cache:"
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "10000"))
+LOCAL_CACHE_MAX_BYTES = int(os.getenv("LOCAL_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+LOCAL_CACHE_TTL_SECONDS = float(os.getenv("LOCAL_CACHE_TTL_SECONDS", "30"))
+INVALIDATION_RECONNECT_DELAY_SECONDS = 1.0
+# Блокировка загрузки из БД при промахе: дольше — ожидающие идут в БД сами
+CACHE_LOCK_PREFIX = "lock:"
+CACHE_LOCK_TTL_MS = int(os.getenv("CACHE_LOCK_TTL_MS", "2000"))
+CACHE_LOCK_POLL_MS = int(os.getenv("CACHE_LOCK_POLL_MS", "20"))
+# Сколько после мягкого срока ещё можно отдавать устаревшее значение, пока идёт обновление
+CACHE_STALE_TTL_SECONDS = int(os.getenv("CACHE_STALE_TTL_SECONDS", "300"))
+# beta XFetch: больше — раньше обновление; 0 — только после мягкого срока
+CACHE_XFETCH_BETA = float(os.getenv("CACHE_XFETCH_BETA", "1.0"))
+# Надгробия несуществующих id живут недолго: create их снимает, а TTL
+# ограничивает ошибку, если строку вставили в обход сервиса
+CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv("CACHE_NEGATIVE_TTL_SECONDS", "30"))
+TOMBSTONE = "null"
+TOMBSTONE_SIZE = 64  # условный размер надгробия в L1
+
+# Надгробие в L1: «объекта нет», в отличие от None — «в L1 ничего нет»
+MISSING = object()
+# Запись в Redis, которую кодек не разобрал (другой CACHE_CODEC): считается промахом
+UNREADABLE = object()
+
+# Снять блокировку, только если она ещё наша (не истекла и не взята другим)
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Метка процесса в сообщениях инвалидации: свои сообщения слушатель пропускает
+INSTANCE_ID = uuid.uuid4().hex
+
+CacheCodec = Union[MsgspecJsonCodec, MsgspecMsgpackCodec, PydanticCodec]
+# Поколение ключа в L1: (эпоха всего кэша, счётчик инвалидаций ключа)
+Generation = Tuple[int, int]
+
+
+class LocalCache:
+    """LRU-кэш процесса с TTL и учётом размера записей.
+
+    Размер записи — длина её закодированного значения в байтах (приближение
+    реального объёма объекта в памяти). Здесь же счётчики попаданий обоих уровней: L1 общий
+    для всех запросов процесса, а TwoTierCache живёт один запрос.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = LOCAL_CACHE_MAX_ENTRIES,
+        max_bytes: int = LOCAL_CACHE_MAX_BYTES,
+        ttl: float = LOCAL_CACHE_TTL_SECONDS,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self.bytes = 0
+        # Поколения ключей растут при их инвалидации и записи (replace), эпоха —
+        # при очистке всего L1: значение, прочитанное из Redis или БД до
+        # инвалидации его ключа, в L1 уже не кладём (оно могло устареть, пока
+        # ждали ответа). Инвалидации других ключей загрузку не задевают.
+        self.epoch = 0
+        self._generations: Dict[str, int] = {}
+
+        # Загрузки по ключам, идущие сейчас: параллельные промахи ждут их
+        self.inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        # Фоновые обновления устаревающих ключей (ссылка держит задачу до конца)
+        self.refreshing: Dict[str, "asyncio.Task[None]"] = {}
+
+        self.l1_hits = 0
+        self.coalesced = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.lock_waits = 0
+        self.loads = 0
+        self.stale_hits = 0
+        self.early_refreshes = 0
+        self.refreshes = 0
+        self.negative_hits = 0
+        self.filter_rejects = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, _, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def generation(self, key: str) -> Generation:
+        return self.epoch, self._generations.get(key, 0)
+
+    def set(
+        self, key: str, value: Any, size: int, generation: Optional[Generation] = None, ttl: Optional[float] = None,
+    ) -> None:
+        if generation is not None and generation != self.generation(key):
+            return
+        if size > self.max_bytes:
+            return
+        self._pop(key)
+        self._entries[key] = (value, size, time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl)))
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._bump(key)
+        self.invalidations += 1
+        self._pop(key)
+
+    def replace(self, key: str, value: Any, size: int) -> None:
+        """Положить новое значение (после UPDATE): загрузки, начатые раньше, его не перезапишут."""
+        self._bump(key)
+        self.set(key, value, size, self.generation(key))
+
+    def _bump(self, key: str) -> None:
+        if key not in self._generations and len(self._generations) >= self.max_entries:
+            # Счётчики не копятся без конца: сброс с новой эпохой лишь не даст
+            # положить в L1 загрузки, идущие сейчас
+            self._generations.clear()
+            self.epoch += 1
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self) -> None:
+        self.epoch += 1
+        self._generations.clear()
+        self._entries.clear()
+        self.bytes = 0
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.l1_hits + self.coalesced + self.l2_hits + self.misses
+        l2_lookups = self.l2_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            # Промахи, дождавшиеся чужой загрузки: в процессе и через блокировку в Redis
+            "coalesced": self.coalesced,
+            "lock_waits": self.lock_waits,
+            "loads": self.loads,
+            # Отдано после мягкого срока / обновлено досрочно по XFetch / фоновых загрузок
+            "stale_hits": self.stale_hits,
+            "early_refreshes": self.early_refreshes,
+            "refreshes": self.refreshes,
+            # Ответы «нет такого id» без БД: по надгробию (L1 или Redis) / по фильтру id
+            "negative_hits": self.negative_hits,
+            "filter_rejects": self.filter_rejects,
+            # Доля L2 — среди запросов, дошедших до Redis
+            "l1_hit_ratio": round(self.l1_hits / lookups, 4) if lookups else 0.0,
+            "l2_hit_ratio": round(self.l2_hits / l2_lookups, 4) if l2_lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# L1 по пространствам имён — общие для всех сервисов процесса
+LOCAL_CACHES: Dict[str, LocalCache] = {}
+
+
+def local_cache(namespace: str) -> LocalCache:
+    cache = LOCAL_CACHES.get(namespace)
+    if cache is None:
+        cache = LOCAL_CACHES[namespace] = LocalCache(namespace)
+    return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {namespace: cache.stats() for namespace, cache in LOCAL_CACHES.items()}
+
+
+def _size(raw: Union[str, bytes]) -> int:
+    return len(raw) if isinstance(raw, bytes) else len(raw.encode())
+
+
+def _split_entry(raw: Union[str, bytes]) -> Tuple[float, float, Union[str, bytes]]:
+    """(soft_expires_at, delta, payload) записи Redis; запись без заголовка (JSON) — свежая до жёсткого TTL."""
+    if raw[:1] in ("{", b"{"):
+        return math.inf, 0.0, raw
+    soft_expires_at, delta, payload = raw.split("|" if isinstance(raw, str) else b"|", 2)
+    return float(soft_expires_at), float(delta), payload
+
+
+class TwoTierCache:
+    """Кэш объектов одной модели по id: сначала L1, затем Redis, затем loader.
+
+    Значения — то, что отдаёт codec.convert (Struct или модель pydantic).
+    Без Redis кэш выключен целиком: без канала инвалидации L1 нельзя
+    держать согласованным с другими экземплярами.
+
+    set/created/invalidate/refresh_many вызываются после коммита в БД и
+    ошибок Redis не бросают: запись уже прошла, сбой кэша только логируется,
+    а устаревание ограничивают TTL записей L1 и Redis.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[Redis],
+        namespace: str,
+        codec: CacheCodec,
+        ttl: int,
+        local: Optional[LocalCache] = None,
+        lock_ttl_ms: int = CACHE_LOCK_TTL_MS,
+        lock_poll_ms: int = CACHE_LOCK_POLL_MS,
+        stale_ttl: int = CACHE_STALE_TTL_SECONDS,
+        xfetch_beta: float = CACHE_XFETCH_BETA,
+        negative_ttl: int = CACHE_NEGATIVE_TTL_SECONDS,
+        id_filter: Optional[IdFilter] = None,
+    ):
+        self.redis = redis_client
+        self.namespace = namespace
+        self.codec = codec
+        # ttl — мягкий срок, в Redis ключ живёт ttl + stale_ttl
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.xfetch_beta = xfetch_beta
+        self.negative_ttl = negative_ttl
+        self.id_filter = id_filter
+        self.lock_ttl_ms = lock_ttl_ms
+        self.lock_poll_ms = lock_poll_ms
+        self.local = local if local is not None else local_cache(namespace)
+
+    def key(self, key: str) -> str:
+        return f"{CACHE_KEY_PREFIX}{self.namespace}:{key}"
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[Any]]],
+        refresh_loader: Optional[Callable[[], Awaitable[Optional[Any]]]] = None,
+    ) -> Optional[Any]:
+        """Объект из кэша или из loader() (ORM-объект из БД), положенный в оба уровня.
+
+        Промахи по одному ключу схлопываются: в процессе — общей задачей
+        загрузки, между экземплярами — блокировкой в Redis (см. _fetch).
+        refresh_loader — загрузка со своей сессией БД (по умолчанию loader):
+        ею идут общая загрузка и фоновое обновление. Обе переживают запрос,
+        начавший их, — сессия первого запроса может закрыться, пока результат
+        ждут остальные.
+        """
+        if not self.redis:
+            return await loader()
+
+        value = self.local.get(key)
+        if value is MISSING:
+            self.local.negative_hits += 1
+            return None
+        if value is not None:
+            self.local.l1_hits += 1
+            return value
+
+        task = self.local.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, refresh_loader or loader))
+            self.local.inflight[key] = task
+            task.add_done_callback(lambda _: self.local.inflight.pop(key, None))
+        else:
+            self.local.coalesced += 1
+        # shield: отмена одного запроса не отменяет загрузку, которую ждут остальные
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """Redis, а при промахе — БД под блокировкой lock:<ключ>.
+
+        Загружает тот, кто взял блокировку (SET NX PX); остальные опрашивают
+        ключ каждые CACHE_LOCK_POLL_MS, пока значение не появится. Если
+        блокировка пропала без значения (в БД объекта нет) — пробуют взять её
+        сами; если держатель завис дольше CACHE_LOCK_TTL_MS — идут в БД без неё.
+        """
+        generation = self.local.generation(key)
+        cache_key = self.key(key)
+        if self.id_filter:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                self.id_filter.check(pipe, key)
+                pipe.get(cache_key)
+                *bits, raw = await pipe.execute()
+            if self.id_filter.absent(bits):
+                self.local.filter_rejects += 1
+                self.local.set(key, MISSING, TOMBSTONE_SIZE, generation, ttl=self.negative_ttl)
+                return None
+        else:
+            raw = await self.redis.get(cache_key)
+        if raw is not None:
+            value = self._remember(key, raw, generation, loader)
+            if value is not UNREADABLE:
+                self.local.l2_hits += 1
+                return value
+
+        self.local.misses += 1
+        lock_key = f"{CACHE_LOCK_PREFIX}{cache_key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_ttl_ms / 1000
+        while time.monotonic() < deadline:
+            if await self.redis.set(lock_key, token, nx=True, px=self.lock_ttl_ms):
+                try:
+                    return await self._load(key, loader, generation)
+                finally:
+                    await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+            self.local.lock_waits += 1
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.lock_poll_ms / 1000)
+                raw, lock = await self.redis.mget(cache_key, lock_key)
+                if raw is not None:
+                    value = self._remember(key, raw, generation, loader)
+                    if value is not UNREADABLE:
+                        return value
+                if lock is None:
+                    break
+
+        return await self._load(key, loader, generation)
+
+    async def _load(
+        self, key: str, loader: Callable[[], Awaitable[Optional[Any]]], generation: Generation,
+    ) -> Optional[Any]:
+        self.local.loads += 1
+        started = time.monotonic()
+        loaded = await loader()
+        if loaded is None:
+            # Надгробие не ставим, если пока шёл запрос, ключ сбросили (например, create),
+            # и только на пустое место (NX): значение, записанное другим экземпляром
+            # после его create, надгробием не затираем
+            if generation == self.local.generation(key):
+                tombstone = f"{time.time() + self.negative_ttl:.3f}|0|{TOMBSTONE}"
+                if await self.redis.set(self.key(key), tombstone, ex=self.negative_ttl, nx=True):
+                    self.local.set(key, MISSING, TOMBSTONE_SIZE, generation, ttl=self.negative_ttl)
+            return None
+        value = self.codec.convert(loaded)
+        if generation != self.local.generation(key):
+            # Пока шёл запрос, ключ сбросили или записали (set): прочитанная
+            # строка может быть старше, в кэш её не кладём
+            return value
+        raw = self._encode(value, delta=time.monotonic() - started)
+        await self.redis.set(self.key(key), raw, ex=self.ttl + self.stale_ttl)
+        self.local.set(key, value, _size(raw), generation)
+        return value
+
+    def _remember(
+        self,
+        key: str,
+        raw: Union[str, bytes],
+        generation: Generation,
+        refresh_loader: Callable[[], Awaitable[Optional[Any]]],
+    ) -> Optional[Any]:
+        try:
+            soft_expires_at, delta, payload = _split_entry(raw)
+            if payload in (TOMBSTONE, TOMBSTONE.encode()):
+                self.local.negative_hits += 1
+                self.local.set(key, MISSING, TOMBSTONE_SIZE, generation, ttl=self.negative_ttl)
+                return None
+            value = self.codec.decode(payload)
+        except ValueError:
+            return UNREADABLE
+        self.local.set(key, value, _size(raw), generation)
+
+        now = time.time()
+        if now >= soft_expires_at:
+            self.local.stale_hits += 1
+            self._schedule_refresh(key, refresh_loader)
+        elif delta and now - delta * self.xfetch_beta * math.log(1.0 - random.random()) >= soft_expires_at:
+            # XFetch: чем ближе срок и чем дольше загрузка, тем вероятнее обновить заранее
+            if self._schedule_refresh(key, refresh_loader):
+                self.local.early_refreshes += 1
+        return value
+
+    def _schedule_refresh(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> bool:
+        if key in self.local.refreshing:
+            return False
+        task = asyncio.ensure_future(self._refresh(key, loader))
+        self.local.refreshing[key] = task
+        task.add_done_callback(lambda _: self.local.refreshing.pop(key, None))
+        return True
+
+    async def _refresh(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> None:
+        """Фоновая загрузка под той же блокировкой: обновляет один экземпляр, остальные пропускают."""
+        lock_key = f"{CACHE_LOCK_PREFIX}{self.key(key)}"
+        token = uuid.uuid4().hex
+        try:
+            if not await self.redis.set(lock_key, token, nx=True, px=self.lock_ttl_ms):
+                return
+            try:
+                self.local.refreshes += 1
+                if await self._load(key, loader, self.local.generation(key)) is None:
+                    # Объект удалён в обход сервиса: устаревшее значение удаляем (надгробие
+                    # поставит следующее чтение) и сбрасываем L1 остальных
+                    self.local.delete(key)
+                    async with self.redis.pipeline(transaction=False) as pipe:
+                        pipe.delete(self.key(key))
+                        self._publish_invalidation(pipe, [key])
+                        await pipe.execute()
+            finally:
+                await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            print(f"[cache] Фоновое обновление {self.key(key)} не удалось: {e!r}")
+
+    async def set(self, key: str, loaded: Any) -> None:
+        """Записать свежий объект (после UPDATE) и сбросить его в L1 других экземпляров."""
+        if not self.redis:
+            return
+        value = self.codec.convert(loaded)
+        raw = self._encode(value)
+        self.local.delete(key)
+        async with self._write_pipeline(f"Запись {self.key(key)}") as pipe:
+            pipe.set(self.key(key), raw, ex=self.ttl + self.stale_ttl)
+            self._publish_invalidation(pipe, [key])
+        self.local.replace(key, value, _size(raw))
+
+    async def created(self, key: str) -> None:
+        """Новый объект: снять надгробие (здесь и в L1 других экземпляров) и добавить id в фильтр."""
+        if not self.redis:
+            return
+        self.local.delete(key)
+        async with self._write_pipeline(f"Снятие надгробия {self.key(key)}") as pipe:
+            if self.id_filter:
+                self.id_filter.add(pipe, [key])
+            pipe.delete(self.key(key))
+            self._publish_invalidation(pipe, [key])
+
+    async def invalidate(self, key: str) -> None:
+        if not self.redis:
+            return
+        self.local.delete(key)
+        async with self._write_pipeline(f"Сброс {self.key(key)}") as pipe:
+            pipe.delete(self.key(key))
+            self._publish_invalidation(pipe, [key])
+
+    async def refresh_many(self, values: Dict[str, Any], written_keys: Iterable[str] = ()) -> None:
+        """Обновить уже закэшированные объекты пачки одним pipeline.
+
+        SET ... XX перезаписывает только ключи, которые уже есть в Redis
+        (в том числе надгробия): горячие объекты остаются в кэше со свежими
+        данными, а холодные (большая часть каталога при импорте) в Redis не
+        попадают. L1 всех экземпляров для этих ключей сбрасывается.
+        written_keys — все записанные id (и новые без values) для фильтра id.
+        """
+        written_keys = list(written_keys)
+        if not self.redis or not (values or written_keys):
+            return
+        for key in values:
+            self.local.delete(key)
+        async with self._write_pipeline(f"Обновление {len(written_keys) or len(values)} ключей {self.namespace}") as pipe:
+            if self.id_filter:
+                self.id_filter.add(pipe, written_keys)
+            for key, loaded in values.items():
+                raw = self._encode(self.codec.convert(loaded))
+                pipe.set(self.key(key), raw, ex=self.ttl + self.stale_ttl, xx=True)
+            if values:
+                self._publish_invalidation(pipe, list(values))
+
+    @asynccontextmanager
+    async def _write_pipeline(self, action: str) -> AsyncIterator[Any]:
+        """Pipeline записи после коммита: выполняется на выходе, ошибка Redis логируется."""
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                yield pipe
+                await pipe.execute()
+        except RedisError as e:
+            print(f"[cache] {action} не удалось: {e!r}")
+
+    def _encode(self, value: Any, delta: float = 0.0) -> bytes:
+        # delta = 0 (запись после UPDATE) — досрочного обновления по XFetch не будет
+        return f"{time.time() + self.ttl:.3f}|{delta:.4f}|".encode() + self.codec.encode(value)
+
+    def _publish_invalidation(self, pipe, keys: Iterable[str]) -> None:
+        message = {"source": INSTANCE_ID, "namespace": self.namespace, "keys": list(keys)}
+        pipe.publish(CACHE_INVALIDATION_CHANNEL, json.dumps(message))
+
+
+class CacheInvalidationListener:
+    """Подписка процесса на cache:invalidate: удаляет ключи из своих L1."""
+
+    def __init__(self, redis_client: Redis, caches: Optional[Dict[str, LocalCache]] = None):
+        self.redis = redis_client
+        self.caches = LOCAL_CACHES if caches is None else caches
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def apply(self, data: Union[str, bytes]) -> None:
+        message = json.loads(data)
+        if message.get("source") == INSTANCE_ID:
+            return
+        cache = self.caches.get(message.get("namespace"))
+        if cache is None:
+            return
+        for key in message.get("keys", ()):
+            cache.delete(key)
+
+    async def _run(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+                # Пока подписки не было, инвалидации могли пройти мимо
+                self._clear_all()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.apply(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[cache] Подписка на {CACHE_INVALIDATION_CHANNEL} оборвалась: {e!r}")
+                self._clear_all()
+                await asyncio.sleep(INVALIDATION_RECONNECT_DELAY_SECONDS)
+            finally:
+                await pubsub.aclose()
+
+    def _clear_all(self) -> None:
+        for cache in self.caches.values():
+            cache.clear()
@@ -0,0 +1,80 @@
+# services/cache_codecs.py
+"""Кодеки значений кэша (TwoTierCache): объект <-> байты записи в Redis.
+
+json (по умолчанию) и msgpack — msgspec.Struct (ProductCached, UserCached):
+разбор и сборка идут в C без промежуточного dict и без валидации pydantic,
+а Struct из кэша контроллер отдаёт как есть — Litestar кодирует его тем же
+msgspec. pydantic — прежний путь json.dumps(model_dump()) / model_validate_json,
+оставлен для сравнения (bench_cache_codecs).
+
+Записи json и pydantic читаются обоими кодеками. Запись другого кодека
+(после смены CACHE_CODEC) decode не разбирает (ValueError) — кэш считает её
+промахом и перезаписывает. msgpack — двоичный формат: для него нужен клиент
+Redis без decode_responses (main.py заводит отдельный).
+"""
+import json
+import os
+from typing import Any, Type, Union
+
+import msgspec
+from pydantic import BaseModel
+
+CACHE_CODEC = os.getenv("CACHE_CODEC", "json")  # json | msgpack | pydantic
+CACHE_CODECS = ("json", "msgpack", "pydantic")
+
+
+class MsgspecJsonCodec:
+    binary = False
+
+    def __init__(self, struct: Type[msgspec.Struct]):
+        self.struct = struct
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder(struct)
+
+    def convert(self, loaded: Any) -> msgspec.Struct:
+        """ORM-объект, модель pydantic или dict -> значение кэша."""
+        if isinstance(loaded, self.struct):
+            return loaded
+        return msgspec.convert(loaded, self.struct, from_attributes=True)
+
+    def encode(self, value: msgspec.Struct) -> bytes:
+        return self._encoder.encode(value)
+
+    def decode(self, payload: Union[str, bytes]) -> msgspec.Struct:
+        return self._decoder.decode(payload)
+
+
+class MsgspecMsgpackCodec(MsgspecJsonCodec):
+    binary = True
+
+    def __init__(self, struct: Type[msgspec.Struct]):
+        super().__init__(struct)
+        self._encoder = msgspec.msgpack.Encoder()
+        self._decoder = msgspec.msgpack.Decoder(struct)
+
+
+class PydanticCodec:
+    binary = False
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+
+    def convert(self, loaded: Any) -> BaseModel:
+        return self.model.model_validate(loaded)
+
+    def encode(self, value: BaseModel) -> bytes:
+        return json.dumps(value.model_dump()).encode()
+
+    def decode(self, payload: Union[str, bytes]) -> BaseModel:
+        return self.model.model_validate_json(payload)
+
+
+def cache_codec(struct: Type[msgspec.Struct], model: Type[BaseModel], name: str = CACHE_CODEC):
+    """Кодек по имени: для json/msgpack значения — struct, для pydantic — model."""
+    if name == "json":
+        return MsgspecJsonCodec(struct)
+    if name == "msgpack":
+        return MsgspecMsgpackCodec(struct)
+    if name == "pydantic":
+        return PydanticCodec(model)
+    raise ValueError(f"Unknown cache codec: {name}")
@@ -0,0 +1,219 @@
+# services/chunked_messages.py
+"""
+Передача большого списка записей (например, отчётов) пачками сообщений.
+
+Каждое сообщение — часть (chunk) одной логической пачки (batch) со своими
+заголовками: x-batch-id, x-chunk-seq (номер с 0) и x-chunk-last (у последней
+части). Тело — msgpack или JSON, при желании сжатое gzip или zstd
+(content_encoding сообщения). На стороне потребителя ChunkReassembler
+собирает части обратно в исходный список.
+"""
+import gzip
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+import msgspec
+
+from services.rabbit_publisher import RabbitPublisher
+
+try:  # zstd — необязательная зависимость (pip install zstandard)
+    import zstandard
+except ImportError:  # pragma: no cover - зависит от окружения
+    zstandard = None
+
+CONTENT_TYPES = {
+    "msgpack": "application/msgpack",
+    "json": "application/json",
+}
+CONTENT_ENCODINGS = ("gzip", "zstd")
+DEFAULT_CHUNK_MAX_ITEMS = 1000
+# gzip -1 почти вдвое быстрее -6 при размере больше лишь на ~8% (см. bench_report_messages)
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 3
+
+BATCH_ID_HEADER = "x-batch-id"
+CHUNK_SEQ_HEADER = "x-chunk-seq"
+CHUNK_LAST_HEADER = "x-chunk-last"
+
+
+def encode_chunk(items: Sequence[Any], fmt: str = "msgpack", encoding: Optional[str] = None) -> bytes:
+    """Сериализовать список записей в тело сообщения (и сжать, если задано encoding)."""
+    if fmt == "msgpack":
+        body = msgspec.msgpack.encode(items)
+    elif fmt == "json":
+        body = msgspec.json.encode(items)
+    else:
+        raise ValueError(f"Unknown message format: {fmt}")
+    return compress(body, encoding)
+
+
+def decode_chunk(body: bytes, content_type: Optional[str], content_encoding: Optional[str] = None) -> List[Any]:
+    """Обратное к encode_chunk: распаковать и десериализовать тело сообщения."""
+    body = decompress(body, content_encoding)
+    if content_type == CONTENT_TYPES["msgpack"]:
+        return msgspec.msgpack.decode(body)
+    # Сообщения без content_type — старый формат json.dumps(list)
+    return msgspec.json.decode(body)
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if not encoding:
+        return body
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    if encoding == "zstd":
+        return _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    raise ValueError(f"Unknown content encoding: {encoding}")
+
+
+def decompress(body: bytes, encoding: Optional[str]) -> bytes:
+    if not encoding:
+        return body
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "zstd":
+        return _zstd().ZstdDecompressor().decompress(body)
+    raise ValueError(f"Unknown content encoding: {encoding}")
+
+
+def _zstd():
+    if zstandard is None:
+        raise ValueError("zstd content encoding requires the 'zstandard' package")
+    return zstandard
+
+
+class ChunkedPublisher:
+    """Публикует поток записей в очередь частями по max_items.
+
+    write() можно вызывать много раз (например, на каждую пачку из БД):
+    полные части отправляются сразу, в памяти остаётся не больше двух частей.
+    Одна часть придерживается до следующей, чтобы последней можно было
+    поставить x-chunk-last. close() (или выход из async with) отправляет
+    остаток. Пустой поток не порождает ни одного сообщения.
+    """
+
+    def __init__(
+        self,
+        publisher: RabbitPublisher,
+        queue_name: str,
+        max_items: int = DEFAULT_CHUNK_MAX_ITEMS,
+        fmt: str = "msgpack",
+        encoding: Optional[str] = None,
+    ):
+        if fmt not in CONTENT_TYPES:
+            raise ValueError(f"Unknown message format: {fmt}")
+        if encoding and encoding not in CONTENT_ENCODINGS:
+            raise ValueError(f"Unknown content encoding: {encoding}")
+        if encoding == "zstd":
+            _zstd()
+        self.publisher = publisher
+        self.queue_name = queue_name
+        self.max_items = max_items
+        self.fmt = fmt
+        self.encoding = encoding
+        self.batch_id = str(uuid.uuid4())
+        self.sent_items = 0
+        self.sent_chunks = 0
+        self.sent_bytes = 0
+        self._buffer: List[Any] = []
+        self._pending: Optional[List[Any]] = None
+
+    async def __aenter__(self) -> "ChunkedPublisher":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        # При ошибке в середине потока хвост не отправляем: потребитель
+        # не получит x-chunk-last и отбросит неполную пачку по таймауту
+        if exc_type is None:
+            await self.close()
+
+    async def write(self, items: Sequence[Any]) -> None:
+        self._buffer.extend(items)
+        while len(self._buffer) > self.max_items:
+            chunk = self._buffer[:self.max_items]
+            del self._buffer[:self.max_items]
+            await self._push(chunk)
+
+    async def close(self) -> None:
+        if self._buffer:
+            await self._push(self._buffer)
+            self._buffer = []
+        if self._pending is not None:
+            await self._send(self._pending, last=True)
+            self._pending = None
+
+    async def _push(self, chunk: List[Any]) -> None:
+        if self._pending is not None:
+            await self._send(self._pending, last=False)
+        self._pending = chunk
+
+    async def _send(self, chunk: List[Any], last: bool) -> None:
+        body = encode_chunk(chunk, self.fmt, self.encoding)
+        await self.publisher.publish(
+            self.queue_name,
+            body,
+            headers={
+                BATCH_ID_HEADER: self.batch_id,
+                CHUNK_SEQ_HEADER: self.sent_chunks,
+                CHUNK_LAST_HEADER: last,
+            },
+            content_type=CONTENT_TYPES[self.fmt],
+            content_encoding=self.encoding,
+        )
+        self.sent_chunks += 1
+        self.sent_items += len(chunk)
+        self.sent_bytes += len(body)
+
+
+class ChunkReassembler:
+    """Сборка частей пачки на стороне потребителя.
+
+    add() принимает очередное сообщение и возвращает весь список записей,
+    когда пришли все части пачки (в любом порядке), иначе None. Сообщение без
+    заголовков пачки считается пачкой из одной части. Неполные пачки старше
+    max_age секунд отбрасываются, чтобы не копить память.
+    """
+
+    def __init__(self, max_age: float = 300.0):
+        self.max_age = max_age
+        self._batches: Dict[str, Dict[str, Any]] = {}
+
+    def add(
+        self,
+        body: bytes,
+        headers: Optional[Dict[str, Any]] = None,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+    ) -> Optional[List[Any]]:
+        items = decode_chunk(body, content_type, content_encoding)
+        headers = headers or {}
+        batch_id = headers.get(BATCH_ID_HEADER)
+        if batch_id is None:
+            return items
+
+        now = time.monotonic()
+        self._expire(now)
+        batch = self._batches.setdefault(batch_id, {"chunks": {}, "last": None, "started": now})
+        seq = int(headers[CHUNK_SEQ_HEADER])
+        batch["chunks"][seq] = items
+        if headers.get(CHUNK_LAST_HEADER):
+            batch["last"] = seq
+
+        last = batch["last"]
+        if last is None or len(batch["chunks"]) < last + 1:
+            return None
+        del self._batches[batch_id]
+        return [item for seq in range(last + 1) for item in batch["chunks"][seq]]
+
+    @property
+    def pending_batches(self) -> int:
+        return len(self._batches)
+
+    def _expire(self, now: float) -> None:
+        expired = [
+            batch_id for batch_id, batch in self._batches.items()
+            if now - batch["started"] > self.max_age
+        ]
+        for batch_id in expired:
+            del self._batches[batch_id]
@@ -0,0 +1,143 @@
+# services/idempotency.py
+import hashlib
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+from redis.asyncio import Redis
+
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600  # окно, в котором повтор сообщения распознаётся
+IDEMPOTENCY_KEY_PREFIX = "dedupe:"
+# Метка «обрабатывается» на время пачки: должна пережить самую долгую пачку,
+# а если держатель упал — истечь, чтобы повторная доставка всё же обработалась
+IDEMPOTENCY_CLAIM_TTL_SECONDS = 60
+PROCESSED_MARKER = "1"
+CLAIM_MARKER_PREFIX = "processing:"
+
+# Состояния ключа после claim
+CLAIMED = "claimed"  # занят нами — обрабатываем
+PROCESSED = "processed"  # уже обработан — дубликат
+IN_PROGRESS = "in_progress"  # обрабатывается другим процессом прямо сейчас
+
+# Снять метку «обрабатывается», только если она ещё наша
+RELEASE_CLAIM_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def message_key(message_id: Optional[str], body: bytes) -> str:
+    """Ключ идемпотентности: message_id из свойств AMQP, а если отправитель
+    его не задал (как producer.py) — SHA-256 тела сообщения."""
+    if message_id:
+        return f"id:{message_id}"
+    return f"sha256:{hashlib.sha256(body).hexdigest()}"
+
+
+class MessageDeduplicator:
+    """Окно дедупликации сообщений в Redis.
+
+    Перед обработкой пачки её ключи занимаются одним pipeline SET NX EX
+    claim_ttl (метка «обрабатывается») + GET: ключ, который уже занят,
+    либо обработан (дубликат), либо прямо сейчас обрабатывается другим
+    процессом — две одновременные доставки одного сообщения не спишут
+    остатки дважды. После коммита метка заменяется отметкой «обработано» на
+    ttl (сутки). Снимается метка (и повтор будет обработан) только когда
+    сообщение точно ничего не записало: отказ или откаченная транзакция.
+    Если исход коммита неизвестен, метка остаётся и истечёт через claim_ttl,
+    как и метка процесса, упавшего посреди пачки.
+
+    Счётчики checked/duplicates/in_progress/redelivered ведутся в процессе
+    и в хэше dedupe:stats:<namespace> (общий для всех процессов-потребителей).
+    """
+
+    def __init__(
+        self,
+        redis_client: Redis,
+        namespace: str,
+        ttl: int = IDEMPOTENCY_TTL_SECONDS,
+        claim_ttl: int = IDEMPOTENCY_CLAIM_TTL_SECONDS,
+    ):
+        self.redis = redis_client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.claim_ttl = claim_ttl
+        self.stats_key = f"{IDEMPOTENCY_KEY_PREFIX}stats:{namespace}"
+        self.checked = 0
+        self.duplicates = 0
+        self.in_progress = 0
+        self.redelivered = 0
+        self._pending_stats: Dict[str, int] = {}
+        # Занятые этим процессом ключи -> значение метки (для снятия только своей)
+        self._claims: Dict[str, str] = {}
+
+    def _redis_key(self, key: str) -> str:
+        return f"{IDEMPOTENCY_KEY_PREFIX}{self.namespace}:{key}"
+
+    async def claim(self, keys: Sequence[str], redelivered: int = 0) -> List[str]:
+        """Занять ключи перед обработкой: для каждого CLAIMED, PROCESSED или IN_PROGRESS."""
+        if not keys:
+            return []
+        marker = f"{CLAIM_MARKER_PREFIX}{uuid.uuid4().hex}"
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(self._redis_key(key), marker, ex=self.claim_ttl, nx=True)
+                pipe.get(self._redis_key(key))
+            results = await pipe.execute()
+
+        states = []
+        for key, claimed, value in zip(keys, results[::2], results[1::2]):
+            if isinstance(value, bytes):
+                value = value.decode()
+            if claimed:
+                self._claims[key] = marker
+                states.append(CLAIMED)
+            elif value is None or str(value).startswith(CLAIM_MARKER_PREFIX):
+                # None — чужая метка снята между SET и GET: проверим в следующий раз
+                states.append(IN_PROGRESS)
+            else:
+                states.append(PROCESSED)
+        self._count("checked", len(keys))
+        self._count("duplicates", states.count(PROCESSED))
+        self._count("in_progress", states.count(IN_PROGRESS))
+        self._count("redelivered", redelivered)
+        return states
+
+    async def settle(
+        self, processed: Sequence[str], released: Sequence[str] = (), unknown: Sequence[str] = (),
+    ) -> None:
+        """После пачки: обработанные — отметка на ttl вместо метки «обрабатывается»;
+        released (отклонённые и откаченные) — снять метку; unknown (исход коммита
+        неизвестен) — оставить метку до истечения claim_ttl. В том же pipeline —
+        накопленные счётчики."""
+        for key in unknown:
+            self._claims.pop(key, None)
+        if not processed and not released and not self._pending_stats:
+            return
+        pending_stats, self._pending_stats = self._pending_stats, {}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in processed:
+                self._claims.pop(key, None)
+                pipe.set(self._redis_key(key), PROCESSED_MARKER, ex=self.ttl)
+            for key in released:
+                marker = self._claims.pop(key, None)
+                if marker:
+                    pipe.eval(RELEASE_CLAIM_SCRIPT, 1, self._redis_key(key), marker)
+            for field, amount in pending_stats.items():
+                pipe.hincrby(self.stats_key, field, amount)
+            await pipe.execute()
+
+    def _count(self, field: str, amount: int) -> None:
+        if amount:
+            setattr(self, field, getattr(self, field) + amount)
+            self._pending_stats[field] = self._pending_stats.get(field, 0) + amount
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "in_progress": self.in_progress,
+            "redelivered": self.redelivered,
+            "duplicate_ratio": round(self.duplicates / self.checked, 4) if self.checked else 0.0,
+        }
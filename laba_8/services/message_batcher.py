@@ -0,0 +1,305 @@
+# services/message_batcher.py
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Protocol, Sequence, Set, TypeVar, Union
+
+from services.idempotency import CLAIMED, IN_PROGRESS, MessageDeduplicator
+
+ORDER_BATCH_SIZE = 100
+ORDER_BATCH_MAX_DELAY_MS = 50
+PRODUCT_BATCH_SIZE = 1000
+PRODUCT_BATCH_MAX_DELAY_MS = 200
+
+T = TypeVar("T")
+
+# Для каждого элемента пачки: None — обработан, строка — причина отказа
+BatchErrors = List[Optional[str]]
+
+
+class BatchRolledBack(Exception):
+    """Сбой process, после которого из пачки точно ничего не записано:
+    транзакция откачена до COMMIT. Только такую пачку можно обработать заново."""
+
+
+class AckableMessage(Protocol):
+    """То, что нужно батчеру от входящего сообщения (consumers.retry.RetryingMessage)."""
+
+    async def ack(self) -> None: ...
+
+    async def nack(self, requeue: bool = True) -> None: ...
+
+    async def reject(self, reason: Optional[str] = None) -> None: ...
+
+
+class MessageBatcher(Generic[T]):
+    """Накопление сообщений из очереди и обработка их пачками.
+
+    Элементы копятся, пока их не наберётся batch_size или пока с первого
+    элемента пачки не пройдёт max_delay_ms, затем вся пачка передаётся в
+    process (одна транзакция). Сообщения подтверждаются только после коммита:
+    - обработанный элемент — ack;
+    - отклонённый process (ошибка данных) — reject без возврата в очередь,
+      повтор ничего не изменит;
+    - BatchRolledBack из process (транзакция откачена) — пачка делится
+      пополам и половины обрабатываются заново, пока упавшие элементы не
+      останутся по одному: nack (повтор) получают только они, остальные
+      проходят. Одно «ядовитое» сообщение не уводит в повторы и DLQ всю
+      пачку; цена — до 2·n - 1 вызовов process на пачку, если падает всё
+      (например, БД недоступна);
+    - любое другое исключение — исход коммита неизвестен (обрыв во время
+      COMMIT, сбой после него): process не запускается снова, ведь он
+      неидемпотентен, а сообщения откладываются в DLQ (reject с причиной)
+      для ручной проверки и replay.
+    concurrency — сколько пачек может обрабатываться одновременно: пока одна
+    пачка коммитится, следующая уже копится и уходит в свою транзакцию.
+    Сообщения до коммита остаются неподтверждёнными, поэтому prefetch
+    подписчика должен быть не меньше batch_size * (concurrency + 1).
+
+    С deduplicator ключи пачки занимаются до обработки: элементы, чей ключ
+    уже обработан (повторная доставка), подтверждаются без обработки, а те,
+    что сейчас обрабатывает другой процесс, откладываются в следующую пачку
+    (без подтверждения) — там станет ясно, обработаны ли они. После коммита
+    ключи обработанных помечаются, отклонённых и откаченных — освобождаются,
+    а с неизвестным исходом коммита остаются занятыми до истечения метки.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[Sequence[T]], Awaitable[BatchErrors]],
+        batch_size: int,
+        max_delay_ms: int,
+        name: str = "batcher",
+        concurrency: int = 1,
+        deduplicator: Optional[MessageDeduplicator] = None,
+    ):
+        self.process = process
+        self.batch_size = batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.name = name
+        self.concurrency = concurrency
+        self.deduplicator = deduplicator
+        # Метрики
+        self.processed = 0
+        self.rejected = 0
+        self.skipped = 0
+        self.deferred = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.failed = 0
+        self.parked = 0
+        self.busy_seconds = 0.0
+        self._items: List[T] = []
+        self._messages: List[AckableMessage] = []
+        self._keys: List[Optional[str]] = []
+        self._redelivered = 0
+        self._slots = asyncio.Semaphore(concurrency)
+        self._in_flight: Set[asyncio.Task] = set()
+        self._timer: Optional[asyncio.Task] = None
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._items)
+
+    @property
+    def throughput(self) -> float:
+        """Сообщений в секунду времени обработки пачек (без ожидания в очереди)."""
+        handled = self.processed + self.rejected
+        return handled / self.busy_seconds if self.busy_seconds else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "skipped": self.skipped,
+            "deferred": self.deferred,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "failed": self.failed,
+            "parked": self.parked,
+            "pending": self.pending,
+            "in_flight": len(self._in_flight),
+            "throughput": round(self.throughput, 1),
+        }
+        if self.deduplicator:
+            stats["dedupe"] = self.deduplicator.stats()
+        return stats
+
+    async def add(
+        self,
+        item: T,
+        message: AckableMessage,
+        key: Optional[str] = None,
+        redelivered: bool = False,
+    ) -> None:
+        """key — ключ идемпотентности (services.idempotency.message_key),
+        redelivered — флаг повторной доставки от брокера (для статистики)."""
+        if self._closed:
+            await message.nack(requeue=True)
+            return
+        self._items.append(item)
+        self._messages.append(message)
+        self._keys.append(key)
+        self._redelivered += redelivered
+        if len(self._items) >= self.batch_size:
+            # Ждём только свободный слот, а не обработку пачки
+            await self._dispatch()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> None:
+        """Отправить накопленное в обработку и дождаться всех пачек в работе."""
+        await self._dispatch()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight)
+
+    async def close(self) -> None:
+        """Дописать остаток; сообщения, пришедшие позже, возвращаются в очередь."""
+        self._closed = True
+        await self.flush()
+
+    async def _dispatch(self) -> None:
+        """Забрать накопленные элементы и запустить их обработку в свободном слоте."""
+        # Слот занимаем до того, как забрать элементы: если таймер отменят,
+        # пока он ждёт слот, накопленное останется в буфере
+        await self._slots.acquire()
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+        if not self._items:
+            self._slots.release()
+            return
+        items, messages, keys = self._items, self._messages, self._keys
+        redelivered = self._redelivered
+        self._items, self._messages, self._keys = [], [], []
+        self._redelivered = 0
+
+        task = asyncio.create_task(self._process(items, messages, keys, redelivered))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _process(
+        self,
+        items: List[T],
+        messages: List[AckableMessage],
+        keys: List[Optional[str]],
+        redelivered: int,
+    ) -> None:
+        try:
+            items, messages, keys = await self._skip_duplicates(items, messages, keys, redelivered)
+            if not items:
+                await self._settle_keys([], [], [])
+                return
+
+            started = time.perf_counter()
+            try:
+                errors = await self.process(items)
+            except Exception as exc:
+                self.failed_batches += 1
+                print(f"[{self.name}] Ошибка обработки пачки из {len(items)}: {exc!r}")
+                errors = await self._bisect(items, exc)
+            elapsed = time.perf_counter() - started
+
+            # Отметка до ack: повтор, пришедший сразу после подтверждения, уже будет дубликатом
+            outcomes = [(key, error) for key, error in zip(keys, errors) if key]
+            await self._settle_keys(
+                [key for key, error in outcomes if error is None],
+                [key for key, error in outcomes if isinstance(error, (str, BatchRolledBack))],
+                [key for key, error in outcomes if isinstance(error, Exception) and not isinstance(error, BatchRolledBack)],
+            )
+            for message, error in zip(messages, errors):
+                if error is None:
+                    self.processed += 1
+                    await message.ack()
+                elif isinstance(error, BatchRolledBack):
+                    self.failed += 1
+                    await message.nack(requeue=True)
+                elif isinstance(error, Exception):
+                    self.parked += 1
+                    await message.reject(reason=f"commit outcome unknown: {error!r}")
+                else:
+                    self.rejected += 1
+                    print(f"[{self.name}] Отклонено: {error}")
+                    await message.reject()
+
+            self.batches += 1
+            self.busy_seconds += elapsed
+            print(
+                f"[{self.name}] Пачка {len(items)} за {elapsed * 1000:.0f} мс "
+                f"({len(items) / elapsed if elapsed else 0:.0f} сообщ./с); "
+                f"всего {self.processed + self.rejected}, {self.throughput:.0f} сообщ./с",
+            )
+        finally:
+            self._slots.release()
+
+    async def _bisect(self, items: List[T], exc: Exception) -> List[Union[None, str, Exception]]:
+        """Результаты упавших с exc элементов: откаченные обработать заново
+        половинами; элементу, упавшему в одиночку, и всем элементам пачки с
+        неизвестным исходом коммита — exc."""
+        if not isinstance(exc, BatchRolledBack):
+            print(f"[{self.name}] Исход коммита неизвестен, {len(items)} сообщ. уходят в DLQ без повтора")
+            return [exc] * len(items)
+        if len(items) == 1:
+            print(f"[{self.name}] Ошибка обработки сообщения: {exc}")
+            return [exc]
+        middle = len(items) // 2
+        results: List[Union[None, str, Exception]] = []
+        for half in (items[:middle], items[middle:]):
+            try:
+                results.extend(await self.process(half))
+            except Exception as half_exc:
+                results.extend(await self._bisect(half, half_exc))
+        return results
+
+    async def _skip_duplicates(self, items, messages, keys, redelivered):
+        """Занять ключи пачки: уже обработанные сообщения и повторы внутри пачки
+        подтвердить без обработки, обрабатываемые другим процессом — отложить."""
+        if not self.deduplicator or not any(keys):
+            return items, messages, keys
+        batch_keys = list(dict.fromkeys(key for key in keys if key))
+        try:
+            states = dict(zip(batch_keys, await self.deduplicator.claim(batch_keys, redelivered)))
+        except Exception as exc:
+            # Redis недоступен — обрабатываем всё: лучше редкий дубль, чем остановка потока
+            print(f"[{self.name}] Проверка дубликатов не удалась: {exc}")
+            return items, messages, keys
+
+        fresh_items, fresh_messages, fresh_keys = [], [], []
+        for item, message, key in zip(items, messages, keys):
+            state = states.pop(key, None) if key else CLAIMED
+            if state == IN_PROGRESS:
+                await self._defer(item, message, key)
+                continue
+            if state != CLAIMED:
+                # Уже обработан или повтор ключа, занятого выше в этой же пачке
+                self.skipped += 1
+                await message.ack()
+                continue
+            fresh_items.append(item)
+            fresh_messages.append(message)
+            fresh_keys.append(key)
+        return fresh_items, fresh_messages, fresh_keys
+
+    async def _defer(self, item: T, message: AckableMessage, key: str) -> None:
+        """Вернуть элемент в следующую пачку: его ключ сейчас обрабатывает другой процесс."""
+        self.deferred += 1
+        if self._closed:
+            await message.nack(requeue=True)
+            return
+        self._items.append(item)
+        self._messages.append(message)
+        self._keys.append(key)
+        if self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _settle_keys(self, processed: List[str], released: List[str], unknown: List[str]) -> None:
+        if not self.deduplicator:
+            return
+        try:
+            await self.deduplicator.settle(processed, released, unknown)
+        except Exception as exc:
+            print(f"[{self.name}] Не удалось отметить обработанные сообщения: {exc}")
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.max_delay)
+        await self._dispatch()
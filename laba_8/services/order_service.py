@@ -1,10 +1,13 @@
 # services/order_service.py
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
+from redis.asyncio import Redis
 from repositories.order_repository import OrderRepository
 from repositories.product_repository import ProductRepository
 from repositories.user_repository import UserRepository
 from schemas.order import OrderCreate
+from schemas.pagination import Cursor
 from models import Order
+from services.total_counter import TotalCounter
 
 
 class OrderService:
@@ -13,16 +16,20 @@ class OrderService:
         order_repository: OrderRepository,
         product_repository: ProductRepository,
         user_repository: UserRepository,
+        redis_client: Optional[Redis] = None,
     ):
         self.order_repository = order_repository
         self.product_repository = product_repository
         self.user_repository = user_repository
+        self.total_counter = TotalCounter(redis_client, "orders", order_repository.get_total_count)
 
     async def get_by_id(self, order_id: str) -> Optional[Order]:
         return await self.order_repository.get_by_id(order_id)
 
-    async def get_all(self, count: int = 10, page: int = 1) -> List[Order]:
-        return await self.order_repository.get_all(count, page)
+    async def get_all(
+        self, count: int = 10, page: int = 1, after: Optional[Cursor] = None
+    ) -> List[Order]:
+        return await self.order_repository.get_all(count, page, after=after)
 
     async def create(self, order_data: OrderCreate) -> Order:
         # Проверка: существует ли пользователь
@@ -30,26 +37,60 @@ class OrderService:
         if not user:
             raise ValueError(f"User with ID {order_data.user_id} not found")
 
-        # Проверка: все ли продукты существуют и достаточно ли их на складе
-        for product_id in order_data.product_ids:
-            product = await self.product_repository.get_by_id(product_id)
-            if not product:
-                raise ValueError(f"Product with ID {product_id} not found")
-            if product.stock_quantity < 1:
-                raise ValueError(f"Product '{product.name}' is out of stock")
+        # Существование продуктов и остатки проверяет репозиторий: одним
+        # запросом по всем product_ids под блокировкой и условным UPDATE
+        # при списании, поэтому здесь продукты по одному не читаем.
+        order = await self.order_repository.create(order_data)
+        await self.total_counter.incr()
+        return order
 
-        # Создаём заказ (в репозитории уже снижаются остатки)
-        return await self.order_repository.create(order_data)
+    async def create_bulk(
+        self, orders: Sequence[OrderCreate]
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        """Создать пачку заказов. Возвращает (order_id, error) по каждому заказу.
 
-    async def update_status(self, order_id: str, new_status: str) -> Optional[Order]:
-        order = await self.get_by_id(order_id)
-        if not order:
-            return None
+        Пользователи проверяются одним запросом на всю пачку, продукты и
+        остатки — в репозитории, тоже на всю пачку сразу.
+        """
+        existing_users = await self.user_repository.get_existing_ids(
+            {order_data.user_id for order_data in orders}
+        )
+
+        results: List[Tuple[Optional[str], Optional[str]]] = [(None, None)] * len(orders)
+        valid_indexes = []
+        for index, order_data in enumerate(orders):
+            if order_data.user_id in existing_users:
+                valid_indexes.append(index)
+            else:
+                results[index] = (None, f"User with ID {order_data.user_id} not found")
+
+        if valid_indexes:
+            created = await self.order_repository.create_bulk([orders[i] for i in valid_indexes])
+            for index, result in zip(valid_indexes, created):
+                results[index] = result
 
+        created_count = sum(1 for order_id, _ in results if order_id)
+        if created_count:
+            await self.total_counter.incr(created_count)
+        return results
+
+    async def rollback(self) -> None:
+        """Откатить незавершённую транзакцию после сбоя create_bulk, чтобы продолжить с той же сессией."""
+        await self.order_repository.rollback()
+
+    async def update_status(self, order_id: str, new_status: str) -> Optional[Order]:
+        # Репозиторий сам вернёт None, если заказа нет — отдельный SELECT не нужен
         return await self.order_repository.update(order_id, new_status)
 
     async def delete(self, order_id: str) -> bool:
-        return await self.order_repository.delete(order_id)
+        deleted = await self.order_repository.delete(order_id)
+        if deleted:
+            await self.total_counter.decr()
+        return deleted
 
-    async def get_total_count(self) -> int:
-        return await self.order_repository.get_total_count()
\ No newline at end of file
+    async def get_total_count(self, approximate: bool = False) -> int:
+        if approximate:
+            estimate = await self.order_repository.get_estimated_count()
+            if estimate is not None:
+                return estimate
+        return await self.total_counter.get()
\ No newline at end of file
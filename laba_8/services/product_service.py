@@ -1,39 +1,67 @@
 # services/product_service.py
-import json
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from repositories.product_repository import ProductRepository
-from schemas.product import ProductCreate, ProductUpdate, ProductResponse
+from schemas.product import ProductCreate, ProductUpdate, ProductCached, ProductResponse, ProductImport
+from schemas.pagination import Cursor
 from models import Product
+from services.cache import TwoTierCache
+from services.cache_codecs import cache_codec
+from services.id_filter import ID_FILTER_ENABLED, IdFilter
+from services.total_counter import TotalCounter
 
 
 PRODUCT_CACHE_TTL_SECONDS = 600  # 10 минут
-PRODUCT_CACHE_KEY_PREFIX = "cache:product:"
+PRODUCT_CACHE_NAMESPACE = "product"  # ключи cache:product:<id>
+PRODUCT_CACHE_CODEC = cache_codec(ProductCached, ProductResponse)
 
 class ProductService:
-    def __init__(self, product_repository: ProductRepository, redis_client: Redis):
+    def __init__(
+        self,
+        product_repository: ProductRepository,
+        redis_client: Optional[Redis] = None,
+        session_factory: Optional[async_sessionmaker] = None,
+        cache_client: Optional[Redis] = None,
+    ):
         self.product_repository = product_repository
         self.redis = redis_client
+        # Своя сессия для загрузок кэша, переживающих запрос (общая при промахе, фоновая)
+        self.session_factory = session_factory
+        self.total_counter = TotalCounter(redis_client, "products", product_repository.get_total_count)
+        # Клиент для кэша — отдельный, если кодеку нужны ответы Redis в байтах (msgpack)
+        cache_client = cache_client or redis_client
+        id_filter = IdFilter(cache_client, PRODUCT_CACHE_NAMESPACE) if cache_client and ID_FILTER_ENABLED else None
+        self.cache = TwoTierCache(
+            cache_client,
+            PRODUCT_CACHE_NAMESPACE,
+            PRODUCT_CACHE_CODEC,
+            ttl=PRODUCT_CACHE_TTL_SECONDS,
+            id_filter=id_filter,
+        )
 
     async def get_by_id(self, product_id: str) -> Optional[Product]:
-        cache_key = f"{PRODUCT_CACHE_KEY_PREFIX}{product_id}"
-
-        # 1) Проверяем кэш
-        cached = await self.redis.get(cache_key)
-        if cached:
-            data = json.loads(cached)
-            return ProductResponse(**data)
-
-        # 2) Иначе читаем из БД и кладем в кэш
-        product = await self.product_repository.get_by_id(product_id)
-        if product:
-            payload = ProductResponse.model_validate(product).model_dump()
-            await self.redis.set(cache_key, json.dumps(payload), ex=PRODUCT_CACHE_TTL_SECONDS)
-        return product
+        return await self.cache.get_or_load(
+            product_id,
+            lambda: self.product_repository.get_by_id(product_id),
+            refresh_loader=self._detached_loader(product_id),
+        )
+
+    def _detached_loader(self, product_id: str):
+        if not self.session_factory:
+            return None
+
+        async def load() -> Optional[Product]:
+            async with self.session_factory() as session:
+                return await ProductRepository(session).get_by_id(product_id)
 
-    async def get_all(self, count: int = 10, page: int = 1) -> List[Product]:
-        return await self.product_repository.get_all(count=count, page=page)
+        return load
+
+    async def get_all(
+        self, count: int = 10, page: int = 1, after: Optional[Cursor] = None
+    ) -> List[Product]:
+        return await self.product_repository.get_all(count=count, page=page, after=after)
 
     async def create(self, product_data: ProductCreate) -> Product:
         # Проверка: нельзя создать товар с отрицательным количеством
@@ -42,14 +70,24 @@ class ProductService:
         if product_data.price <= 0:
             raise ValueError("Price must be positive")
 
-        return await self.product_repository.create(product_data)
+        product = await self.product_repository.create(product_data)
+        await self.total_counter.incr()
+        await self.cache.created(product.id)
+        return product
+
+    async def import_products(self, rows: Sequence[ProductImport]) -> int:
+        """Импортировать пачку продуктов (upsert). Возвращает число записанных строк."""
+        product_ids = await self.product_repository.upsert_many(rows)
 
-    async def update(self, product_id: str, update_data: ProductUpdate) -> Optional[Product]:
-        product = await self.get_by_id(product_id)
-        if not product:
-            return None
+        # Сколько строк было новыми, заранее неизвестно — total пересчитается при чтении
+        await self.total_counter.reset()
+        await self.cache.refresh_many(
+            {row.id: row.model_dump() for row in rows if row.id}, written_keys=product_ids,
+        )
+        return len(product_ids)
 
-        # Валидация обновлений
+    async def update(self, product_id: str, update_data: ProductUpdate) -> Optional[Product]:
+        # Валидация обновлений (существование продукта проверит сам UPDATE)
         if update_data.stock_quantity is not None and update_data.stock_quantity < 0:
             raise ValueError("Stock quantity cannot be negative")
         if update_data.price is not None and update_data.price <= 0:
@@ -57,22 +95,23 @@ class ProductService:
 
         updated = await self.product_repository.update(product_id, update_data)
 
-        # После обновления — обновляем кэш свежими данными
-        cache_key = f"{PRODUCT_CACHE_KEY_PREFIX}{product_id}"
+        # После обновления — обновляем кэш строкой из UPDATE ... RETURNING
         if updated:
-            payload = ProductResponse.model_validate(updated).model_dump()
-            await self.redis.set(cache_key, json.dumps(payload), ex=PRODUCT_CACHE_TTL_SECONDS)
+            await self.cache.set(product_id, updated)
         else:
-            await self.redis.delete(cache_key)
-
+            await self.cache.invalidate(product_id)
         return updated
 
     async def delete(self, product_id: str) -> bool:
         deleted = await self.product_repository.delete(product_id)
         if deleted:
-            cache_key = f"{PRODUCT_CACHE_KEY_PREFIX}{product_id}"
-            await self.redis.delete(cache_key)
+            await self.total_counter.decr()
+            await self.cache.invalidate(product_id)
         return deleted
 
-    async def get_total_count(self) -> int:
-        return await self.product_repository.get_total_count()
\ No newline at end of file
+    async def get_total_count(self, approximate: bool = False) -> int:
+        if approximate:
+            estimate = await self.product_repository.get_estimated_count()
+            if estimate is not None:
+                return estimate
+        return await self.total_counter.get()
\ No newline at end of file
@@ -0,0 +1,89 @@
+# services/rabbit_publisher.py
+import asyncio
+from typing import Dict, Optional, Set
+
+import aio_pika
+from aio_pika.abc import AbstractRobustChannel, AbstractRobustConnection
+from aio_pika.pool import Pool
+
+RABBIT_CHANNEL_POOL_SIZE = 4
+
+
+class RabbitPublisher:
+    """Долгоживущий издатель RabbitMQ: одно соединение и пул каналов.
+
+    Соединение открывается один раз (start — на старте воркера, либо лениво
+    при первой публикации) и закрывается в close, а не на каждое сообщение.
+    Каналы берутся из пула размером pool_size, поэтому параллельные
+    публикации не делят один канал. Очереди объявляются один раз за жизнь
+    издателя. publisher_confirms=True — publish ждёт подтверждения брокера
+    (надёжнее, но медленнее); False — отправка без ожидания.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = RABBIT_CHANNEL_POOL_SIZE,
+        publisher_confirms: bool = True,
+    ):
+        self.url = url
+        self.pool_size = pool_size
+        self.publisher_confirms = publisher_confirms
+        self.connection: Optional[AbstractRobustConnection] = None
+        self.channels: Optional[Pool[AbstractRobustChannel]] = None
+        self.declared_queues: Set[str] = set()
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def is_started(self) -> bool:
+        return self.channels is not None and not self.channels.is_closed
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self.is_started:
+                return
+            self.connection = await aio_pika.connect_robust(self.url)
+            self.channels = Pool(self._open_channel, max_size=self.pool_size)
+            self.declared_queues.clear()
+
+    async def close(self) -> None:
+        async with self._start_lock:
+            if self.channels is not None:
+                await self.channels.close()
+                self.channels = None
+            if self.connection is not None:
+                await self.connection.close()
+                self.connection = None
+
+    async def publish(
+        self,
+        queue_name: str,
+        body: bytes,
+        headers: Optional[Dict[str, object]] = None,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+    ) -> None:
+        """Отправить сообщение в durable-очередь queue_name через default exchange."""
+        if not self.is_started:
+            await self.start()
+
+        async with self.channels.acquire() as channel:
+            if channel.is_closed:
+                # Канал мог закрыть брокер (ошибка на канале) — открываем заново
+                await channel.reopen()
+            if queue_name not in self.declared_queues:
+                await channel.declare_queue(queue_name, durable=True)
+                self.declared_queues.add(queue_name)
+            await channel.default_exchange.publish(
+                aio_pika.Message(
+                    body=body,
+                    headers=headers,
+                    content_type=content_type,
+                    content_encoding=content_encoding,
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                ),
+                routing_key=queue_name,
+            )
+
+    async def _open_channel(self) -> AbstractRobustChannel:
+        return await self.connection.channel(publisher_confirms=self.publisher_confirms)
@@ -1,14 +1,32 @@
 # services/report_service.py
-from datetime import date
-from typing import List
+from datetime import date, datetime
+from typing import List, Optional
 from repositories.report_repository import ReportRepository
 from models import Report
+from schemas.pagination import Cursor
 
 
 class ReportService:
     def __init__(self, report_repository: ReportRepository):
         self.report_repository = report_repository
 
-    async def get_by_date(self, report_date: date) -> List[Report]:
-        """Получить все отчёты за указанную дату."""
-        return await self.report_repository.get_by_date(report_date)
+    async def get_by_date(
+        self,
+        report_date: date,
+        count: Optional[int] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[Report]:
+        """Получить отчёты за указанную дату (с необязательной keyset-пагинацией)."""
+        return await self.report_repository.get_by_date(report_date, count=count, after=after)
+
+    async def get_by_range(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        count: Optional[int] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[Report]:
+        """Получить отчёты за полуинтервал [start, end)."""
+        if start is not None and end is not None and start >= end:
+            raise ValueError("'from' must be earlier than 'to'")
+        return await self.report_repository.get_by_range(start, end, count=count, after=after)
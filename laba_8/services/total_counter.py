@@ -0,0 +1,77 @@
+# services/total_counter.py
+from typing import Awaitable, Callable, Optional
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+
+TOTAL_COUNT_CACHE_TTL_SECONDS = 300  # 5 минут
+TOTAL_COUNT_KEY_PREFIX = "count:"
+
+# INCRBY только если ключ уже есть: иначе после промаха кэша
+# мы бы записали в счётчик 1 вместо реального количества.
+INCR_IF_EXISTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+
+class TotalCounter:
+    """Счётчик общего количества записей в Redis (для total_count в списках).
+
+    При промахе значение считается через loader (SQL COUNT(*)) и кладётся
+    в Redis с TTL. create/delete в сервисах сдвигают счётчик на ±1, а TTL
+    ограничивает расхождение, если таблицу меняли в обход сервисов
+    (seed_data.py, миграции). Без Redis всегда вызывается loader.
+
+    incr/decr/reset вызываются после коммита и не бросают ошибок Redis:
+    запись в БД уже прошла, и отвечать на неё 500 нельзя. Счётчик, который
+    не удалось сдвинуть, удаляется — следующее чтение пересчитает его.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[Redis],
+        name: str,
+        loader: Callable[[], Awaitable[int]],
+        ttl: int = TOTAL_COUNT_CACHE_TTL_SECONDS,
+    ):
+        self.redis = redis_client
+        self.key = f"{TOTAL_COUNT_KEY_PREFIX}{name}"
+        self.loader = loader
+        self.ttl = ttl
+
+    async def get(self) -> int:
+        if not self.redis:
+            return await self.loader()
+
+        cached = await self.redis.get(self.key)
+        if cached is not None:
+            return int(cached)
+
+        total = await self.loader()
+        # nx=True: не затираем значение, которое уже успел сдвинуть create/delete
+        await self.redis.set(self.key, total, ex=self.ttl, nx=True)
+        return total
+
+    async def incr(self, amount: int = 1) -> None:
+        if not self.redis:
+            return
+        try:
+            await self.redis.eval(INCR_IF_EXISTS_SCRIPT, 1, self.key, amount)
+        except RedisError as e:
+            print(f"[total_counter] Не удалось сдвинуть {self.key} на {amount}: {e!r}")
+            await self.reset()
+
+    async def decr(self, amount: int = 1) -> None:
+        await self.incr(-amount)
+
+    async def reset(self) -> None:
+        if not self.redis:
+            return
+        try:
+            await self.redis.delete(self.key)
+        except RedisError as e:
+            # Redis недоступен целиком: расхождение ограничит TTL счётчика
+            print(f"[total_counter] Не удалось сбросить {self.key}: {e!r}")
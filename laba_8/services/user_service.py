@@ -1,43 +1,70 @@
 # services/user_service.py
-import json
 from typing import List, Optional
 from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from models import User
 from repositories.user_repository import UserRepository
-from schemas.user import UserCreate, UserUpdate, UserResponse
+from schemas.user import UserCreate, UserUpdate, UserCached, UserResponse
+from schemas.pagination import Cursor
+from services.cache import TwoTierCache
+from services.cache_codecs import cache_codec
+from services.id_filter import ID_FILTER_ENABLED, IdFilter
+from services.total_counter import TotalCounter
 
 
 USER_CACHE_TTL_SECONDS = 3600  # 1 час
-USER_CACHE_KEY_PREFIX = "cache:user:"
+USER_CACHE_NAMESPACE = "user"  # ключи cache:user:<id>
+USER_CACHE_CODEC = cache_codec(UserCached, UserResponse)
 
 
 class UserService:
-    def __init__(self, user_repository: UserRepository, redis_client: Redis):
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        redis_client: Optional[Redis] = None,
+        session_factory: Optional[async_sessionmaker] = None,
+        cache_client: Optional[Redis] = None,
+    ):
         self.user_repository = user_repository
         self.redis = redis_client
+        # Своя сессия для загрузок кэша, переживающих запрос (общая при промахе, фоновая)
+        self.session_factory = session_factory
+        self.total_counter = TotalCounter(redis_client, "users", user_repository.get_total_count)
+        # Клиент для кэша — отдельный, если кодеку нужны ответы Redis в байтах (msgpack)
+        cache_client = cache_client or redis_client
+        id_filter = IdFilter(cache_client, USER_CACHE_NAMESPACE) if cache_client and ID_FILTER_ENABLED else None
+        self.cache = TwoTierCache(
+            cache_client,
+            USER_CACHE_NAMESPACE,
+            USER_CACHE_CODEC,
+            ttl=USER_CACHE_TTL_SECONDS,
+            id_filter=id_filter,
+        )
 
     async def get_by_id(self, user_id: str) -> Optional[User]:
-        """Получить пользователя по ID (с кэшированием в Redis)"""
-        cache_key = f"{USER_CACHE_KEY_PREFIX}{user_id}"
-
-        # 1) Проверяем кэш
-        cached = await self.redis.get(cache_key)
-        if cached:
-            data = json.loads(cached)
-            return UserResponse(**data)
-
-        # 2) Иначе читаем из БД
-        user = await self.user_repository.get_by_id(user_id)
-        if user:
-            # Сериализуем в dict и кладём в кэш
-            payload = UserResponse.model_validate(user).model_dump()
-            await self.redis.set(cache_key, json.dumps(payload), ex=USER_CACHE_TTL_SECONDS)
-        return user
+        """Получить пользователя по ID (кэш в памяти процесса, затем Redis, затем БД)"""
+        return await self.cache.get_or_load(
+            user_id,
+            lambda: self.user_repository.get_by_id(user_id),
+            refresh_loader=self._detached_loader(user_id),
+        )
+
+    def _detached_loader(self, user_id: str):
+        if not self.session_factory:
+            return None
+
+        async def load() -> Optional[User]:
+            async with self.session_factory() as session:
+                return await UserRepository(session).get_by_id(user_id)
 
-    async def get_by_filter(self, count: int = 10, page: int = 1, **kwargs) -> List[User]:
-        """Получить пользователей по фильтру с пагинацией"""
-        return await self.user_repository.get_by_filter(count, page, **kwargs)
+        return load
+
+    async def get_by_filter(
+        self, count: int = 10, page: int = 1, after: Optional[Cursor] = None, **kwargs
+    ) -> List[User]:
+        """Получить пользователей по фильтру с пагинацией (offset или keyset по after)"""
+        return await self.user_repository.get_by_filter(count, page, after=after, **kwargs)
 
     async def create(self, user_data: UserCreate) -> User:
         """Создать нового пользователя"""
@@ -47,36 +74,50 @@ class UserService:
         if existing_users:
             raise ValueError(f"User with email {user_data.email} already exists")
 
-        return await self.user_repository.create(user_data)
+        user = await self.user_repository.create(user_data)
+        await self.total_counter.incr()
+        await self.cache.created(user.id)
+        return user
 
     async def update(self, user_id: str, user_data: UserUpdate) -> Optional[User]:
         """Обновить пользователя"""
-        # Бизнес-логика: проверяем существует ли пользователь
-        existing_user = await self.get_by_id(user_id)
-        if not existing_user:
-            return None
-
-        # Если обновляется email, проверяем уникальность
-        if user_data.email and user_data.email != existing_user.email:
-            user_with_email = await self.user_repository.get_by_filter(email=user_data.email)
-            if user_with_email:
+        # Если обновляется email, проверяем уникальность (сам пользователь не в счёт).
+        # Существование пользователя проверит UPDATE ... RETURNING в репозитории.
+        if user_data.email:
+            users_with_email = await self.user_repository.get_by_filter(email=user_data.email)
+            if any(user.id != user_id for user in users_with_email):
                 raise ValueError(f"User with email {user_data.email} already exists")
 
         updated = await self.user_repository.update(user_id, user_data)
 
-        # После обновления инвалидируем кэш
-        cache_key = f"{USER_CACHE_KEY_PREFIX}{user_id}"
-        await self.redis.delete(cache_key)
+        # После обновления кладём в кэш строку, которую вернул UPDATE
+        if updated:
+            await self.cache.set(user_id, updated)
+        else:
+            await self.cache.invalidate(user_id)
         return updated
 
     async def delete(self, user_id: str) -> bool:
         """Удалить пользователя"""
         deleted = await self.user_repository.delete(user_id)
         if deleted:
-            cache_key = f"{USER_CACHE_KEY_PREFIX}{user_id}"
-            await self.redis.delete(cache_key)
+            await self.total_counter.decr()
+            await self.cache.invalidate(user_id)
         return deleted
 
-    async def get_total_count(self, **kwargs) -> int:
-        """Получить общее количество пользователей (для задания со звездочкой)"""
-        return await self.user_repository.get_total_count(**kwargs)
\ No newline at end of file
+    async def get_total_count(self, approximate: bool = False, **kwargs) -> int:
+        """Получить общее количество пользователей (для задания со звездочкой)
+
+        С фильтрами — точный COUNT(*) в БД. Без фильтров — счётчик в Redis,
+        а при approximate=True — оценка по статистике PostgreSQL.
+        """
+        filters = {key: value for key, value in kwargs.items() if value is not None}
+        if filters:
+            return await self.user_repository.get_total_count(**filters)
+
+        if approximate:
+            estimate = await self.user_repository.get_estimated_count()
+            if estimate is not None:
+                return estimate
+
+        return await self.total_counter.get()
\ No newline at end of file
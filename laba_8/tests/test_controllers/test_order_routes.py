@@ -1,5 +1,10 @@
 # tests/test_routes/test_order_routes.py
+import json
+
 import pytest
+from sqlalchemy.exc import OperationalError
+
+from controllers import order_controller
 
 
 @pytest.mark.asyncio
@@ -135,4 +140,90 @@ def test_delete_order(client):
 
     # Проверим, что заказа больше нет
     get_response = client.get(f"/orders/{created_order['id']}")  
-    assert get_response.status_code == 404
\ No newline at end of file
+    assert get_response.status_code == 404
+
+def test_create_orders_bulk(client):
+    """Тестирует массовое создание заказов: результат по каждой позиции."""
+    user = client.post("/users/create_user", json={"username": "Test User", "email": "test@example.com"}).json()
+    product = client.post("/products", json={"name": "Test Product", "price": 100.0, "stock_quantity": 2}).json()
+
+    orders = [
+        {"user_id": user["id"], "product_ids": [product["id"]]},
+        {"user_id": "missing-user", "product_ids": [product["id"]]},
+        {"user_id": user["id"]},  # нет product_ids
+        {"user_id": user["id"], "product_ids": [product["id"]]},
+        {"user_id": user["id"], "product_ids": [product["id"]]},  # остаток уже кончился
+    ]
+    response = client.post("/orders/bulk", json=orders)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 3
+    results = data["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[0]["order_id"] and results[3]["order_id"]
+    assert "not found" in results[1]["error"]
+    assert "product_ids" in results[2]["error"]
+    assert "out of stock" in results[4]["error"]
+
+    # Созданные заказы доступны обычным GET
+    get_response = client.get(f"/orders/{results[0]['order_id']}")
+    assert get_response.status_code == 200
+
+
+def test_create_orders_bulk_reports_failed_chunk_per_item(client, order_service, monkeypatch):
+    """Сбой транзакции одной пачки — ошибка по её позициям, пачки до и после неё создаются."""
+    monkeypatch.setattr(order_controller, "ORDER_BULK_CHUNK_SIZE", 2)
+    user = client.post("/users/create_user", json={"username": "Test User", "email": "test@example.com"}).json()
+    product = client.post("/products", json={"name": "Test Product", "price": 100.0, "stock_quantity": 10}).json()
+
+    create_bulk = order_service.order_repository.create_bulk
+    calls = []
+
+    async def failing_second_chunk(orders):
+        calls.append(len(orders))
+        if len(calls) == 2:
+            raise OperationalError("INSERT INTO orders", {}, ConnectionResetError("connection reset"))
+        return await create_bulk(orders)
+
+    monkeypatch.setattr(order_service.order_repository, "create_bulk", failing_second_chunk)
+    orders = [{"user_id": user["id"], "product_ids": [product["id"]]}] * 6
+    response = client.post("/orders/bulk", json=orders)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["failed"]) == (4, 2)
+    assert [bool(r["order_id"]) for r in data["results"]] == [True, True, False, False, True, True]
+    assert "transaction failed" in data["results"][2]["error"]
+
+
+def test_create_orders_bulk_limits_json_array_body(client, monkeypatch):
+    """JSON-массив читается в память целиком — больше ORDER_BULK_JSON_MAX_BYTES не принимаем; NDJSON можно."""
+    monkeypatch.setattr(order_controller, "ORDER_BULK_JSON_MAX_BYTES", 100)
+    orders = [{"user_id": "missing-user", "product_ids": ["p"]}] * 5
+
+    assert client.post("/orders/bulk", json=orders).status_code == 413
+    response = client.post(
+        "/orders/bulk",
+        content="\n".join(json.dumps(order) for order in orders),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200 and response.json()["failed"] == 5
+
+
+def test_create_orders_bulk_ndjson(client):
+    """Тестирует массовое создание заказов из NDJSON-потока."""
+    user = client.post("/users/create_user", json={"username": "Test User", "email": "test@example.com"}).json()
+    product = client.post("/products", json={"name": "Test Product", "price": 100.0, "stock_quantity": 10}).json()
+
+    line = json.dumps({"user_id": user["id"], "product_ids": [product["id"]]})
+    body = "\n".join([line, "not json", line]) + "\n"
+    response = client.post(
+        "/orders/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert data["results"][1]["error"]
@@ -1,4 +1,6 @@
 # tests/test_routes/test_product_routes.py
+import json
+
 import pytest
 
 
@@ -105,4 +107,56 @@ def test_delete_product(client):
     # Проверим, что продукта больше нет
     get_response = client.get(f"/products/{created_product['id']}")
     assert get_response.status_code == 404
-    
\ No newline at end of file
+    
+
+def test_import_products_csv(client):
+    """Тестирует импорт продуктов из CSV: новые строки создаются, строки с id обновляются."""
+    existing = client.post("/products", json={"name": "Old", "price": 10.0, "stock_quantity": 1}).json()
+
+    body = "\n".join([
+        "id,name,description,price,stock_quantity",
+        ",Keyboard,Mechanical,60.5,20",
+        f"{existing['id']},Renamed,,15.0,7",
+        ",Broken,,-1,5",  # цена должна быть положительной
+    ])
+    response = client.post("/products/import", content=body, headers={"Content-Type": "text/csv"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["imported"] == 2
+    assert data["failed"] == 1
+    assert data["errors"][0]["row"] == 2
+
+    updated = client.get(f"/products/{existing['id']}").json()
+    assert updated["name"] == "Renamed"
+    assert updated["stock_quantity"] == 7
+    assert client.get("/products").json()["total_count"] == 2
+
+
+def test_import_products_ndjson(client):
+    """Тестирует импорт продуктов из NDJSON-потока."""
+    lines = [json.dumps({"name": f"Product {i}", "price": 1.0 + i, "stock_quantity": i}) for i in range(3)]
+    response = client.post(
+        "/products/import",
+        content="\n".join(lines + ["{bad json"]),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["imported"] == 3
+    assert data["failed"] == 1
+
+
+def test_import_rejects_stock_out_of_integer_range(client):
+    """Остаток больше INTEGER — ошибка одной строки, остальные строки пачки импортируются."""
+    body = "\n".join([
+        "id,name,description,price,stock_quantity",
+        ",Fine,,1.0,2147483647",
+        ",Huge,,1.0,2147483648",
+    ])
+    response = client.post("/products/import", content=body, headers={"Content-Type": "text/csv"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["imported"], data["failed"], data["errors"][0]["row"]) == (1, 1, 1)
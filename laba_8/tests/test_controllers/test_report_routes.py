@@ -0,0 +1,67 @@
+# tests/test_controllers/test_report_routes.py
+from datetime import datetime
+
+import pytest
+
+from controllers import report_controller
+from models import Order, Report, User
+
+
+@pytest.fixture
+async def reports(test_db_session):
+    user = User(username="Test User", email="test@example.com")
+    test_db_session.add(user)
+    await test_db_session.flush()
+    order = Order(user_id=user.id)
+    test_db_session.add(order)
+    await test_db_session.flush()
+    test_db_session.add_all(
+        Report(order_id=order.id, count_product=2, report_at=datetime(2025, 12, day, 10))
+        for day in range(14, 19)
+    )
+    await test_db_session.commit()
+
+
+@pytest.mark.asyncio
+def test_get_reports_by_date(client, reports):
+    """Тестирует получение отчётов за дату."""
+    response = client.get("/report", params={"date": "2025-12-16"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["date"] == "2025-12-16"
+    assert data["total_count"] == 1
+    assert data["reports"][0]["count_product"] == 2
+
+
+@pytest.mark.asyncio
+def test_get_reports_by_range(client, reports):
+    """Тестирует диапазон from/to: from включительно, to не включительно."""
+    response = client.get("/report", params={"from": "2025-12-15", "to": "2025-12-17T10:00:00"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["from"] == "2025-12-15"
+    assert [r["report_at"][:10] for r in data["reports"]] == ["2025-12-16", "2025-12-15"]
+
+
+@pytest.mark.asyncio
+def test_get_reports_invalid_params(client, reports):
+    """Тестирует ошибки валидации параметров /report."""
+    assert client.get("/report").status_code == 400
+    assert client.get("/report", params={"date": "2025-12-16", "from": "2025-12-15"}).status_code == 400
+    assert client.get("/report", params={"from": "yesterday"}).status_code == 400
+    assert client.get("/report", params={"from": "2025-12-17", "to": "2025-12-16"}).status_code == 400
+
+
+@pytest.mark.asyncio
+def test_range_without_count_is_paginated(client, reports, monkeypatch):
+    """from без to и count не читает весь диапазон разом: страница по умолчанию и next_cursor."""
+    monkeypatch.setattr(report_controller, "REPORT_RANGE_DEFAULT_COUNT", 3)
+
+    first = client.get("/report", params={"from": "2025-12-01"}).json()
+    assert [r["report_at"][:10] for r in first["reports"]] == ["2025-12-18", "2025-12-17", "2025-12-16"]
+    assert first["next_cursor"]
+
+    rest = client.get("/report", params={"from": "2025-12-01", "after": first["next_cursor"]}).json()
+    assert [r["report_at"][:10] for r in rest["reports"]] == ["2025-12-15", "2025-12-14"]
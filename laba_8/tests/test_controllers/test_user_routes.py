@@ -97,4 +97,23 @@ def test_delete_user(client):
 
     # Проверим, что пользователя больше нет
     get_response = client.get(f"/users/{created_user['id']}")
-    assert get_response.status_code == 404
\ No newline at end of file
+    assert get_response.status_code == 404
+
+def test_get_users_list_cursor(client):
+    """Тестирует проход по списку пользователей через next_cursor."""
+    for i in range(3):
+        response = client.post(
+            "/users/create_user", json={"username": f"User {i}", "email": f"user{i}@example.com"}
+        )
+        assert response.status_code == 201
+
+    first = client.get("/users", params={"count": 2}).json()
+    assert [u["username"] for u in first["users"]] == ["User 0", "User 1"]
+    assert first["next_cursor"] is not None
+
+    second = client.get("/users", params={"count": 2, "after": first["next_cursor"]}).json()
+    assert [u["username"] for u in second["users"]] == ["User 2"]
+    assert second["next_cursor"] is None
+
+    bad = client.get("/users", params={"after": "not-a-cursor"})
+    assert bad.status_code == 400
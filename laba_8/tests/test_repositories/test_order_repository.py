@@ -1,6 +1,9 @@
 # tests/test_repositories/test_order_repository.py
+import asyncio
+
 import pytest
-from sqlalchemy import select
+from sqlalchemy import select, func
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import Order, Product, order_product
@@ -54,6 +57,28 @@ async def test_create_order_with_products(
     assert {link.product_id for link in links} == {product1.id, product2.id}
 
 
+@pytest.mark.asyncio
+async def test_create_order_without_refresh(
+    order_repository: OrderRepository,
+    product_repository: ProductRepository,
+    user_repository: UserRepository,
+    query_counter,
+):
+    """Тестирует, что после вставки заказа нет повторного SELECT (refresh)."""
+    user = await user_repository.create(UserCreate(username="Test User", email="test@example.com"))
+    product = await product_repository.create(ProductCreate(name="Product", price=10.0, stock_quantity=5))
+
+    query_counter.clear()
+    order = await order_repository.create(OrderCreate(user_id=user.id, product_ids=[product.id]))
+
+    assert order.id is not None
+    assert order.created_at is not None
+    # SELECT ... FOR UPDATE, UPDATE остатков, INSERT заказа, INSERT order_product
+    assert len(query_counter) == 4
+    assert "RETURNING" in query_counter[2]
+    assert all(not statement.startswith("SELECT") for statement in query_counter[1:])
+
+
 @pytest.mark.asyncio
 async def test_get_order_by_id(
     order_repository: OrderRepository,
@@ -83,17 +108,49 @@ async def test_get_order_by_id(
 
 
 @pytest.mark.asyncio
-async def test_update_order_status(order_repository: OrderRepository, test_db_session: AsyncSession):
-    """Тестирует обновление статуса заказа."""
-    # Пока пропущен
-    pass
+async def test_update_order_status(
+    order_repository: OrderRepository,
+    product_repository: ProductRepository,
+    user_repository: UserRepository,
+    test_db_session: AsyncSession,
+    query_counter,
+):
+    """Тестирует обновление статуса заказа одним UPDATE ... RETURNING."""
+    user = await user_repository.create(UserCreate(username="Test User", email="test@example.com"))
+    product = await product_repository.create(ProductCreate(name="Test Product", price=100.0, stock_quantity=5))
+    order = await order_repository.create(OrderCreate(user_id=user.id, product_ids=[product.id]))
+
+    query_counter.clear()
+    updated = await order_repository.update(order.id, "completed")
+
+    assert updated.status == "completed"
+    assert len(query_counter) == 1
+    assert await order_repository.update("nonexistent", "completed") is None
 
 
 @pytest.mark.asyncio
-async def test_delete_order(order_repository: OrderRepository, test_db_session: AsyncSession):
-    """Тестирует удаление заказа."""
-    # Пока пропущен
-    pass
+async def test_delete_order(
+    order_repository: OrderRepository,
+    product_repository: ProductRepository,
+    user_repository: UserRepository,
+    test_db_session: AsyncSession,
+    query_counter,
+):
+    """Тестирует удаление заказа вместе со строками order_product без предварительного SELECT."""
+    user = await user_repository.create(UserCreate(username="Test User", email="test@example.com"))
+    product = await product_repository.create(ProductCreate(name="Test Product", price=100.0, stock_quantity=5))
+    order = await order_repository.create(OrderCreate(user_id=user.id, product_ids=[product.id]))
+    order_id = order.id
+
+    query_counter.clear()
+    assert await order_repository.delete(order_id) is True
+    assert all(not statement.startswith("SELECT") for statement in query_counter)
+
+    links = await test_db_session.scalar(
+        select(func.count()).select_from(order_product).where(order_product.c.order_id == order_id)
+    )
+    assert links == 0
+    assert await order_repository.delete(order_id) is False
 
 
 @pytest.mark.asyncio
@@ -120,4 +177,112 @@ async def test_get_all_orders(
 
     orders = await order_repository.get_all(count=10, page=1)
 
-    assert len(orders) == 2
\ No newline at end of file
+    assert len(orders) == 2
+
+
+@pytest.mark.asyncio
+async def test_create_order_reserves_stock(
+    order_repository: OrderRepository,
+    product_repository: ProductRepository,
+    user_repository: UserRepository,
+    test_db_session: AsyncSession
+):
+    """Повторы product_id списываются как количество, нехватка остатка — ValueError."""
+    user = await user_repository.create(UserCreate(username="Test User", email="test@example.com"))
+    product = await product_repository.create(ProductCreate(name="Product", price=10.0, stock_quantity=3))
+    user_id, product_id = user.id, product.id
+
+    order = await order_repository.create(OrderCreate(user_id=user_id, product_ids=[product_id, product_id]))
+
+    result = await test_db_session.execute(
+        select(order_product.c.quantity).where(order_product.c.order_id == order.id)
+    )
+    assert result.scalar_one() == 2
+    stock = await test_db_session.scalar(select(Product.stock_quantity).where(Product.id == product_id))
+    assert stock == 1
+
+    with pytest.raises(ValueError, match="out of stock"):
+        await order_repository.create(OrderCreate(user_id=user_id, product_ids=[product_id, product_id]))
+
+    stock = await test_db_session.scalar(select(Product.stock_quantity).where(Product.id == product_id))
+    assert stock == 1
+
+
+@pytest.mark.asyncio
+async def test_create_order_retries_on_deadlock(order_repository: OrderRepository, monkeypatch):
+    """При deadlock_detected (40P01) транзакция создания заказа повторяется."""
+    calls = []
+
+    async def flaky_create(order_data):
+        calls.append(order_data)
+        if len(calls) == 1:
+            orig = Exception("deadlock detected")
+            orig.sqlstate = "40P01"
+            raise DBAPIError("UPDATE products ...", {}, orig)
+        return "order"
+
+    monkeypatch.setattr(order_repository, "_create", flaky_create)
+    monkeypatch.setattr("repositories.order_repository.ORDER_CREATE_RETRY_BASE_DELAY", 0)
+
+    result = await order_repository.create(OrderCreate(user_id="u1", product_ids=["p1"]))
+
+    assert result == "order"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_orders_do_not_oversell(pg_session_factory):
+    """Сотни одновременных заказов на один товар: продаём ровно столько, сколько есть."""
+    async with pg_session_factory() as session:
+        user = await UserRepository(session).create(UserCreate(username="Buyer", email="buyer@example.com"))
+        product = await ProductRepository(session).create(
+            ProductCreate(name="Hot Product", price=10.0, stock_quantity=50)
+        )
+
+    async def place_order() -> bool:
+        async with pg_session_factory() as session:
+            try:
+                await OrderRepository(session).create(OrderCreate(user_id=user.id, product_ids=[product.id]))
+                return True
+            except ValueError:
+                return False
+
+    results = await asyncio.gather(*(place_order() for _ in range(300)))
+
+    assert sum(results) == 50
+    async with pg_session_factory() as session:
+        stock = await session.scalar(select(Product.stock_quantity).where(Product.id == product.id))
+        links = await session.scalar(select(func.count()).select_from(order_product))
+    assert stock == 0
+    assert links == 50
+
+
+@pytest.mark.asyncio
+async def test_create_bulk_orders(
+    order_repository: OrderRepository,
+    product_repository: ProductRepository,
+    user_repository: UserRepository,
+    test_db_session: AsyncSession,
+    query_counter,
+):
+    """Пачка заказов: остаток распределяется по порядку, запросов — константа."""
+    user = await user_repository.create(UserCreate(username="Test User", email="test@example.com"))
+    product = await product_repository.create(ProductCreate(name="Product", price=10.0, stock_quantity=3))
+    user_id, product_id = user.id, product.id
+
+    orders = [OrderCreate(user_id=user_id, product_ids=[product_id]) for _ in range(5)]
+    orders.append(OrderCreate(user_id=user_id, product_ids=["missing"]))
+
+    query_counter.clear()
+    results = await order_repository.create_bulk(orders)
+
+    assert [order_id is not None for order_id, _ in results] == [True, True, True, False, False, False]
+    assert "out of stock" in results[3][1]
+    assert "not found" in results[5][1]
+    # SELECT ... FOR UPDATE, UPDATE, INSERT orders, INSERT order_product
+    assert len(query_counter) == 4
+
+    stock = await test_db_session.scalar(select(Product.stock_quantity).where(Product.id == product_id))
+    assert stock == 0
+    count = await test_db_session.scalar(select(func.count()).select_from(Order))
+    assert count == 3
@@ -4,8 +4,12 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import Product
+from repositories.order_repository import OrderRepository
 from repositories.product_repository import ProductRepository
-from schemas.product import ProductCreate, ProductUpdate
+from repositories.user_repository import UserRepository
+from schemas.order import OrderCreate
+from schemas.user import UserCreate
+from schemas.product import ProductCreate, ProductUpdate, ProductImport
 
 
 @pytest.mark.asyncio
@@ -90,6 +94,24 @@ async def test_delete_product(product_repository: ProductRepository, test_db_ses
     assert deleted_product is None
 
 
+@pytest.mark.asyncio
+async def test_delete_product_touches_orders(
+    product_repository: ProductRepository,
+    user_repository: UserRepository,
+    order_repository: OrderRepository,
+):
+    """Удаление продукта меняет состав заказов — их updated_at сдвигается."""
+    user = await user_repository.create(UserCreate(username="Test User", email="test@example.com"))
+    product = await product_repository.create(ProductCreate(name="Product", price=10.0, stock_quantity=5))
+    order = await order_repository.create(OrderCreate(user_id=user.id, product_ids=[product.id]))
+    assert order.updated_at is None
+
+    assert await product_repository.delete(product.id) is True
+
+    order = await order_repository.get_by_id(order.id)
+    assert order.updated_at is not None
+
+
 @pytest.mark.asyncio
 async def test_get_all_products(product_repository: ProductRepository, test_db_session: AsyncSession):
     """Тестирует получение списка продуктов."""
@@ -115,4 +137,49 @@ async def test_get_all_products(product_repository: ProductRepository, test_db_s
 
     assert len(products) == 2
     assert products[0].name == "Product 1"
-    assert products[1].name == "Product 2"
\ No newline at end of file
+    assert products[1].name == "Product 2"
+
+@pytest.mark.asyncio
+async def test_get_all_products_keyset(product_repository: ProductRepository, test_db_session: AsyncSession):
+    """Тестирует keyset-пагинацию: проход по курсору выдаёт все продукты без повторов."""
+    created = []
+    for i in range(5):
+        product = await product_repository.create(
+            ProductCreate(name=f"Product {i}", price=10.0 + i, stock_quantity=1)
+        )
+        created.append(product.id)
+
+    seen = []
+    after = None
+    while True:
+        page = await product_repository.get_all(count=2, after=after)
+        if not page:
+            break
+        seen.extend(p.id for p in page)
+        after = (page[-1].created_at, page[-1].id)
+
+    assert seen == created
+
+
+@pytest.mark.asyncio
+async def test_upsert_many_copy(pg_session_factory):
+    """Тестирует upsert пачки продуктов через COPY во временную таблицу (PostgreSQL)."""
+    async with pg_session_factory() as session:
+        repository = ProductRepository(session)
+        product = await repository.create(ProductCreate(name="Old", price=10.0, stock_quantity=1))
+
+        ids = await repository.upsert_many([
+            ProductImport(id=product.id, name="Renamed", price=20.0, stock_quantity=5),
+            ProductImport(name="New", price=30.0, stock_quantity=3),
+        ])
+
+        assert len(ids) == 2
+        result = await session.execute(
+            select(Product.name, Product.stock_quantity, Product.created_at, Product.updated_at)
+            .where(Product.id == product.id)
+        )
+        name, stock_quantity, created_at, updated_at = result.one()
+        assert (name, stock_quantity) == ("Renamed", 5)
+        # Обновление не трогает created_at и ставит свой updated_at
+        assert created_at == product.created_at and updated_at > created_at
+        assert await repository.get_total_count() == 2
@@ -0,0 +1,241 @@
+# tests/test_repositories/test_query_plans.py
+"""Регрессионные тесты планов запросов на PostgreSQL.
+
+Таблицы заполняются большим набором данных, затем каждый запрос, который
+отправляет репозиторий, прогоняется через EXPLAIN. Тест падает, если для
+горячего запроса планировщик выбрал Seq Scan по одной из больших таблиц,
+то есть запросу не хватает индекса.
+
+Запуск: TEST_DATABASE_URL=postgresql+asyncpg://... pytest tests/test_repositories/test_query_plans.py
+"""
+import json
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from repositories.order_repository import OrderRepository
+from repositories.product_repository import ProductRepository
+from models import REPORT_DEFAULT_PARTITION, Report
+from repositories.report_repository import REPORT_PARTITION_PREFIX, ReportRepository, partition_name
+from repositories.user_repository import UserRepository
+from schemas.pagination import decode_cursor, next_cursor
+
+USERS = 20_000
+PRODUCTS = 10_000
+ORDERS = 100_000  # по два продукта в каждом заказе
+REPORTS = 100_000  # по одному в минуту, ~70 дней (дневные секции)
+
+LARGE_TABLES = {"users", "addresses", "products", "orders", "order_product", "reports"}
+
+SEED_STATEMENTS = [
+    f"""INSERT INTO users (id, username, email, created_at)
+        SELECT 'user-' || g, 'user' || g, 'user' || g || '@example.com',
+               now() - g * interval '1 second'
+        FROM generate_series(1, {USERS}) AS g""",
+    f"""INSERT INTO addresses (id, user_id, street, city, state, zip_code, country, is_primary, created_at)
+        SELECT 'address-' || g, 'user-' || g, 'Street ' || g, 'City', 'State', '00000', 'RU', true, now()
+        FROM generate_series(1, {USERS}) AS g""",
+    f"""INSERT INTO products (id, name, price, stock_quantity, created_at)
+        SELECT 'product-' || g, 'Product ' || g, 10, 1000, now() - g * interval '1 second'
+        FROM generate_series(1, {PRODUCTS}) AS g""",
+    f"""INSERT INTO orders (id, user_id, status, created_at)
+        SELECT 'order-' || g, 'user-' || (g % {USERS} + 1), 'pending', now() - g * interval '1 second'
+        FROM generate_series(1, {ORDERS}) AS g""",
+    f"""INSERT INTO order_product (order_id, product_id, quantity)
+        SELECT 'order-' || g, 'product-' || (g % {PRODUCTS} + 1), 1 FROM generate_series(1, {ORDERS}) AS g
+        UNION ALL
+        SELECT 'order-' || g, 'product-' || ((g + 1) % {PRODUCTS} + 1), 1 FROM generate_series(1, {ORDERS}) AS g""",
+    f"""INSERT INTO reports (id, order_id, count_product, report_at)
+        SELECT 'report-' || g, 'order-' || (g % {ORDERS} + 1), 2, now() - g * interval '1 minute'
+        FROM generate_series(1, {REPORTS}) AS g""",
+]
+
+# Запросы, которые PostgreSQL сам выполняет при удалении строки родительской
+# таблицы, чтобы проверить внешние ключи (без индекса — Seq Scan на каждый DELETE)
+FOREIGN_KEY_LOOKUPS = [
+    ("orders", "user_id", "user-1"),
+    ("addresses", "user_id", "user-1"),
+    ("order_product", "product_id", "product-1"),
+    ("reports", "order_id", "order-1"),
+]
+
+
+async def seed_large_dataset(session_factory: async_sessionmaker) -> None:
+    async with session_factory() as session:
+        for statement in SEED_STATEMENTS:
+            await session.execute(text(statement))
+        await session.commit()
+    async with session_factory() as session:
+        # Отчёты попали в секцию по умолчанию — раскладываем их по дням
+        first_day = date.today() - timedelta(minutes=REPORTS + 1)
+        await ReportRepository(session).ensure_partitions(first_day, (date.today() - first_day).days + 1)
+    async with session_factory() as session:
+        # Без свежей статистики планировщик не знает, что таблицы большие
+        await session.execute(text("ANALYZE"))
+        await session.commit()
+
+
+async def capture_queries(
+    session: AsyncSession, call: Callable[[], Awaitable[Any]]
+) -> List[Tuple[str, Tuple]]:
+    """Выполнить call и вернуть отправленные в БД запросы с параметрами."""
+    queries: List[Tuple[str, Tuple]] = []
+    engine = session.bind.sync_engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            queries.append((statement, tuple(parameters or ())))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        await call()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return queries
+
+
+async def explain(session: AsyncSession, statement: str, parameters: Tuple = ()) -> Dict:
+    """План запроса в формате JSON (запрос не выполняется)."""
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    plan = await raw.driver_connection.fetchval(f"EXPLAIN (FORMAT JSON) {statement}", *parameters)
+    if isinstance(plan, str):  # без json-кодека, который ставит диалект asyncpg
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def scanned_relations(plan: Dict) -> Set[str]:
+    """Все таблицы (и секции), которые читает план."""
+    relations = {plan["Relation Name"]} if "Relation Name" in plan else set()
+    for child in plan.get("Plans", []):
+        relations |= scanned_relations(child)
+    return relations
+
+
+def parent_table(relation: str) -> str:
+    """Секции reports (reports_pYYYYMMDD, reports_default) — это таблица reports."""
+    if relation.startswith(REPORT_PARTITION_PREFIX) or relation == REPORT_DEFAULT_PARTITION:
+        return Report.__tablename__
+    return relation
+
+
+def seq_scanned_tables(plan: Dict) -> Set[str]:
+    """Большие таблицы (с учётом секций), которые план читает последовательным сканированием."""
+    tables = set()
+    if plan["Node Type"] == "Seq Scan" and parent_table(plan["Relation Name"]) in LARGE_TABLES:
+        tables.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        tables |= seq_scanned_tables(child)
+    return tables
+
+
+async def assert_no_seq_scans(
+    session: AsyncSession, call: Callable[[], Awaitable[Any]]
+) -> None:
+    queries = await capture_queries(session, call)
+    assert queries, "repository call sent no queries"
+    for statement, parameters in queries:
+        plan = await explain(session, statement, parameters)
+        assert not seq_scanned_tables(plan), f"Seq Scan in plan of:\n{statement}\n{json.dumps(plan, indent=2)}"
+
+
+@pytest.mark.asyncio
+async def test_user_queries_use_indexes(pg_session_factory: async_sessionmaker):
+    await seed_large_dataset(pg_session_factory)
+
+    async with pg_session_factory() as session:
+        users = UserRepository(session)
+        page = await users.get_by_filter(count=10, page=1)
+        after = decode_cursor(next_cursor(page, 10))
+
+        await assert_no_seq_scans(session, lambda: users.get_by_id("user-42"))
+        await assert_no_seq_scans(session, lambda: users.get_by_filter(count=10, page=1))
+        await assert_no_seq_scans(session, lambda: users.get_by_filter(count=10, page=1, after=after))
+        await assert_no_seq_scans(session, lambda: users.get_by_filter(count=10, page=1, email="user7@example.com"))
+        await assert_no_seq_scans(session, lambda: users.get_existing_ids(["user-1", "user-2", "missing"]))
+
+
+@pytest.mark.asyncio
+async def test_product_queries_use_indexes(pg_session_factory: async_sessionmaker):
+    await seed_large_dataset(pg_session_factory)
+
+    async with pg_session_factory() as session:
+        products = ProductRepository(session)
+        page = await products.get_all(count=10, page=1)
+        after = decode_cursor(next_cursor(page, 10))
+
+        await assert_no_seq_scans(session, lambda: products.get_by_id("product-42"))
+        await assert_no_seq_scans(session, lambda: products.get_all(count=10, page=1, after=after))
+        # Сначала удаляются строки order_product по product_id, затем сам продукт
+        await assert_no_seq_scans(session, lambda: products.delete("product-42"))
+
+
+@pytest.mark.asyncio
+async def test_order_queries_use_indexes(pg_session_factory: async_sessionmaker):
+    await seed_large_dataset(pg_session_factory)
+
+    async with pg_session_factory() as session:
+        orders = OrderRepository(session)
+        page = await orders.get_all(count=10, page=1)
+        after = decode_cursor(next_cursor(page, 10))
+
+        # selectinload(Order.products) — второй запрос через order_product
+        await assert_no_seq_scans(session, lambda: orders.get_by_id("order-42"))
+        await assert_no_seq_scans(session, lambda: orders.get_all(count=10, page=1, after=after))
+        await assert_no_seq_scans(session, lambda: orders.update("order-42", "completed"))
+
+
+@pytest.mark.asyncio
+async def test_report_queries_use_indexes(pg_session_factory: async_sessionmaker):
+    await seed_large_dataset(pg_session_factory)
+
+    async with pg_session_factory() as session:
+        reports = ReportRepository(session)
+        today = date.today()
+        week_ago = datetime.combine(today - timedelta(days=7), datetime.min.time())
+
+        await assert_no_seq_scans(session, lambda: reports.get_by_date(today, count=100))
+        await assert_no_seq_scans(session, lambda: reports.get_by_range(week_ago, week_ago + timedelta(hours=6)))
+
+
+@pytest.mark.asyncio
+async def test_report_queries_prune_partitions(pg_session_factory: async_sessionmaker):
+    await seed_large_dataset(pg_session_factory)
+
+    async with pg_session_factory() as session:
+        reports = ReportRepository(session)
+        today = date.today()
+        week_ago = datetime.combine(today - timedelta(days=7), datetime.min.time())
+        page = await reports.get_by_date(today - timedelta(days=3), count=10)
+        after = decode_cursor(next_cursor(page, 10, field="report_at"))
+
+        cases = [
+            (lambda: reports.get_by_date(today), {partition_name(today)}),
+            (lambda: reports.get_by_date(today, count=100), {partition_name(today)}),
+            (
+                lambda: reports.get_by_range(week_ago, week_ago + timedelta(days=2)),
+                {partition_name(week_ago.date()), partition_name(week_ago.date() + timedelta(days=1))},
+            ),
+            # Курсор ограничивает report_at сверху: секции новее него не читаются
+            (
+                lambda: reports.get_by_range(end=datetime.now() + timedelta(days=1), count=10, after=after),
+                {partition_name(today - timedelta(days=d)) for d in range(3, 100)}
+                | {REPORT_DEFAULT_PARTITION},
+            ),
+        ]
+        for call, allowed in cases:
+            for statement, parameters in await capture_queries(session, call):
+                touched = scanned_relations(await explain(session, statement, parameters))
+                assert touched and touched <= allowed, f"Partitions not pruned: {sorted(touched)}"
+
+@pytest.mark.asyncio
+async def test_foreign_key_lookups_use_indexes(pg_session_factory: async_sessionmaker):
+    await seed_large_dataset(pg_session_factory)
+
+    async with pg_session_factory() as session:
+        for table, column, value in FOREIGN_KEY_LOOKUPS:
+            plan = await explain(session, f"SELECT 1 FROM {table} WHERE {column} = $1", (value,))
+            assert not seq_scanned_tables(plan), f"{table}.{column} is not indexed"
@@ -0,0 +1,188 @@
+# tests/test_repositories/test_report_repository.py
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from models import Order, Report, User, REPORT_DEFAULT_PARTITION
+from repositories.report_repository import ReportRepository, partition_name
+
+
+async def create_reports(session: AsyncSession, *moments: datetime) -> None:
+    user = User(username="Test User", email="test@example.com")
+    session.add(user)
+    await session.flush()
+    order = Order(user_id=user.id)
+    session.add(order)
+    await session.flush()
+    session.add_all(Report(order_id=order.id, count_product=1, report_at=moment) for moment in moments)
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_get_by_date_day_boundaries(report_repository: ReportRepository, test_db_session: AsyncSession):
+    """Тестирует, что дата — это полуинтервал [00:00, 00:00 следующего дня)."""
+    await create_reports(
+        test_db_session,
+        datetime(2025, 12, 15, 23, 59, 59),
+        datetime(2025, 12, 16, 0, 0, 0),
+        datetime(2025, 12, 16, 12, 30, 0),
+        datetime(2025, 12, 16, 23, 59, 59, 999999),
+        datetime(2025, 12, 17, 0, 0, 0),
+    )
+
+    reports = await report_repository.get_by_date(date(2025, 12, 16))
+
+    assert [r.report_at for r in reports] == [
+        datetime(2025, 12, 16, 23, 59, 59, 999999),
+        datetime(2025, 12, 16, 12, 30, 0),
+        datetime(2025, 12, 16, 0, 0, 0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_by_range(report_repository: ReportRepository, test_db_session: AsyncSession):
+    """Тестирует диапазон [start, end) с открытыми границами и keyset-курсором."""
+    await create_reports(test_db_session, *(datetime(2025, 12, day, 10) for day in range(10, 20)))
+
+    reports = await report_repository.get_by_range(datetime(2025, 12, 12), datetime(2025, 12, 15, 10))
+    assert [r.report_at.day for r in reports] == [14, 13, 12]
+
+    reports = await report_repository.get_by_range(start=datetime(2025, 12, 18))
+    assert [r.report_at.day for r in reports] == [19, 18]
+
+    page = await report_repository.get_by_range(end=datetime(2025, 12, 15), count=2)
+    assert [r.report_at.day for r in page] == [14, 13]
+    last = page[-1]
+    page = await report_repository.get_by_range(
+        end=datetime(2025, 12, 15), count=2, after=(last.report_at, last.id)
+    )
+    assert [r.report_at.day for r in page] == [12, 11]
+
+
+@pytest.mark.asyncio
+async def test_partitions_noop_outside_postgres(report_repository: ReportRepository):
+    """На SQLite секционирования нет: обслуживание секций ничего не делает."""
+    assert await report_repository.ensure_partitions(date(2025, 12, 16), 3) == []
+    assert await report_repository.drop_partitions_before(date(2025, 12, 16)) == []
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_moves_default_rows(pg_session_factory: async_sessionmaker):
+    """Новая секция забирает строки, уже попавшие в секцию по умолчанию."""
+    async with pg_session_factory() as session:
+        await create_reports(session, datetime(2025, 12, 16, 10), datetime(2025, 12, 18, 10))
+        repository = ReportRepository(session)
+
+        created = await repository.ensure_partitions(date(2025, 12, 16), 2)
+
+        assert created == [partition_name(date(2025, 12, 16)), partition_name(date(2025, 12, 17))]
+        assert await repository.ensure_partitions(date(2025, 12, 16), 2) == []
+        placement = dict((await session.execute(
+            text("SELECT report_at::date, tableoid::regclass::text FROM reports")
+        )).all())
+        assert placement == {
+            date(2025, 12, 16): "reports_p20251216",
+            date(2025, 12, 18): REPORT_DEFAULT_PARTITION,
+        }
+        reports = await repository.get_by_range(datetime(2025, 12, 1), datetime(2025, 12, 31))
+        assert len(reports) == 2
+
+
+@pytest.mark.asyncio
+async def test_drop_partitions_before(pg_session_factory: async_sessionmaker):
+    """Секции старше cutoff удаляются (или отсоединяются), свежие остаются."""
+    async with pg_session_factory() as session:
+        await create_reports(session, *(datetime(2025, 12, day, 10) for day in range(10, 16)))
+        repository = ReportRepository(session)
+        await repository.ensure_partitions(date(2025, 12, 10), 4)
+
+        dropped = await repository.drop_partitions_before(date(2025, 12, 12))
+        assert dropped == [partition_name(date(2025, 12, 10)), partition_name(date(2025, 12, 11))]
+
+        detached = await repository.drop_partitions_before(date(2025, 12, 13), detach=True)
+        assert detached == [partition_name(date(2025, 12, 12))]
+        assert await repository.get_partition_days() == [date(2025, 12, 13)]
+        # Отсоединённая секция осталась отдельной таблицей с данными
+        assert await session.scalar(text("SELECT count(*) FROM reports_p20251212")) == 1
+        await session.execute(text("DROP TABLE reports_p20251212"))
+        await session.commit()
+
+        # Строки из секции по умолчанию тоже подчищаются по retention
+        remaining = await repository.get_by_range()
+        assert sorted(r.report_at.day for r in remaining) == [13, 14, 15]
+
+
+@pytest.mark.asyncio
+async def test_count_products_by_order_incremental(report_repository: ReportRepository, test_db_session: AsyncSession):
+    """Тестирует, что с отметкой пересчитываются только изменённые заказы."""
+    user = User(username="Test User", email="test@example.com")
+    test_db_session.add(user)
+    await test_db_session.flush()
+    old = Order(user_id=user.id, created_at=datetime(2025, 12, 16, 9))
+    touched = Order(user_id=user.id, created_at=datetime(2025, 12, 16, 9), updated_at=datetime(2025, 12, 16, 11))
+    new = Order(user_id=user.id, created_at=datetime(2025, 12, 16, 11))
+    late = Order(user_id=user.id, created_at=datetime(2025, 12, 16, 13))
+    test_db_session.add_all([old, touched, new, late])
+    await test_db_session.commit()
+
+    everything = await report_repository.count_products_by_order()
+    assert {order_id for order_id, _ in everything} == {old.id, touched.id, new.id, late.id}
+
+    changed = await report_repository.count_products_by_order(
+        datetime(2025, 12, 16, 10), datetime(2025, 12, 16, 12)
+    )
+    assert sorted(changed) == sorted([(touched.id, 0), (new.id, 0)])
+
+
+@pytest.mark.asyncio
+async def test_watermark_roundtrip(report_repository: ReportRepository, test_db_session: AsyncSession):
+    """Тестирует сохранение и обновление отметки."""
+    assert await report_repository.get_watermark("order_reports") is None
+
+    await report_repository.set_watermark("order_reports", datetime(2025, 12, 16, 10))
+    await report_repository.set_watermark("order_reports", datetime(2025, 12, 16, 11))
+    await test_db_session.commit()
+
+    assert await report_repository.get_watermark("order_reports") == datetime(2025, 12, 16, 11)
+    assert await report_repository.get_watermark("other") is None
+
+
+@pytest.mark.asyncio
+async def test_stream_and_create_many(report_repository: ReportRepository, test_db_session: AsyncSession):
+    """Тестирует потоковый расчёт пачками и запись пачки отчётов."""
+    user = User(username="Test User", email="test@example.com")
+    test_db_session.add(user)
+    await test_db_session.flush()
+    test_db_session.add_all(Order(user_id=user.id) for _ in range(7))
+    await test_db_session.commit()
+
+    chunks = [chunk async for chunk in report_repository.stream_products_by_order(chunk_size=3)]
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+
+    report_at = datetime(2025, 12, 16, 10)
+    report_ids = await report_repository.create_many(chunks[0], report_at=report_at)
+
+    reports = await report_repository.get_by_date(date(2025, 12, 16))
+    assert {r.id for r in reports} == set(report_ids)
+    assert {r.order_id for r in reports} == {order_id for order_id, _ in chunks[0]}
+    assert await report_repository.create_many([], report_at=report_at) == []
+
+
+@pytest.mark.asyncio
+async def test_create_many_copy(pg_session_factory: async_sessionmaker):
+    """На PostgreSQL пачка пишется через COPY и раскладывается по секциям."""
+    async with pg_session_factory() as session:
+        await create_reports(session)
+        order_id = await session.scalar(text("SELECT id FROM orders"))
+        repository = ReportRepository(session)
+        await repository.ensure_partitions(date(2025, 12, 16), 1)
+
+        await repository.create_many([(order_id, 3)], report_at=datetime(2025, 12, 16, 10))
+        await repository.create_many([(order_id, 4)], report_at=datetime(2025, 12, 17, 10))
+
+        placement = dict((await session.execute(
+            text("SELECT count_product, tableoid::regclass::text FROM reports")
+        )).all())
+        assert placement == {3: "reports_p20251216", 4: REPORT_DEFAULT_PARTITION}
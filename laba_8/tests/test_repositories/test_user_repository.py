@@ -24,6 +24,17 @@ async def test_create_user(user_repository: UserRepository, test_db_session: Asy
     assert saved_user.username == "Test User"
 
 
+@pytest.mark.asyncio
+async def test_create_user_single_statement(user_repository: UserRepository, query_counter):
+    """Тестирует, что id и created_at приходят из INSERT ... RETURNING без refresh."""
+    user = await user_repository.create(UserCreate(username="Test User", email="test@example.com"))
+
+    assert user.id is not None
+    assert user.created_at is not None
+    assert len(query_counter) == 1
+    assert query_counter[0].startswith("INSERT") and "RETURNING" in query_counter[0]
+
+
 @pytest.mark.asyncio
 async def test_get_user_by_id(user_repository: UserRepository, test_db_session: AsyncSession):
     """Тестирует получение пользователя по ID."""
@@ -90,4 +101,16 @@ async def test_get_all_users(user_repository: UserRepository, test_db_session: A
     users = await user_repository.get_by_filter(count=10, page=1)  
     assert len(users) == 2
     assert users[0].username == "User 1"
-    assert users[1].username == "User 2"
\ No newline at end of file
+    assert users[1].username == "User 2"
+
+@pytest.mark.asyncio
+async def test_get_total_count_with_filter(user_repository: UserRepository, test_db_session: AsyncSession):
+    """Тестирует COUNT(*) с теми же фильтрами, что и get_by_filter."""
+    await user_repository.create(UserCreate(username="User 1", email="user1@example.com"))
+    await user_repository.create(UserCreate(username="User 2", email="user2@example.com"))
+
+    assert await user_repository.get_total_count() == 2
+    assert await user_repository.get_total_count(email="user1@example.com") == 1
+    assert await user_repository.get_total_count(email="missing@example.com") == 0
+    # На SQLite статистики планировщика нет — оценка недоступна
+    assert await user_repository.get_estimated_count() is None
@@ -0,0 +1,597 @@
+# tests/test_services/test_cache.py
+import asyncio
+import json
+
+import msgspec
+import pytest
+from litestar.plugins.pydantic import PydanticInitPlugin
+from litestar.serialization import encode_json, get_serializer
+
+from repositories.product_repository import ProductRepository
+from repositories.user_repository import UserRepository
+from schemas.product import ProductCached, ProductCreate, ProductResponse
+from schemas.user import UserCreate
+from services import cache as cache_module
+from services.cache import MISSING, CacheInvalidationListener, LocalCache, TwoTierCache
+from services.cache_codecs import MsgspecJsonCodec, cache_codec
+from services.id_filter import IdFilter
+from services.product_service import ProductService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+CODEC = MsgspecJsonCodec(ProductCached)
+
+
+def product(name="Product", price=10.0):
+    return ProductCached(id="p1", name=name, price=price, stock_quantity=3)
+
+
+def legacy_json(value):
+    """Запись прежнего формата: json.dumps(model_dump()) без заголовка."""
+    return json.dumps(msgspec.structs.asdict(value))
+
+
+def test_local_cache_evicts_lru_by_entries_and_bytes(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    local = LocalCache("test", max_entries=3, max_bytes=100, ttl=30)
+
+    for key in ("a", "b", "c"):
+        local.set(key, key.upper(), size=30)
+    local.get("a")  # a теперь самый свежий
+    local.set("d", "D", size=30)
+    assert (local.get("b"), len(local), local.bytes) == (None, 3, 90)
+
+    # Крупная запись вытесняет по байтам, а не по числу записей
+    local.set("e", "E", size=60)
+    assert sorted(local._entries) == ["d", "e"]
+    assert (local.bytes, local.evictions) == (90, 3)
+    local.set("huge", "H", size=101)
+    assert local.get("huge") is None
+
+    clock.now += 31
+    assert local.get("d") is None and local.bytes == 60
+
+
+@pytest.mark.asyncio
+async def test_two_tier_cache_serves_hot_reads_from_memory(fake_redis):
+    """Промах -> loader, повтор — из L1 без Redis; другой экземпляр читает из Redis."""
+    redis = fake_redis
+    local = LocalCache("product")
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return product()
+
+    cache = TwoTierCache(redis, "product", CODEC, ttl=600, local=local)
+    assert await cache.get_or_load("p1", loader) == product()
+    redis.round_trips = 0
+    for _ in range(100):
+        assert (await cache.get_or_load("p1", loader)).name == "Product"
+    assert (len(loads), redis.round_trips) == (1, 0)
+
+    other_instance = LocalCache("product")
+    other = TwoTierCache(redis, "product", CODEC, ttl=600, local=other_instance)
+    assert await other.get_or_load("p1", loader) == product()
+    assert len(loads) == 1
+
+    assert local.stats()["l1_hit_ratio"] == round(100 / 101, 4)
+    assert (local.stats()["l2_hit_ratio"], other_instance.stats()["l2_hit_ratio"]) == (0.0, 1.0)
+    assert local.stats()["bytes"] == len(redis.data["cache:product:p1"])
+
+
+@pytest.mark.asyncio
+async def test_update_invalidates_memory_cache_of_other_instances(monkeypatch, fake_redis):
+    redis = fake_redis
+    instance_a, instance_b = LocalCache("product"), LocalCache("product")
+    cache_b = TwoTierCache(redis, "product", CODEC, ttl=600, local=instance_b)
+
+    async def loader():
+        return product()
+
+    await cache_b.get_or_load("p1", loader)
+    assert instance_b.get("p1") is not None
+
+    # Экземпляр A (другой процесс) обновляет продукт: Redis + сообщение в том же pipeline
+    monkeypatch.setattr(cache_module, "INSTANCE_ID", "instance-a")
+    cache_a = TwoTierCache(redis, "product", CODEC, ttl=600, local=instance_a)
+    redis.round_trips = 0
+    await cache_a.set("p1", product(name="Renamed"))
+    assert redis.round_trips == 1
+    monkeypatch.undo()
+
+    channel, message = redis.published[-1]
+    assert channel == "cache:invalidate"
+    listener = CacheInvalidationListener(redis, caches={"product": instance_b})
+    listener.apply(message)
+
+    assert instance_b.get("p1") is None
+    assert (await cache_b.get_or_load("p1", loader)).name == "Renamed"
+    # Собственные сообщения процесс пропускает
+    monkeypatch.setattr(cache_module, "INSTANCE_ID", "instance-a")
+    CacheInvalidationListener(redis, caches={"product": instance_a}).apply(message)
+    assert instance_a.get("p1").name == "Renamed"
+
+
+@pytest.mark.asyncio
+async def test_value_read_before_invalidation_is_not_kept_in_memory(fake_redis):
+    """Инвалидация, пришедшая во время чтения из Redis, не даёт положить в L1 старое значение."""
+    redis = fake_redis
+    redis.data["cache:product:p1"] = legacy_json(product(name="Old"))
+    local = LocalCache("product")
+    listener = CacheInvalidationListener(redis, caches={"product": local})
+    redis.on_get = lambda: listener.apply(json.dumps({"source": "other", "namespace": "product", "keys": ["p1"]}))
+
+    cache = TwoTierCache(redis, "product", CODEC, ttl=600, local=local)
+    assert (await cache.get_or_load("p1", None)).name == "Old"
+    assert local.get("p1") is None
+
+
+@pytest.mark.asyncio
+async def test_invalidation_of_other_key_does_not_drop_loaded_value(fake_redis):
+    """Поколения по ключам: под потоком инвалидаций других ключей горячий ключ всё равно попадает в L1."""
+    redis = fake_redis
+    redis.data["cache:product:p1"] = legacy_json(product(name="Hot"))
+    local = LocalCache("product")
+    listener = CacheInvalidationListener(redis, caches={"product": local})
+    redis.on_get = lambda: listener.apply(json.dumps({"source": "other", "namespace": "product", "keys": ["p2"]}))
+
+    cache = TwoTierCache(redis, "product", CODEC, ttl=600, local=local)
+    assert (await cache.get_or_load("p1", None)).name == "Hot"
+    assert local.get("p1").name == "Hot"
+
+
+@pytest.mark.asyncio
+async def test_load_started_before_update_does_not_overwrite_it(fake_redis):
+    """Промах читает строку до UPDATE, а set успевает раньше: старая строка не попадает ни в L1, ни в Redis."""
+    local = LocalCache("product")
+    cache = TwoTierCache(fake_redis, "product", CODEC, ttl=600, local=local)
+    selected = asyncio.Event()
+    updated = asyncio.Event()
+
+    async def slow_loader():
+        selected.set()
+        await updated.wait()
+        return product(name="Old")
+
+    load = asyncio.create_task(cache.get_or_load("p1", slow_loader))
+    await selected.wait()
+    await TwoTierCache(fake_redis, "product", CODEC, ttl=600, local=local).set("p1", product(name="New"))
+    updated.set()
+    await load
+
+    assert local.get("p1").name == "New"
+    assert b'"name":"New"' in fake_redis.data["cache:product:p1"]
+
+
+def test_local_cache_generations_are_bounded():
+    local = LocalCache("product", max_entries=2)
+    snapshot = local.generation("p1")
+    for key in ("a", "b", "c"):
+        local.delete(key)
+
+    assert len(local._generations) == 1
+    # Сброс счётчиков — новая эпоха: загрузка, начатая до него, в L1 не попадёт
+    local.set("p1", "value", 1, snapshot)
+    assert local.get("p1") is None
+
+
+class FakePubSub:
+    def __init__(self, messages, between=None):
+        self.messages = messages
+        self.between = between
+        self.delivered = asyncio.Event()
+        self.closed = False
+
+    async def subscribe(self, channel):
+        self.channel = channel
+
+    async def listen(self):
+        yield {"type": "subscribe", "data": 1}
+        # Запросы успели заполнить L1 после подписки
+        self.between()
+        for message in self.messages:
+            yield message
+        self.delivered.set()
+        await asyncio.Event().wait()
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_listener_clears_on_subscribe_and_applies_invalidations(fake_redis):
+    local = LocalCache("user")
+    local.set("before-subscribe", "value", size=10)
+
+    def fill():
+        local.set("stale", "value", size=10)
+        local.set("kept", "value", size=10)
+
+    message = json.dumps({"source": "other", "namespace": "user", "keys": ["stale"]})
+    pubsub = FakePubSub([{"type": "message", "data": message}], between=fill)
+    redis = fake_redis
+    redis.pubsub = lambda: pubsub
+
+    listener = CacheInvalidationListener(redis, caches={"user": local})
+    listener.start()
+    await asyncio.wait_for(pubsub.delivered.wait(), timeout=1)
+    await listener.close()
+
+    assert pubsub.channel == "cache:invalidate" and pubsub.closed
+    # Инвалидации до подписки могли пройти мимо — L1 очищен целиком
+    assert local.get("before-subscribe") is None
+    assert (local.get("stale"), local.get("kept")) == (None, "value")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_across_instances_make_one_db_query(
+    product_repository: ProductRepository,
+    query_counter,
+    fake_redis,
+):
+    """Нагрузочный тест: 300 одновременных промахов на 3 экземплярах — один SELECT в БД."""
+    created = await product_repository.create(ProductCreate(name="Hot", price=5.0, stock_quantity=1))
+    redis = fake_redis
+    redis.latency = 0.002
+    instances = [LocalCache("product") for _ in range(3)]
+    query_counter.clear()
+
+    async def request(i):
+        service = ProductService(product_repository, redis_client=redis)
+        service.cache = TwoTierCache(
+            redis, "product", CODEC, ttl=600, local=instances[i % 3], lock_poll_ms=5,
+        )
+        return await service.get_by_id(created.id)
+
+    results = await asyncio.gather(*(request(i) for i in range(300)))
+
+    assert {product.name for product in results} == {"Hot"}
+    assert len([q for q in query_counter if q.lstrip().upper().startswith("SELECT")]) == 1
+    stats = [instance.stats() for instance in instances]
+    assert sum(s["loads"] for s in stats) == 1
+    # Остальные экземпляры дождались значения через блокировку, а не пошли в БД
+    assert sum(s["lock_waits"] for s in stats) == 2
+    assert sum(s["coalesced"] for s in stats) == 297
+    assert "lock:cache:product:" + created.id not in redis.data
+
+
+@pytest.mark.asyncio
+async def test_shared_miss_load_does_not_use_first_request_session(fake_redis):
+    """Общую загрузку ждут и другие запросы: она идёт своей сессией, а не сессией первого запроса."""
+    redis = fake_redis
+    cache = TwoTierCache(redis, "product", CODEC, ttl=60, local=LocalCache("product"))
+    release = asyncio.Event()
+    closed = False
+
+    async def request_loader():
+        await release.wait()
+        if closed:
+            raise RuntimeError("session is closed")
+        return product()
+
+    async def detached_loader():
+        await release.wait()
+        return product()
+
+    first = asyncio.ensure_future(cache.get_or_load("p1", request_loader, refresh_loader=detached_loader))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(cache.get_or_load("p1", request_loader, refresh_loader=detached_loader))
+    await asyncio.sleep(0)
+    # Первый запрос отменён, его сессия закрыта, а второй всё ещё ждёт общую загрузку
+    first.cancel()
+    closed = True
+    release.set()
+
+    assert await second == product()
+    assert cache.local.coalesced == 1
+
+
+@pytest.mark.asyncio
+async def test_waiters_load_themselves_when_lock_holder_hangs(fake_redis):
+    redis = fake_redis
+    redis.data["lock:cache:product:p1"] = "dead-instance"
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return product()
+
+    cache = TwoTierCache(
+        redis, "product", CODEC, ttl=600, local=LocalCache("product"), lock_ttl_ms=50, lock_poll_ms=10,
+    )
+    assert await cache.get_or_load("p1", loader) == product()
+    assert loads == [1]
+    # Чужую блокировку не снимаем
+    assert redis.data["lock:cache:product:p1"] == "dead-instance"
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_while_refreshing_in_background(monkeypatch, fake_redis):
+    """После мягкого срока запрос не ждёт БД: отдаётся старое значение, обновление — в фоне."""
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    redis = fake_redis
+    local = LocalCache("product", ttl=1)
+    cache = TwoTierCache(redis, "product", CODEC, ttl=60, stale_ttl=300, local=local)
+
+    async def old_loader():
+        return product(name="Old")
+
+    await cache.get_or_load("p1", old_loader)
+    clock.now += 61
+    release = asyncio.Event()
+
+    async def slow_loader():
+        await release.wait()
+        return product(name="New")
+
+    # Загрузка заблокирована, но ответ приходит сразу
+    stale = await asyncio.wait_for(cache.get_or_load("p1", old_loader, refresh_loader=slow_loader), timeout=1)
+    assert stale.name == "Old"
+    assert await cache.get_or_load("p1", old_loader, refresh_loader=slow_loader) == stale
+    assert (local.stale_hits, len(local.refreshing)) == (1, 1)
+
+    release.set()
+    await asyncio.gather(*local.refreshing.values())
+    assert local.get("p1").name == "New"
+    assert redis.data["cache:product:p1"].startswith(f"{clock.now + 60:.3f}|".encode())
+    assert "lock:cache:product:p1" not in redis.data
+
+
+@pytest.mark.asyncio
+async def test_xfetch_refreshes_slow_entries_before_expiry(monkeypatch, fake_redis):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    monkeypatch.setattr(cache_module.random, "random", lambda: 0.9)  # -ln(0.1) ≈ 2.3
+    redis = fake_redis
+    payload = legacy_json(product())
+    # До мягкого срока 10 с: загрузка за 5 с обновляется заранее, за 1 мс — нет
+    redis.data["cache:product:slow"] = f"{clock.now + 10:.3f}|5.0000|{payload}"
+    redis.data["cache:product:fast"] = f"{clock.now + 10:.3f}|0.0010|{payload}"
+    local = LocalCache("product")
+    cache = TwoTierCache(redis, "product", CODEC, ttl=60, local=local)
+
+    async def loader():
+        return product(name="Refreshed")
+
+    assert (await cache.get_or_load("slow", loader)).name == "Product"
+    assert (await cache.get_or_load("fast", loader)).name == "Product"
+    assert (local.early_refreshes, local.stale_hits) == (1, 0)
+    await asyncio.gather(*local.refreshing.values())
+    assert b"Refreshed" in redis.data["cache:product:slow"]
+    assert "Refreshed" not in redis.data["cache:product:fast"]
+
+
+@pytest.mark.asyncio
+async def test_refresh_drops_entry_deleted_from_db(monkeypatch, fake_redis):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    redis = fake_redis
+    # Запись прежнего формата (без мягкого срока) читается как есть
+    redis.data["cache:product:p1"] = legacy_json(product())
+    local = LocalCache("product")
+    cache = TwoTierCache(redis, "product", CODEC, ttl=60, local=local)
+
+    async def missing():
+        return None
+
+    assert (await cache.get_or_load("p1", missing)).name == "Product"
+    assert local.stale_hits == 0
+
+    redis.data["cache:product:p1"] = f"{clock.now - 1:.3f}|0.0100|{legacy_json(product())}"
+    local.clear()
+    await cache.get_or_load("p1", missing)
+    await asyncio.gather(*local.refreshing.values())
+    # Устаревшее значение удалено, L1 остальных экземпляров сброшен
+    assert "cache:product:p1" not in redis.data and local.get("p1") is None
+    assert json.loads(redis.published[-1][1])["keys"] == ["p1"]
+    # Надгробие ставит следующее чтение
+    assert await cache.get_or_load("p1", missing) is None
+    assert redis.data["cache:product:p1"].endswith("|null")
+    assert local.get("p1") is MISSING
+
+
+@pytest.mark.asyncio
+async def test_missing_id_is_cached_until_created(monkeypatch, fake_redis):
+    """Несуществующий id — один запрос в БД, дальше надгробие; create снимает его на всех экземплярах."""
+    redis = fake_redis
+    instance_a, instance_b = LocalCache("product"), LocalCache("product")
+    cache_b = TwoTierCache(redis, "product", CODEC, ttl=60, negative_ttl=30, local=instance_b)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return product(name="Created") if len(loads) > 1 else None
+
+    for _ in range(50):
+        assert await cache_b.get_or_load("p1", loader) is None
+    assert len(loads) == 1
+    assert instance_b.stats()["negative_hits"] == 49
+    # Второй экземпляр видит надгробие в Redis
+    cache_a = TwoTierCache(redis, "product", CODEC, ttl=60, local=instance_a)
+    assert await cache_a.get_or_load("p1", loader) is None
+    assert (len(loads), instance_a.negative_hits) == (1, 1)
+
+    monkeypatch.setattr(cache_module, "INSTANCE_ID", "instance-a")
+    await cache_a.created("p1")
+    monkeypatch.undo()
+    assert "cache:product:p1" not in redis.data
+    CacheInvalidationListener(redis, caches={"product": instance_b}).apply(redis.published[-1][1])
+
+    assert (await cache_b.get_or_load("p1", loader)).name == "Created"
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_id_filter_rejects_absent_ids_without_db_or_cache_reads(fake_redis):
+    redis = fake_redis
+    id_filter = IdFilter(redis, "user", capacity=1000, error_rate=0.01)
+    local = LocalCache("user")
+    cache = TwoTierCache(redis, "user", CODEC, ttl=60, local=local, id_filter=id_filter)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return None
+
+    # До пересборки фильтр ничего не отсекает
+    assert await cache.get_or_load("ghost-1", loader) is None
+    assert (len(loads), local.filter_rejects) == (1, 0)
+
+    async def existing_ids():
+        yield [f"user-{i}" for i in range(500)]
+        yield [f"user-{i}" for i in range(500, 1000)]
+
+    assert await id_filter.rebuild(existing_ids()) == 1000
+    assert "idfilter:user:next" not in redis.data
+
+    rejected = 0
+    for i in range(1000):
+        async with redis.pipeline() as pipe:
+            id_filter.check(pipe, f"user-{i}")
+            assert not id_filter.absent(await pipe.execute())
+        async with redis.pipeline() as pipe:
+            id_filter.check(pipe, f"ghost-{i}")
+            rejected += id_filter.absent(await pipe.execute())
+    # Ложных «нет» нет, ложных «есть» — около error_rate
+    assert rejected >= 970
+
+    redis.round_trips = 0
+    assert await cache.get_or_load("ghost-2", loader) is None
+    assert (len(loads), local.filter_rejects, redis.round_trips) == (1, 1, 1)
+
+    # Новый id попадает в фильтр сразу при create
+    await cache.created("ghost-3")
+    assert await cache.get_or_load("ghost-3", loader) is None
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_tombstone_does_not_overwrite_value_written_meanwhile(fake_redis):
+    """Промах по ещё не созданному id: пока шёл SELECT, другой экземпляр создал строку и закэшировал её."""
+    cache = TwoTierCache(fake_redis, "product", CODEC, ttl=60, local=LocalCache("product"))
+    other = TwoTierCache(fake_redis, "product", CODEC, ttl=60, local=LocalCache("product"))
+
+    async def select_before_insert():
+        await other.created("p1")
+        await other.set("p1", product())
+        return None
+
+    assert await cache.get_or_load("p1", select_before_insert) is None
+    assert not fake_redis.data["cache:product:p1"].endswith(b"|null")
+    assert cache.local.get("p1") is None
+
+
+@pytest.mark.asyncio
+async def test_reset_filter_rejects_nothing_until_rebuilt(fake_redis):
+    """Строки, вставленные в обход сервисов: после reset фильтр не отвечает «нет», пока не пересобран."""
+    id_filter = IdFilter(fake_redis, "user", capacity=1000, error_rate=0.01)
+
+    async def ids(*items):
+        yield list(items)
+
+    async def absent(item):
+        async with fake_redis.pipeline() as pipe:
+            id_filter.check(pipe, item)
+            return id_filter.absent(await pipe.execute())
+
+    await id_filter.rebuild(ids("user-1"))
+    assert await absent("seeded")
+    await id_filter.reset()
+    assert not await absent("seeded")
+    await id_filter.rebuild(ids("user-1", "seeded"))
+    assert not await absent("seeded") and await absent("ghost")
+
+
+@pytest.mark.asyncio
+async def test_id_filter_writes_rebuild_key_only_during_rebuild(fake_redis):
+    """add вне пересборки не создаёт idfilter:<ns>:next; id, добавленный посреди пересборки, не теряется."""
+    id_filter = IdFilter(fake_redis, "user", capacity=1000, error_rate=0.01)
+
+    async def add(item):
+        async with fake_redis.pipeline() as pipe:
+            id_filter.add(pipe, [item])
+            await pipe.execute()
+
+    await add("user-1")
+    assert id_filter.next_key not in fake_redis.data
+
+    async def ids():
+        yield ["user-1"]
+        # Строка вставлена после того, как пересборка прочитала её часть БД
+        assert fake_redis.ttls[id_filter.next_key]
+        await add("user-2")
+        yield ["user-3"]
+
+    assert await id_filter.rebuild(ids()) == 2
+    assert id_filter.next_key not in fake_redis.data
+    assert id_filter.key not in fake_redis.ttls
+    for item in ("user-1", "user-2", "user-3"):
+        async with fake_redis.pipeline() as pipe:
+            id_filter.check(pipe, item)
+            assert not id_filter.absent(await pipe.execute())
+
+
+@pytest.mark.asyncio
+async def test_repositories_stream_all_ids(product_repository: ProductRepository, test_db_session):
+    created = [
+        await product_repository.create(ProductCreate(name=f"P{i}", price=1.0, stock_quantity=1)) for i in range(5)
+    ]
+    user = await UserRepository(test_db_session).create(UserCreate(username="U", email="u@example.com"))
+
+    chunks = [chunk async for chunk in product_repository.stream_ids(chunk_size=2)]
+    assert sorted(i for chunk in chunks for i in chunk) == sorted(p.id for p in created)
+    assert [chunk async for chunk in UserRepository(test_db_session).stream_ids()] == [[user.id]]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("codec_name", ["json", "msgpack", "pydantic"])
+async def test_codecs_round_trip_and_serve_same_response(codec_name, fake_redis):
+    """Любой кодек: L2-попадание отдаёт то же, что загрузка из БД, и тот же JSON ответа."""
+    codec = cache_codec(ProductCached, ProductResponse, name=codec_name)
+    redis = fake_redis
+    loaded = ProductResponse(id="p1", name="Product", description="Описание", price=10.5, stock_quantity=3)
+
+    async def loader():
+        return loaded
+
+    first = await TwoTierCache(redis, "product", codec, ttl=60, local=LocalCache("product")).get_or_load("p1", loader)
+    other = LocalCache("product")
+    second = await TwoTierCache(redis, "product", codec, ttl=60, local=other).get_or_load("p1", None)
+
+    assert other.l2_hits == 1
+    assert first == second
+    # Ответ кодируется как в приложении (msgspec + кодировщики pydantic)
+    serializer = get_serializer(PydanticInitPlugin.encoders())
+    assert encode_json(second, serializer=serializer) == encode_json(loaded, serializer=serializer)
+
+
+@pytest.mark.asyncio
+async def test_entry_of_other_codec_is_reloaded(fake_redis):
+    """После смены CACHE_CODEC чужие записи считаются промахом и перезаписываются."""
+    redis = fake_redis
+    msgpack_cache = TwoTierCache(redis, "product", cache_codec(ProductCached, ProductResponse, "msgpack"), ttl=60)
+    await msgpack_cache.set("p1", product(name="Old"))
+    local = LocalCache("product")
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return product(name="New")
+
+    cache = TwoTierCache(redis, "product", CODEC, ttl=60, local=local)
+    assert (await cache.get_or_load("p1", loader)).name == "New"
+    assert (len(loads), local.l2_hits, local.misses) == (1, 0, 1)
+    assert redis.data["cache:product:p1"].endswith(msgspec.json.encode(product(name="New")))
@@ -0,0 +1,133 @@
+# tests/test_services/test_chunked_messages.py
+import json
+import random
+
+import pytest
+
+from services import chunked_messages
+from services.chunked_messages import (
+    BATCH_ID_HEADER,
+    CHUNK_LAST_HEADER,
+    CHUNK_SEQ_HEADER,
+    ChunkReassembler,
+    ChunkedPublisher,
+    decode_chunk,
+    encode_chunk,
+)
+
+
+class FakePublisher:
+    def __init__(self):
+        self.sent = []
+
+    async def publish(self, queue_name, body, headers=None, content_type=None, content_encoding=None):
+        self.sent.append({
+            "queue": queue_name,
+            "body": body,
+            "headers": headers,
+            "content_type": content_type,
+            "content_encoding": content_encoding,
+        })
+
+
+def make_reports(count: int) -> list:
+    return [
+        {"id": f"report-{i}", "order_id": f"order-{i}", "count_product": i % 7, "report_at": "2026-10-18T12:00:00"}
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("fmt", ["msgpack", "json"])
+@pytest.mark.parametrize("encoding", [None, "gzip", "zstd"])
+def test_encode_decode_roundtrip(fmt, encoding):
+    if encoding == "zstd":
+        pytest.importorskip("zstandard")
+    reports = make_reports(50)
+    content_type = "application/msgpack" if fmt == "msgpack" else "application/json"
+
+    body = encode_chunk(reports, fmt, encoding)
+
+    assert decode_chunk(body, content_type, encoding) == reports
+
+
+def test_decode_legacy_json_message():
+    """Сообщения старого формата (json.dumps без content_type) тоже читаются."""
+    reports = make_reports(3)
+    assert decode_chunk(json.dumps(reports).encode("utf-8"), None) == reports
+
+
+def test_unknown_format_rejected():
+    with pytest.raises(ValueError):
+        encode_chunk([], "xml")
+    with pytest.raises(ValueError):
+        ChunkedPublisher(FakePublisher(), "order_reports", encoding="brotli")
+
+
+@pytest.mark.asyncio
+async def test_chunked_publisher_splits_and_marks_last():
+    """Части не больше max_items, номера подряд, x-chunk-last только у последней."""
+    publisher = FakePublisher()
+    reports = make_reports(25)
+
+    async with ChunkedPublisher(publisher, "order_reports", max_items=10, encoding="gzip") as messages:
+        # Записи приходят пачками другого размера, чем части сообщений
+        await messages.write(reports[:7])
+        await messages.write(reports[7:20])
+        await messages.write(reports[20:])
+
+    assert [m["headers"][CHUNK_SEQ_HEADER] for m in publisher.sent] == [0, 1, 2]
+    assert [m["headers"][CHUNK_LAST_HEADER] for m in publisher.sent] == [False, False, True]
+    assert len({m["headers"][BATCH_ID_HEADER] for m in publisher.sent}) == 1
+    assert all(m["content_type"] == "application/msgpack" for m in publisher.sent)
+    assert all(m["content_encoding"] == "gzip" for m in publisher.sent)
+    sizes = [len(decode_chunk(m["body"], m["content_type"], m["content_encoding"])) for m in publisher.sent]
+    assert sizes == [10, 10, 5]
+    assert messages.sent_items == 25
+    assert messages.sent_bytes == sum(len(m["body"]) for m in publisher.sent)
+
+
+@pytest.mark.asyncio
+async def test_chunked_publisher_exact_multiple_and_empty():
+    publisher = FakePublisher()
+    async with ChunkedPublisher(publisher, "order_reports", max_items=5) as messages:
+        await messages.write(make_reports(10))
+    assert [m["headers"][CHUNK_LAST_HEADER] for m in publisher.sent] == [False, True]
+
+    empty = FakePublisher()
+    async with ChunkedPublisher(empty, "order_reports") as messages:
+        await messages.write([])
+    assert empty.sent == []
+
+
+@pytest.mark.asyncio
+async def test_reassembler_restores_out_of_order_batch():
+    publisher = FakePublisher()
+    reports = make_reports(23)
+    async with ChunkedPublisher(publisher, "order_reports", max_items=4, fmt="json", encoding="gzip") as messages:
+        await messages.write(reports)
+
+    reassembler = ChunkReassembler()
+    shuffled = publisher.sent[:]
+    random.Random(0).shuffle(shuffled)
+    results = [
+        reassembler.add(m["body"], m["headers"], m["content_type"], m["content_encoding"])
+        for m in shuffled
+    ]
+
+    assert all(result is None for result in results[:-1])
+    assert results[-1] == reports
+    assert reassembler.pending_batches == 0
+
+
+def test_reassembler_expires_incomplete_batches(monkeypatch):
+    clock = iter([0.0, 100.0])
+    monkeypatch.setattr(chunked_messages.time, "monotonic", lambda: next(clock))
+    reassembler = ChunkReassembler(max_age=60)
+    body = encode_chunk(make_reports(1))
+    headers = {BATCH_ID_HEADER: "lost", CHUNK_SEQ_HEADER: 1, CHUNK_LAST_HEADER: True}
+    assert reassembler.add(body, headers, "application/msgpack") is None
+
+    # Следующее сообщение другой пачки вытесняет устаревшую неполную
+    other = {BATCH_ID_HEADER: "next", CHUNK_SEQ_HEADER: 0, CHUNK_LAST_HEADER: True}
+    assert reassembler.add(body, other, "application/msgpack") == make_reports(1)
+    assert reassembler.pending_batches == 0
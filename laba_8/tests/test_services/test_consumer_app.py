@@ -0,0 +1,165 @@
+# tests/test_services/test_consumer_app.py
+import pytest
+from faststream.rabbit import RabbitMessage, TestRabbitBroker
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from consumers import ConsumerApp
+from models import Base, Order, Product, User
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_consumers_ingest_producer_messages(session_factory):
+    """Сообщения в формате producer.py проходят через подписчиков, батчер и сервисы в БД."""
+    async with session_factory() as session:
+        session.add(User(id="7", username="buyer", email="buyer@example.com"))
+        await session.commit()
+
+    consumers = ConsumerApp(session_factory)
+    dead_letters = []
+
+    @consumers.broker.subscriber("product.dlq")
+    async def capture_dead_letter(body: dict, message: RabbitMessage):
+        dead_letters.append((body, message.headers))
+
+    async with TestRabbitBroker(consumers.broker) as broker:
+        await broker.publish({"id": 3, "name": "Product 3", "price": 10.0, "quantity": 5}, queue="product")
+        await broker.publish({"id": "bad"}, queue="product")
+        await consumers.product_batcher.flush()
+
+        await broker.publish(
+            {"id": 1, "user_id": 7, "items": [{"product_id": 3, "quantity": 2}], "status": "pending"},
+            queue="order",
+        )
+        await consumers.close()
+
+    async with session_factory() as session:
+        assert await session.scalar(select(Product.stock_quantity).where(Product.id == "3")) == 3
+        assert await session.scalar(select(func.count()).select_from(Order)) == 1
+    assert consumers.product_batcher.processed == 1
+    assert consumers.order_batcher.processed == 1
+    # Невалидное сообщение не теряется, а уходит в DLQ с причиной
+    assert dead_letters == [({"id": "bad"}, {"x-dead-letter-reason": "invalid message: 3 errors"})]
+
+
+@pytest.mark.asyncio
+async def test_retry_queues_are_declared_before_subscribers_start(session_factory, monkeypatch):
+    """Упавшая в первые миллисекунды пачка не уходит в ещё не объявленную очередь повторов."""
+    consumers = ConsumerApp(session_factory)
+    calls = []
+
+    async def connect():
+        calls.append("connect")
+
+    async def declare_queue(queue):
+        calls.append(queue.name)
+
+    async def start():
+        calls.append("start")
+
+    monkeypatch.setattr(consumers.broker, "connect", connect)
+    monkeypatch.setattr(consumers.broker, "declare_queue", declare_queue)
+    monkeypatch.setattr(consumers.broker, "start", start)
+    await consumers.start()
+
+    assert calls[0] == "connect" and calls[-1] == "start"
+    assert {"order.retry.1", "order.dlq", "product.retry.5", "product.dlq"} <= set(calls[1:-1])
+
+
+REDIS_COMMANDS = {"get", "set", "delete", "eval", "publish", "getbit", "setbit", "hincrby"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("failing", [{"eval"}, REDIS_COMMANDS], ids=["counter", "redis-down"])
+async def test_redis_failure_after_commit_does_not_repeat_batch(session_factory, fake_redis, failing):
+    """Сбой Redis после коммита пачки (счётчик, кэш) не превращается в повтор: ровно один заказ на сообщение."""
+    async with session_factory() as session:
+        session.add(User(id="7", username="buyer", email="buyer@example.com"))
+        session.add(Product(id="3", name="Product 3", price=10.0, stock_quantity=100))
+        await session.commit()
+    fake_redis.data["count:orders"] = "0"
+    fake_redis.fail = failing
+
+    consumers = ConsumerApp(session_factory, redis_client=fake_redis)
+    consumers.order_batcher.batch_size = 4
+    retried = []
+
+    @consumers.broker.subscriber("order.retry.1")
+    async def capture_retry(body: dict):
+        retried.append(body)
+
+    async with TestRabbitBroker(consumers.broker) as broker:
+        for order_id in range(4):
+            await broker.publish(
+                {"id": order_id, "user_id": 7, "items": [{"product_id": 3, "quantity": 3}], "status": "pending"},
+                queue="order",
+            )
+        await broker.publish({"id": 5, "name": "Product 5", "price": 1.0, "quantity": 2}, queue="product")
+        await consumers.close()
+
+    async with session_factory() as session:
+        assert await session.scalar(select(func.count()).select_from(Order)) == 4
+        assert await session.scalar(select(Product.stock_quantity).where(Product.id == "3")) == 88
+    assert (consumers.order_batcher.processed, consumers.order_batcher.failed, retried) == (4, 0, [])
+    assert (consumers.product_batcher.processed, consumers.product_batcher.failed) == (1, 0)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("commit_fails", [False, True], ids=["before-commit", "during-commit"])
+async def test_failed_batch_is_retried_only_if_rolled_back(session_factory, monkeypatch, commit_fails):
+    """Сбой до COMMIT — пачка делится и повторяется; обрыв на COMMIT — пачка в DLQ без повторного запуска."""
+    async with session_factory() as session:
+        session.add(User(id="7", username="buyer", email="buyer@example.com"))
+        session.add(Product(id="3", name="Product 3", price=10.0, stock_quantity=100))
+        await session.commit()
+
+    consumers = ConsumerApp(session_factory)
+    consumers.order_batcher.batch_size = 2
+    commit = AsyncSession.commit
+    failures = [True]
+
+    async def flaky_commit(session):
+        if failures and not commit_fails:
+            failures.pop()
+            raise ConnectionError("connection lost before COMMIT")
+        await commit(session)
+        if failures:
+            failures.pop()
+            raise ConnectionError("connection lost after COMMIT")
+
+    monkeypatch.setattr(AsyncSession, "commit", flaky_commit)
+    dead_letters = []
+
+    @consumers.broker.subscriber("order.dlq")
+    async def capture_dead_letter(body: dict, message: RabbitMessage):
+        dead_letters.append(message.headers["x-dead-letter-reason"])
+
+    async with TestRabbitBroker(consumers.broker) as broker:
+        for order_id in range(2):
+            await broker.publish(
+                {"id": order_id, "user_id": 7, "items": [{"product_id": 3, "quantity": 1}], "status": "pending"},
+                queue="order",
+            )
+        await consumers.close()
+
+    async with session_factory() as session:
+        assert await session.scalar(select(func.count()).select_from(Order)) == 2
+    if commit_fails:
+        assert consumers.order_batcher.parked == 2
+        assert all(reason.startswith("commit outcome unknown") for reason in dead_letters)
+    else:
+        assert (consumers.order_batcher.processed, dead_letters) == (2, [])
@@ -0,0 +1,187 @@
+# tests/test_services/test_idempotency.py
+import asyncio
+
+import pytest
+
+from schemas.order import OrderCreate
+from services.idempotency import MessageDeduplicator, message_key
+from services.message_batcher import BatchRolledBack, MessageBatcher
+
+
+class FakeMessage:
+    def __init__(self):
+        self.outcome = None
+
+    async def ack(self):
+        self.outcome = "ack"
+
+    async def nack(self, requeue=True):
+        self.outcome = "nack"
+
+    async def reject(self, reason=None):
+        self.outcome = "reject"
+        self.reason = reason
+
+
+def test_message_key_prefers_message_id():
+    assert message_key("m-1", b"{}") == "id:m-1"
+    assert message_key(None, b'{"id": 1}') == message_key(None, b'{"id": 1}')
+    assert message_key(None, b'{"id": 1}') != message_key(None, b'{"id": 2}')
+
+
+@pytest.mark.asyncio
+async def test_redelivered_batch_is_skipped(fake_redis):
+    """Повторная доставка уже обработанных сообщений подтверждается без обработки."""
+    redis = fake_redis
+    deduplicator = MessageDeduplicator(redis, "order", ttl=60)
+    processed = []
+
+    async def process(orders):
+        processed.extend(orders)
+        return [None] * len(orders)
+
+    batcher = MessageBatcher(process, batch_size=4, max_delay_ms=10_000, deduplicator=deduplicator)
+    order = OrderCreate(user_id="u", product_ids=["p"])
+
+    first = [FakeMessage() for _ in range(3)]
+    for i, message in enumerate(first):
+        await batcher.add(order, message, key=f"id:{i}")
+    await batcher.flush()
+
+    # Перезапуск потребителя: сообщения 0 и 1 пришли снова, 3 — новое, и в пачке повтор 3
+    redis.round_trips = 0
+    second = [FakeMessage() for _ in range(4)]
+    for message, key in zip(second, ["id:0", "id:1", "id:3", "id:3"]):
+        await batcher.add(order, message, key=key, redelivered=key != "id:3")
+    await batcher.flush()
+
+    assert len(processed) == 4
+    assert all(m.outcome == "ack" for m in first + second)
+    assert (batcher.processed, batcher.skipped) == (4, 3)
+    # Один pipeline на захват ключей и один на отметки со счётчиками
+    assert redis.round_trips == 2
+    assert (redis.data["dedupe:order:id:3"], redis.ttls["dedupe:order:id:3"]) == ("1", 60)
+    assert deduplicator.stats() == {
+        "checked": 6, "duplicates": 2, "in_progress": 0, "redelivered": 2, "duplicate_ratio": 0.3333,
+    }
+    assert redis.data["dedupe:stats:order"] == {"checked": 6, "duplicates": 2, "redelivered": 2}
+
+
+@pytest.mark.asyncio
+async def test_failed_and_rejected_messages_are_not_marked(fake_redis):
+    """Отметка только после успешного коммита: упавшие и отклонённые заказы обработаются при повторе."""
+    redis = fake_redis
+    batcher_calls = []
+
+    async def process(orders):
+        batcher_calls.append([order.user_id for order in orders])
+        if any(order.user_id == "a" for order in orders):
+            raise BatchRolledBack("deadlock")
+        return ["out of stock" if order.user_id == "b" else None for order in orders]
+
+    batcher = MessageBatcher(
+        process, batch_size=3, max_delay_ms=10_000, deduplicator=MessageDeduplicator(redis, "order"),
+    )
+    messages = [FakeMessage() for _ in range(3)]
+    for message, key in zip(messages, ("a", "b", "c")):
+        await batcher.add(OrderCreate(user_id=key, product_ids=["p"]), message, key=f"id:{key}")
+    await batcher.flush()
+
+    assert batcher_calls == [["a", "b", "c"], ["a"], ["b", "c"]]
+    assert [m.outcome for m in messages] == ["nack", "reject", "ack"]
+    assert "dedupe:order:id:a" not in redis.data
+    assert "dedupe:order:id:b" not in redis.data
+    assert "dedupe:order:id:c" in redis.data
+
+
+@pytest.mark.asyncio
+async def test_concurrent_deliveries_in_two_processes_are_processed_once(fake_redis):
+    """Одно сообщение пришло двум процессам сразу: второй ждёт исхода первого, а не обрабатывает его ещё раз."""
+    redis = fake_redis
+    order = OrderCreate(user_id="u", product_ids=["p"])
+    release = asyncio.Event()
+    processed = {"a": 0, "b": 0}
+
+    def batcher(name, results):
+        async def process(orders):
+            processed[name] += len(orders)
+            if name == "a":
+                await release.wait()
+            return results(len(orders))
+        return MessageBatcher(
+            process, batch_size=1, max_delay_ms=5, name=name,
+            deduplicator=MessageDeduplicator(redis, "order", claim_ttl=30),
+        )
+
+    # Первый процесс взял сообщение и коммитит; второй получил его же
+    first = batcher("a", lambda n: [None] * n)
+    second = batcher("b", lambda n: [None] * n)
+    message_a, message_b = FakeMessage(), FakeMessage()
+    await first.add(order, message_a, key="id:1")
+    await asyncio.sleep(0.01)
+    assert redis.data["dedupe:order:id:1"].startswith("processing:")
+    assert redis.ttls["dedupe:order:id:1"] == 30
+    await second.add(order, message_b, key="id:1", redelivered=True)
+    await asyncio.sleep(0.02)
+
+    # Второй не обработал и не подтвердил, а отложил сообщение
+    assert processed["b"] == 0 and message_b.outcome is None and second.deferred >= 1
+    release.set()
+    await first.flush()
+    await asyncio.sleep(0.02)
+    await second.flush()
+
+    assert processed == {"a": 1, "b": 0}
+    assert (message_a.outcome, message_b.outcome) == ("ack", "ack")
+    assert second.skipped == 1 and redis.data["dedupe:order:id:1"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_failed_holder_releases_claim_for_redelivery(fake_redis):
+    """Упавшая пачка снимает свою метку «обрабатывается»: повтор не ждёт её истечения."""
+    redis = fake_redis
+    order = OrderCreate(user_id="u", product_ids=["p"])
+    deduplicator = MessageDeduplicator(redis, "order")
+
+    async def fail(orders):
+        raise BatchRolledBack("deadlock")
+
+    batcher = MessageBatcher(fail, batch_size=1, max_delay_ms=10_000, deduplicator=deduplicator)
+    message = FakeMessage()
+    await batcher.add(order, message, key="id:1")
+    await batcher.flush()
+
+    assert message.outcome == "nack"
+    assert "dedupe:order:id:1" not in redis.data
+
+
+@pytest.mark.asyncio
+async def test_claim_is_kept_when_commit_outcome_is_unknown(fake_redis):
+    """Пачка упала во время COMMIT: заказы, возможно, созданы — повтор не должен занять ключ и списать остатки снова."""
+    order = OrderCreate(user_id="u", product_ids=["p"])
+    processed = []
+
+    async def lost_commit(orders):
+        processed.extend(orders)
+        raise ConnectionError("connection lost during COMMIT")
+
+    batcher = MessageBatcher(
+        lost_commit, batch_size=1, max_delay_ms=10_000,
+        deduplicator=MessageDeduplicator(fake_redis, "order", claim_ttl=30),
+    )
+    message = FakeMessage()
+    await batcher.add(order, message, key="id:1")
+    await batcher.flush()
+
+    assert message.outcome == "reject"
+    assert fake_redis.data["dedupe:order:id:1"].startswith("processing:")
+    assert fake_redis.ttls["dedupe:order:id:1"] == 30
+
+    # Повтор (replay из DLQ, другой процесс) ключ не получает
+    retry = MessageBatcher(
+        lost_commit, batch_size=1, max_delay_ms=10_000,
+        deduplicator=MessageDeduplicator(fake_redis, "order"),
+    )
+    await retry.add(order, FakeMessage(), key="id:1")
+    await retry.close()
+    assert len(processed) == 1 and retry.deferred == 1
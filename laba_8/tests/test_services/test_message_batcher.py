@@ -0,0 +1,259 @@
+# tests/test_services/test_message_batcher.py
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Order, Product
+from repositories.product_repository import ProductRepository
+from schemas.order import ORDER_ITEM_MAX_QUANTITY, OrderCreate, OrderMessage
+from schemas.product import ProductCreate, ProductMessage
+from schemas.user import UserCreate
+from services.message_batcher import BatchRolledBack, MessageBatcher
+from services.order_service import OrderService
+from services.product_service import ProductService
+
+
+class FakeMessage:
+    def __init__(self):
+        self.outcome = None
+
+    async def ack(self):
+        self.outcome = "ack"
+
+    async def nack(self, requeue=True):
+        self.outcome = "nack" if requeue else "drop"
+
+    async def reject(self, reason=None):
+        self.outcome = "reject"
+        self.reason = reason
+
+
+def test_order_message_from_producer():
+    """Формат producer.py: числовые id и количество в items."""
+    message = OrderMessage.model_validate({
+        "id": 1,
+        "user_id": 7,
+        "items": [{"product_id": 3, "quantity": 2}, {"product_id": 5, "quantity": 1}],
+        "status": "pending",
+    })
+
+    order = message.to_order_create()
+    assert (order.user_id, order.product_ids, order.quantities()) == ("7", ["3", "5"], {"3": 2, "5": 1})
+    assert OrderCreate(user_id="7", product_ids=["3", "3", "5"]).quantities() == order.quantities()
+
+
+def test_order_message_quantity_is_bounded():
+    """Огромное quantity — ошибка валидации сообщения (DLQ), а не список из quantity повторов id."""
+    with pytest.raises(ValidationError):
+        OrderMessage.model_validate({"user_id": 7, "items": [{"product_id": 3, "quantity": 10**9}]})
+    order = OrderMessage.model_validate({
+        "user_id": 7, "items": [{"product_id": 3, "quantity": ORDER_ITEM_MAX_QUANTITY}] * 2,
+    }).to_order_create()
+    assert order.quantities() == {"3": 2 * ORDER_ITEM_MAX_QUANTITY}
+
+
+@pytest.mark.asyncio
+async def test_batcher_creates_batch_and_acks_after_commit(
+    order_service: OrderService,
+    user_service,
+    product_service,
+    test_db_session: AsyncSession,
+):
+    """Полная пачка создаётся одним вызовом create_bulk; созданные — ack, отклонённые — reject."""
+    user = await user_service.create(UserCreate(username="Buyer", email="buyer@example.com"))
+    product = await product_service.create(ProductCreate(name="Product", price=10.0, stock_quantity=5))
+
+    batches = []
+
+    async def create_batch(orders):
+        batches.append(len(orders))
+        return [error for _, error in await order_service.create_bulk(orders)]
+
+    batcher = MessageBatcher(create_batch, batch_size=4, max_delay_ms=10_000)
+    orders = [
+        OrderMessage(user_id=user.id, items=[{"product_id": product.id, "quantity": 2}]),
+        OrderMessage(user_id="missing", items=[{"product_id": product.id}]),
+        OrderMessage(user_id=user.id, items=[{"product_id": product.id, "quantity": 3}]),
+        OrderMessage(user_id=user.id, items=[{"product_id": product.id}]),  # остатка уже нет
+    ]
+    messages = [FakeMessage() for _ in orders]
+
+    for order, message in zip(orders[:3], messages):
+        await batcher.add(order.to_order_create(), message)
+    # До коммита ничего не подтверждено
+    assert [m.outcome for m in messages] == [None, None, None, None]
+
+    await batcher.add(orders[3].to_order_create(), messages[3])
+    await batcher.flush()
+
+    assert batches == [4]
+    assert [m.outcome for m in messages] == ["ack", "reject", "ack", "reject"]
+    assert (batcher.processed, batcher.rejected, batcher.pending) == (2, 2, 0)
+    assert batcher.batches == 1 and batcher.throughput > 0
+    stock = await test_db_session.scalar(select(Product.stock_quantity).where(Product.id == product.id))
+    assert stock == 0
+    assert await test_db_session.scalar(select(func.count()).select_from(Order)) == 2
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_by_timeout():
+    batches = []
+
+    async def create_batch(orders):
+        batches.append(len(orders))
+        return [None] * len(orders)
+
+    batcher = MessageBatcher(create_batch, batch_size=100, max_delay_ms=20)
+    messages = [FakeMessage() for _ in range(3)]
+    for message in messages:
+        await batcher.add(OrderCreate(user_id="u", product_ids=["p"]), message)
+
+    await asyncio.sleep(0.1)
+
+    assert batches == [3]
+    assert all(m.outcome == "ack" for m in messages)
+
+
+@pytest.mark.asyncio
+async def test_batcher_requeues_on_transaction_error_and_after_close():
+    async def create_batch(orders):
+        raise BatchRolledBack("connection lost")
+
+    batcher = MessageBatcher(create_batch, batch_size=2, max_delay_ms=10_000)
+    messages = [FakeMessage() for _ in range(3)]
+    for message in messages[:2]:
+        await batcher.add(OrderCreate(user_id="u", product_ids=["p"]), message)
+
+    await batcher.close()
+    await batcher.add(OrderCreate(user_id="u", product_ids=["p"]), messages[2])
+
+    assert [m.outcome for m in messages] == ["nack", "nack", "nack"]
+    assert batcher.failed_batches == 1
+
+
+@pytest.mark.asyncio
+async def test_batcher_isolates_poison_message_by_bisecting():
+    """Исключение из-за одного сообщения: пачка делится пополам, в повтор уходит только оно."""
+    calls = []
+
+    async def create_batch(orders):
+        calls.append(len(orders))
+        if any(order.user_id == "poison" for order in orders):
+            raise BatchRolledBack("value out of range")
+        return [None] * len(orders)
+
+    batcher = MessageBatcher(create_batch, batch_size=8, max_delay_ms=10_000)
+    messages = [FakeMessage() for _ in range(8)]
+    for i, message in enumerate(messages):
+        await batcher.add(OrderCreate(user_id="poison" if i == 5 else "u", product_ids=["p"]), message)
+    await batcher.flush()
+
+    assert calls == [8, 4, 4, 2, 1, 1, 2]
+    assert [m.outcome for m in messages] == ["ack"] * 5 + ["nack"] + ["ack"] * 2
+    assert (batcher.processed, batcher.failed, batcher.failed_batches) == (7, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_batcher_parks_batch_with_unknown_commit_outcome():
+    """Сбой не из откаченной транзакции: пачку не повторяем (заказы могли создаться), а откладываем в DLQ."""
+    calls = []
+
+    async def create_batch(orders):
+        calls.append(len(orders))
+        raise ConnectionError("connection lost during COMMIT")
+
+    batcher = MessageBatcher(create_batch, batch_size=4, max_delay_ms=10_000)
+    messages = [FakeMessage() for _ in range(4)]
+    for message in messages:
+        await batcher.add(OrderCreate(user_id="u", product_ids=["p"]), message)
+    await batcher.flush()
+
+    assert calls == [4]
+    assert [m.outcome for m in messages] == ["reject"] * 4
+    assert messages[0].reason.startswith("commit outcome unknown")
+    assert (batcher.parked, batcher.failed, batcher.failed_batches) == (4, 0, 1)
+
+
+@pytest.mark.asyncio
+async def test_batcher_processes_batches_concurrently():
+    """concurrency=2: следующая пачка уходит в работу, пока предыдущая не закоммичена."""
+    running = 0
+    peak = 0
+
+    async def create_batch(orders):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return [None] * len(orders)
+
+    batcher = MessageBatcher(create_batch, batch_size=2, max_delay_ms=10_000, concurrency=2)
+    messages = [FakeMessage() for _ in range(6)]
+    for message in messages:
+        await batcher.add(OrderCreate(user_id="u", product_ids=["p"]), message)
+    await batcher.close()
+
+    assert peak == 2
+    assert batcher.batches == 3
+    assert all(m.outcome == "ack" for m in messages)
+
+
+def test_product_message_from_producer():
+    """Формат producer.py: числовой id и остаток в поле quantity."""
+    product = ProductMessage.model_validate({"id": 3, "name": "Product 3", "price": 12.5, "quantity": 40})
+
+    assert (product.id, product.stock_quantity, product.price) == ("3", 40, 12.5)
+    # Остаток вне INTEGER — невалидное сообщение (DLQ), а не сбой всей пачки upsert
+    with pytest.raises(ValidationError):
+        ProductMessage.model_validate({"id": 3, "name": "Product 3", "price": 12.5, "quantity": 2**31})
+
+
+@pytest.mark.asyncio
+async def test_product_batch_upserts_and_refreshes_cache_in_one_pipeline(
+    product_repository: ProductRepository,
+    test_db_session: AsyncSession,
+    query_counter,
+    fake_redis,
+):
+    """Пачка продуктов — один upsert; кэш обновляется одним pipeline только для уже закэшированных."""
+    existing = await product_repository.create(ProductCreate(name="Old", price=1.0, stock_quantity=1))
+    existing_key = f"cache:product:{existing.id}"
+    redis = fake_redis
+    redis.data[existing_key] = "stale"
+    service = ProductService(product_repository, redis_client=redis)
+
+    async def upsert_batch(products):
+        await service.import_products(products)
+        return [None] * len(products)
+
+    batcher = MessageBatcher(upsert_batch, batch_size=3, max_delay_ms=10_000)
+    payloads = [
+        {"id": existing.id, "name": "New", "price": 2.0, "quantity": 5},
+        {"id": 101, "name": "Product 101", "price": 3.0, "quantity": 7},
+        {"id": 102, "name": "Product 102", "price": 4.0, "quantity": 9},
+    ]
+    messages = [FakeMessage() for _ in payloads]
+    query_counter.clear()
+    for payload, message in zip(payloads, messages):
+        await batcher.add(ProductMessage.model_validate(payload), message)
+    await batcher.flush()
+
+    assert all(m.outcome == "ack" for m in messages)
+    assert len([q for q in query_counter if q.lstrip().upper().startswith("INSERT")]) == 1
+    # DEL счётчика total и один pipeline на кэш
+    assert redis.round_trips == 2
+    filter_ = service.cache.id_filter
+    assert set(redis.data) == {existing_key, filter_.key}
+    assert b'"name":"New"' in redis.data[existing_key]
+    # В том же pipeline — сброс L1 этих продуктов на всех экземплярах
+    assert len(redis.published) == 1 and '"101"' in redis.published[0][1]
+    # Все записанные id (и новые) — в фильтре существующих id
+    assert all(p in redis.data[filter_.key] for i in ("101", "102") for p in filter_.positions(i))
+
+    assert await test_db_session.scalar(select(func.count()).select_from(Product)) == 3
+    stock = await test_db_session.scalar(select(Product.stock_quantity).where(Product.name == "New"))
+    assert stock == 5
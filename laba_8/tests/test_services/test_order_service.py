@@ -9,6 +9,8 @@ from repositories.product_repository import ProductRepository
 from repositories.user_repository import UserRepository
 from services.order_service import OrderService
 from schemas.order import OrderCreate
+from schemas.product import ProductCreate
+from schemas.user import UserCreate
 
 
 @pytest.mark.asyncio
@@ -56,10 +58,39 @@ async def test_order_service_create():
     result = await order_service.create(order_data)
 
     mock_order_repo.create.assert_called_once_with(order_data) 
+    # Продукты проверяются в репозитории одним запросом, а не по одному
+    mock_product_repo.get_by_id.assert_not_called()
     # Проверяем результат
     assert result.user_id == "123"
 
 
+@pytest.mark.asyncio
+async def test_order_service_create_constant_queries(
+    order_service: OrderService,
+    user_repository: UserRepository,
+    product_repository: ProductRepository,
+    query_counter,
+):
+    """Число SQL-запросов при создании заказа не зависит от числа позиций."""
+    user = await user_repository.create(UserCreate(username="Buyer", email="buyer@example.com"))
+    products = [
+        await product_repository.create(ProductCreate(name=f"Product {i}", price=10.0, stock_quantity=5))
+        for i in range(50)
+    ]
+    user_id, product_ids = user.id, [p.id for p in products]
+
+    query_counter.clear()
+    await order_service.create(OrderCreate(user_id=user_id, product_ids=product_ids[:1]))
+    single_line = len(query_counter)
+
+    query_counter.clear()
+    await order_service.create(OrderCreate(user_id=user_id, product_ids=product_ids))
+    fifty_lines = len(query_counter)
+
+    assert fifty_lines == single_line
+    assert fifty_lines <= 8
+
+
 @pytest.mark.asyncio
 async def test_order_service_get_by_id():
     """Тестирует получение заказа по ID."""
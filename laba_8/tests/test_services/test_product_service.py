@@ -119,4 +119,18 @@ async def test_product_service_delete():
     result = await product_service.delete("123")
 
     mock_repo.delete.assert_called_once_with("123")  
-    assert result is True
\ No newline at end of file
+    assert result is True
+
+@pytest.mark.asyncio
+async def test_product_service_total_count_approximate():
+    """approximate=True берёт оценку из статистики, а при её отсутствии — точный COUNT."""
+    mock_repo = AsyncMock(spec=ProductRepository)
+    product_service = ProductService(mock_repo)
+
+    mock_repo.get_estimated_count.return_value = 1000
+    assert await product_service.get_total_count(approximate=True) == 1000
+    mock_repo.get_total_count.assert_not_called()
+
+    mock_repo.get_estimated_count.return_value = None
+    mock_repo.get_total_count.return_value = 5
+    assert await product_service.get_total_count(approximate=True) == 5
@@ -0,0 +1,97 @@
+# tests/test_services/test_rabbit_publisher.py
+import asyncio
+
+import aio_pika
+import pytest
+
+from services.rabbit_publisher import RabbitPublisher
+
+
+class FakeExchange:
+    def __init__(self, sent):
+        self.sent = sent
+
+    async def publish(self, message, routing_key):
+        await asyncio.sleep(0)  # даём другим публикациям занять канал
+        self.sent.append((routing_key, message.body, message.headers))
+
+
+class FakeChannel:
+    def __init__(self, connection, publisher_confirms):
+        self.connection = connection
+        self.publisher_confirms = publisher_confirms
+        self.default_exchange = FakeExchange(connection.sent)
+        self.is_closed = False
+
+    async def declare_queue(self, name, durable):
+        self.connection.declared.append(name)
+
+    async def reopen(self):
+        self.is_closed = False
+
+    async def close(self):
+        self.is_closed = True
+
+
+class FakeConnection:
+    def __init__(self):
+        self.channels = []
+        self.declared = []
+        self.sent = []
+        self.closed = False
+
+    async def channel(self, publisher_confirms=True):
+        channel = FakeChannel(self, publisher_confirms)
+        self.channels.append(channel)
+        return channel
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_connection(monkeypatch) -> FakeConnection:
+    connection = FakeConnection()
+    connects = []
+
+    async def connect_robust(url):
+        connects.append(url)
+        return connection
+
+    monkeypatch.setattr(aio_pika, "connect_robust", connect_robust)
+    connection.connects = connects
+    return connection
+
+
+@pytest.mark.asyncio
+async def test_publisher_reuses_connection_and_channels(fake_connection: FakeConnection):
+    """Одно соединение на всё время жизни, каналов не больше pool_size, очередь объявляется один раз."""
+    publisher = RabbitPublisher("amqp://test", pool_size=2, publisher_confirms=False)
+    await publisher.start()
+
+    await asyncio.gather(*(publisher.publish("order_reports", f"{i}".encode()) for i in range(10)))
+
+    assert len(fake_connection.connects) == 1
+    assert len(fake_connection.channels) == 2
+    assert all(not channel.publisher_confirms for channel in fake_connection.channels)
+    assert fake_connection.declared == ["order_reports"]
+    assert sorted(body for _, body, _ in fake_connection.sent) == sorted(f"{i}".encode() for i in range(10))
+
+    await publisher.close()
+    assert fake_connection.closed
+    assert all(channel.is_closed for channel in fake_connection.channels)
+
+
+@pytest.mark.asyncio
+async def test_publisher_starts_lazily_and_reopens_channel(fake_connection: FakeConnection):
+    """Без start() соединение открывается при первой публикации; закрытый канал переоткрывается."""
+    publisher = RabbitPublisher("amqp://test", pool_size=1)
+
+    await publisher.publish("order_reports", b"first", headers={"seq": 1})
+    fake_connection.channels[0].is_closed = True
+    await publisher.publish("order_reports", b"second")
+
+    assert len(fake_connection.channels) == 1
+    assert fake_connection.channels[0].publisher_confirms
+    assert fake_connection.sent == [("order_reports", b"first", {"seq": 1}), ("order_reports", b"second", {})]
+    await publisher.close()
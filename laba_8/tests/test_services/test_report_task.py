@@ -0,0 +1,58 @@
+# tests/test_services/test_report_task.py
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import taskiq_config
+from models import Base, Order, User
+from repositories.report_repository import ReportRepository
+
+
+class FakePublisher:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = 0
+
+    async def publish(self, queue_name, body, headers=None, content_type=None, content_encoding=None):
+        if self.fail:
+            raise ConnectionError("channel closed")
+        self.sent += 1
+
+
+@pytest.fixture
+async def session_factory(monkeypatch):
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        user = User(username="buyer", email="buyer@example.com")
+        session.add(user)
+        await session.flush()
+        session.add_all(Order(user_id=user.id) for _ in range(3))
+        await session.commit()
+    monkeypatch.setattr(taskiq_config, "async_session_factory", factory)
+    yield factory
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_watermark_advances_only_after_reports_are_published(session_factory, monkeypatch):
+    """Неотправленные отчёты не теряются: отметка стоит, и следующий запуск отправит их заново."""
+    monkeypatch.setattr(taskiq_config, "report_publisher", FakePublisher(fail=True))
+    await taskiq_config.my_scheduled_task()
+
+    async with session_factory() as session:
+        assert await ReportRepository(session).get_watermark(taskiq_config.REPORT_WATERMARK_NAME) is None
+
+    publisher = FakePublisher()
+    monkeypatch.setattr(taskiq_config, "report_publisher", publisher)
+    await taskiq_config.my_scheduled_task()
+
+    assert publisher.sent == 1
+    async with session_factory() as session:
+        assert await ReportRepository(session).get_watermark(taskiq_config.REPORT_WATERMARK_NAME) is not None
@@ -0,0 +1,147 @@
+# tests/test_services/test_retry.py
+from types import SimpleNamespace
+
+import aio_pika
+import pytest
+
+from consumers import replay as replay_module
+from consumers.retry import RetryTopology, RetryingMessage
+
+
+class FakeBroker:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, body, queue, headers=None, **kwargs):
+        self.published.append((queue, body, headers, kwargs.get("message_id")))
+
+
+class FakeIncoming:
+    def __init__(self, body=b'{"id": 1}', headers=None, message_id="m-1"):
+        self.body = body
+        self.headers = headers or {}
+        self.raw_message = SimpleNamespace(content_type="application/json", content_encoding=None, message_id=message_id)
+        self.acked = False
+
+    async def ack(self):
+        self.acked = True
+
+
+def test_retry_topology_backoff_and_dead_letter_routing():
+    topology = RetryTopology("order", max_attempts=3, base_delay_ms=500)
+    queues = {queue.name: queue for queue in topology.queues()}
+
+    assert list(queues) == ["order.retry.1", "order.retry.2", "order.retry.3", "order.dlq"]
+    assert [queues[f"order.retry.{n}"].arguments["x-message-ttl"] for n in (1, 2, 3)] == [500, 1000, 2000]
+    # Истёкшее ожидание возвращает сообщение в основную очередь
+    assert queues["order.retry.2"].arguments["x-dead-letter-routing-key"] == "order"
+    assert "x-message-ttl" not in (queues["order.dlq"].arguments or {})
+
+
+@pytest.mark.asyncio
+async def test_failed_message_walks_retry_queues_then_dead_letters():
+    """Каждый сбой — следующая очередь ожидания, после max_attempts — DLQ; оригинал всегда подтверждается."""
+    broker = FakeBroker()
+    topology = RetryTopology("order", max_attempts=2)
+
+    headers = {}
+    for _ in range(3):
+        incoming = FakeIncoming(headers=headers)
+        await RetryingMessage(incoming, broker, topology).nack(requeue=True)
+        assert incoming.acked
+        headers = broker.published[-1][2]
+
+    assert [queue for queue, *_ in broker.published] == ["order.retry.1", "order.retry.2", "order.dlq"]
+    assert broker.published[-1][2]["x-dead-letter-reason"] == "max attempts (2) exceeded"
+    # Тело и message_id сохраняются — повтор распознаётся дедупликацией
+    assert all(body == b'{"id": 1}' and message_id == "m-1" for _, body, _, message_id in broker.published)
+
+
+@pytest.mark.asyncio
+async def test_rejected_message_goes_straight_to_dead_letters():
+    broker = FakeBroker()
+    incoming = FakeIncoming()
+
+    await RetryingMessage(incoming, broker, RetryTopology("product")).reject(reason="invalid message")
+
+    assert broker.published == [("product.dlq", b'{"id": 1}', {"x-dead-letter-reason": "invalid message"}, "m-1")]
+    assert incoming.acked
+
+
+class FakeDeadLetter:
+    def __init__(self, queue, index):
+        self.queue = queue
+        self.body = f"{index}".encode()
+        self.headers = {"x-retry-attempt": 5, "x-dead-letter-reason": "max attempts", "trace": "t"}
+        self.content_type = "application/json"
+        self.content_encoding = None
+        self.message_id = f"m-{index}"
+        self.delivery_tag = index + 1
+
+    async def ack(self, multiple=False):
+        self.queue.acks.append((self.delivery_tag, multiple))
+
+
+class FakeQueue:
+    def __init__(self, count):
+        self.messages = [FakeDeadLetter(self, i) for i in range(count)]
+        self.declaration_result = SimpleNamespace(message_count=count)
+        self.acks = []
+
+    async def get(self, no_ack=False, fail=True):
+        return self.messages.pop(0) if self.messages else None
+
+
+class FakeExchange:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, message, routing_key):
+        self.published.append((routing_key, message))
+
+
+class FakeChannel:
+    def __init__(self, queue):
+        self.queue = queue
+        self.default_exchange = FakeExchange()
+
+    async def declare_queue(self, name, durable):
+        assert name == "order.dlq"
+        return self.queue
+
+
+class FakeConnection:
+    def __init__(self, channel):
+        self._channel = channel
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def channel(self, publisher_confirms=True):
+        return self._channel
+
+
+@pytest.mark.asyncio
+async def test_replay_moves_dead_letters_back_in_batches(monkeypatch):
+    queue = FakeQueue(5)
+    channel = FakeChannel(queue)
+
+    async def connect_robust(url):
+        return FakeConnection(channel)
+
+    monkeypatch.setattr(aio_pika, "connect_robust", connect_robust)
+
+    replayed = await replay_module.replay("order", batch_size=2)
+
+    assert replayed == 5
+    published = channel.default_exchange.published
+    assert [routing_key for routing_key, _ in published] == ["order"] * 5
+    assert [message.body for _, message in published] == [b"0", b"1", b"2", b"3", b"4"]
+    # Счётчик попыток и причина сброшены, остальные заголовки сохранены
+    assert published[0][1].headers == {"trace": "t"}
+    assert published[0][1].message_id == "m-0"
+    # Одно подтверждение на пачку
+    assert queue.acks == [(2, True), (4, True), (5, True)]
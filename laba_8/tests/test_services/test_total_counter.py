@@ -0,0 +1,88 @@
+# tests/test_services/test_total_counter.py
+import pytest
+from unittest.mock import AsyncMock
+
+from models import User
+from schemas.order import OrderCreate
+from services.order_service import OrderService
+from services.total_counter import TotalCounter, INCR_IF_EXISTS_SCRIPT
+
+
+@pytest.mark.asyncio
+async def test_total_counter_hit_skips_loader():
+    """Если счётчик есть в Redis, COUNT(*) не выполняется."""
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = "42"
+    loader = AsyncMock(return_value=7)
+
+    counter = TotalCounter(mock_redis, "products", loader)
+
+    assert await counter.get() == 42
+    loader.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_total_counter_miss_loads_and_caches():
+    """При промахе считаем через loader и кладём значение с TTL (NX)."""
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = None
+    loader = AsyncMock(return_value=7)
+
+    counter = TotalCounter(mock_redis, "products", loader, ttl=60)
+
+    assert await counter.get() == 7
+    mock_redis.set.assert_called_once_with("count:products", 7, ex=60, nx=True)
+
+
+@pytest.mark.asyncio
+async def test_total_counter_incr_decr_only_existing_key():
+    """create/delete сдвигают счётчик скриптом INCRBY-если-существует."""
+    mock_redis = AsyncMock()
+    counter = TotalCounter(mock_redis, "orders", AsyncMock())
+
+    await counter.incr()
+    await counter.decr()
+
+    mock_redis.eval.assert_any_call(INCR_IF_EXISTS_SCRIPT, 1, "count:orders", 1)
+    mock_redis.eval.assert_any_call(INCR_IF_EXISTS_SCRIPT, 1, "count:orders", -1)
+
+
+@pytest.mark.asyncio
+async def test_total_counter_without_redis_uses_loader():
+    """Без Redis счётчик всегда считает через БД."""
+    loader = AsyncMock(return_value=3)
+    counter = TotalCounter(None, "users", loader)
+
+    await counter.incr()
+    assert await counter.get() == 3
+    loader.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_total_counter_failed_incr_drops_key(fake_redis):
+    """Сбой Redis после коммита не доходит до клиента: счётчик сбрасывается и пересчитается."""
+    fake_redis.data["count:orders"] = "5"
+    fake_redis.fail = {"eval"}
+    loader = AsyncMock(return_value=6)
+    counter = TotalCounter(fake_redis, "orders", loader)
+
+    await counter.incr()
+    assert "count:orders" not in fake_redis.data
+    assert await counter.get() == 6
+
+    fake_redis.fail = {"eval", "delete"}
+    await counter.decr()
+    await counter.reset()
+
+
+@pytest.mark.asyncio
+async def test_order_is_created_when_redis_is_down(order_service: OrderService, test_db_session, fake_redis):
+    user = User(username="buyer", email="buyer@example.com")
+    test_db_session.add(user)
+    await test_db_session.flush()
+    fake_redis.fail = {"eval", "delete"}
+    order_service.total_counter.redis = fake_redis
+
+    order = await order_service.create(OrderCreate(user_id=user.id, product_ids=[]))
+
+    assert await order_service.get_by_id(order.id) is not None